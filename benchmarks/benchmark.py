@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+WiFi Client Notifier ベンチマーク
+
+合成したルータのデバイスリスト（HTMLテーブル形式とJSON形式、10〜5,000台）を使って、
+解析・差分計算・メール送信の処理性能を計測します。
+
+結果は ops/sec（1秒あたりの処理回数）とピークメモリで表示します。
+保存済みのベースラインがある場合は比較し、許容範囲を超えて性能が低下した
+ケースがあれば終了コード1で終了します。
+
+使用方法:
+    python benchmarks/benchmark.py                   # 計測してベースラインと比較
+    python benchmarks/benchmark.py --save-baseline   # 計測結果をベースラインとして保存
+    python benchmarks/benchmark.py --quick           # 小さいサイズのみで計測
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# リポジトリのルートを import パスに追加する（src パッケージを読み込むため）
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.html_parser import (  # noqa: E402
+    PARSER_BS4,
+    PARSER_FAST,
+    extract_devices_from_json,
+    parse_wireless_lan_status,
+)
+from src.device import Device  # noqa: E402
+from src.wifi_notifier import EmailNotifier, WiFiMonitor, WiFiRouter  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+SIZES = (10, 100, 1000, 5000)
+QUICK_SIZES = (10, 100)
+
+
+# ---------------------------------------------------------------------------
+# 合成データ
+# ---------------------------------------------------------------------------
+
+def generate_devices(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    合成したデバイス情報のリストを生成する。
+
+    Args:
+        count: デバイス数
+        seed: 乱数のシード
+
+    Returns:
+        'mac', 'ip', 'hostname' を含む辞書のリスト
+    """
+    rng = random.Random(seed)
+    devices = []
+    for i in range(count):
+        mac = ':'.join(f"{rng.randrange(256):02X}" for _ in range(6))
+        devices.append({
+            'mac': mac,
+            'ip': f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+            'hostname': f"device-{i:05d}",
+        })
+    return devices
+
+
+def render_html(devices: List[Dict[str, str]]) -> str:
+    """デバイスリストをルータのステータスページ風のHTMLテーブルに変換する。"""
+    rows = [
+        '<tr><td>{hostname}</td><td>{mac}</td><td>{ip}</td><td>5GHz</td><td>-52dBm</td></tr>'
+        .format(**device)
+        for device in devices
+    ]
+    return (
+        '<html><head><title>無線LAN接続状態</title></head><body>'
+        '<table class="menu"><tr><td><a href="/index.html">トップ</a></td></tr></table>'
+        '<table id="wlan_client_table">'
+        '<tr><th>ホスト名</th><th>MACアドレス</th><th>IPアドレス</th>'
+        '<th>周波数</th><th>信号強度</th></tr>'
+        + ''.join(rows)
+        + '</table></body></html>'
+    )
+
+
+def render_json(devices: List[Dict[str, str]]) -> str:
+    """デバイスリストをJSON形式のレスポンスに変換する。"""
+    return json.dumps({'clients': devices})
+
+
+# ---------------------------------------------------------------------------
+# 計測
+# ---------------------------------------------------------------------------
+
+def measure(func: Callable[[], object], min_time: float = 0.2,
+            repeat: int = 3) -> Tuple[float, int]:
+    """
+    関数の処理性能とピークメモリを計測する。
+
+    Args:
+        func: 計測する関数
+        min_time: 1回の計測で関数を繰り返し実行する最短時間（秒）
+        repeat: 計測の繰り返し回数（最良値を採用）
+
+    Returns:
+        (ops/sec, ピークメモリ（バイト）) のタプル
+    """
+    func()  # ウォームアップ
+
+    best = 0.0
+    for _ in range(repeat):
+        iterations = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            func()
+            iterations += 1
+            elapsed = time.perf_counter() - start
+        best = max(best, iterations / elapsed)
+
+    # tracemalloc は処理を遅くするため、速度とは別に1回だけ実行して計測する
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+class _FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """メールを受け取って破棄するだけの最小限のSMTPサーバー。"""
+
+    def handle(self):
+        self._reply('220 localhost benchmark SMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith('EHLO'):
+                self._reply('250-localhost', '250 AUTH PLAIN LOGIN')
+            elif command.startswith('AUTH'):
+                self._reply('235 Authentication successful')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self._reply('250 OK')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('250 OK')
+
+    def _reply(self, *lines: str):
+        self.wfile.write(''.join(f"{line}\r\n" for line in lines).encode('ascii'))
+
+
+def start_fake_smtp_server() -> socketserver.ThreadingTCPServer:
+    """ローカルの空きポートで偽SMTPサーバーを起動する。"""
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _FakeSMTPHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class _StaticRouter(WiFiRouter):
+    """ネットワークにアクセスせず、あらかじめ用意したデバイスリストを交互に返すルータ。"""
+
+    def __init__(self, snapshots: List[List[Dict[str, str]]]):
+        super().__init__('127.0.0.1', 'bench', 'bench', name='bench')
+        # 実際のルータと同様に、解析済みの Device のリストを返す
+        self._snapshots = [[Device.coerce(d) for d in snapshot] for snapshot in snapshots]
+        self._index = 0
+
+    def fetch_connected_devices(self) -> List[Device]:
+        self._index = (self._index + 1) % len(self._snapshots)
+        self.last_fetch_ok = True
+        self.last_fetch_unchanged = False
+        return self._snapshots[self._index]
+
+
+class _NullNotifier:
+    """通知を送信せずに件数だけ数える通知オブジェクト。"""
+
+    digest = False
+
+    def __init__(self):
+        self.count = 0
+
+    def send_notifications(self, devices, suppressed=0):
+        self.count += len(devices)
+        return True
+
+    def close(self):
+        pass
+
+
+def create_monitor(workdir: str) -> WiFiMonitor:
+    """ベンチマーク用の設定ファイルで WiFiMonitor を生成する。"""
+    config = {
+        'router': {'ip': '127.0.0.1', 'username': 'bench', 'password': 'bench'},
+        'email': {
+            'smtp_server': '127.0.0.1', 'smtp_port': 25, 'smtp_user': 'bench',
+            'smtp_password': 'bench', 'sender_email': 'bench@example.com',
+            'recipient_emails': ['bench@example.com'],
+        },
+        'dispatch': {'enabled': False},
+        # 入れ替わったデバイスがすべて新規接続として通知されるよう、レート制限と
+        # 接続・切断判定の猶予時間を無効にする
+        'rate_limit': {'enabled': False},
+        'presence': {'absence_grace': 0, 'connect_delay': 0},
+        'log_level': 'WARNING',
+        'log_file': os.path.join(workdir, 'benchmark.log'),
+    }
+    config_path = os.path.join(workdir, 'benchmark.yaml')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)  # JSONはYAMLとしても読み込める
+    return WiFiMonitor(config_path)
+
+
+def run_benchmarks(sizes: Tuple[int, ...], min_time: float) -> Dict[str, Dict[str, float]]:
+    """
+    すべてのベンチマークを実行する。
+
+    Args:
+        sizes: 計測するデバイス数
+        min_time: 1回の計測の最短時間（秒）
+
+    Returns:
+        ケース名をキー、'ops_per_sec' と 'peak_kib' を値とする辞書
+    """
+    results: Dict[str, Dict[str, float]] = {}
+
+    def record(name: str, func: Callable[[], object]):
+        ops, peak = measure(func, min_time=min_time)
+        results[name] = {'ops_per_sec': round(ops, 2), 'peak_kib': round(peak / 1024, 1)}
+        print(f"{name:<44} {ops:>12.1f} ops/sec {peak / 1024:>10.1f} KiB")
+
+    router = WiFiRouter('127.0.0.1', 'bench', 'bench')
+
+    for size in sizes:
+        devices = generate_devices(size)
+        html = render_html(devices)
+        json_text = render_json(devices)
+
+        record(f"parse_html_fast[{size}]",
+               lambda: parse_wireless_lan_status(html, parser=PARSER_FAST))
+        record(f"parse_html_bs4[{size}]",
+               lambda: parse_wireless_lan_status(html, parser=PARSER_BS4))
+        record(f"extract_json[{size}]",
+               lambda: extract_devices_from_json(json.loads(json_text)))
+        record(f"router_parse_device_list_html[{size}]",
+               lambda: router._parse_device_list(html))
+        record(f"router_parse_device_list_json[{size}]",
+               lambda: router._parse_device_list(json_text))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        monitor = create_monitor(workdir)
+        monitor.notifier = _NullNotifier()
+        for size in sizes:
+            # 10%のデバイスが入れ替わる2つのスナップショットを交互に返す
+            # （猶予時間がないため、毎回入れ替わった台数が新規接続として通知される）
+            base = generate_devices(size, seed=1)
+            churn = generate_devices(max(1, size // 10), seed=2)
+            snapshots = [base, base[len(churn):] + churn]
+            bench_router = _StaticRouter(snapshots)
+            monitor.known_devices[bench_router.name] = {}
+            monitor.notifier.count = 0
+            record(f"check_for_new_devices[{size}]",
+                   lambda r=bench_router: monitor._check_for_new_devices(r))
+            if not monitor.notifier.count:
+                raise RuntimeError(f"check_for_new_devices[{size}] で新規接続が通知されていません")
+        monitor.state_store.close()
+        logging.shutdown()
+
+    smtp_server = start_fake_smtp_server()
+    try:
+        host, port = smtp_server.server_address
+        device = generate_devices(1)[0]
+        for keep_alive in (True, False):
+            notifier = EmailNotifier(host, port, 'bench', 'bench', 'bench@example.com',
+                                     ['bench@example.com'], use_tls=False,
+                                     keep_alive=keep_alive)
+            label = 'keep_alive' if keep_alive else 'reconnect'
+            record(f"email_send_notification[{label}]",
+                   lambda n=notifier: n.send_notification(device))
+            notifier.close()
+        digest_notifier = EmailNotifier(host, port, 'bench', 'bench', 'bench@example.com',
+                                        ['bench@example.com'], use_tls=False, digest=True)
+        digest_devices = generate_devices(30)
+        record("email_send_digest[30]",
+               lambda: digest_notifier.send_notifications(digest_devices))
+        digest_notifier.close()
+    finally:
+        smtp_server.shutdown()
+        smtp_server.server_close()
+
+    return results
+
+
+def compare_with_baseline(results: Dict[str, Dict[str, float]],
+                          baseline: Dict[str, Dict[str, float]],
+                          tolerance: float) -> List[str]:
+    """
+    計測結果をベースラインと比較する。
+
+    Args:
+        results: 今回の計測結果
+        baseline: 保存済みのベースライン
+        tolerance: 許容する性能低下の割合（0.3で30%まで許容）
+
+    Returns:
+        許容範囲を超えて性能が低下したケースの説明のリスト
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]['ops_per_sec']
+        actual = result['ops_per_sec']
+        if actual < expected * (1 - tolerance):
+            regressions.append(
+                f"{name}: {actual:.1f} ops/sec（ベースライン {expected:.1f} ops/sec、"
+                f"{(1 - actual / expected) * 100:.0f}% 低下）"
+            )
+    return regressions
+
+
+def main():
+    """メインエントリーポイント。"""
+    parser = argparse.ArgumentParser(description="WiFi Client Notifier ベンチマーク")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE,
+                        help="ベースラインファイルのパス")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="計測結果をベースラインとして保存する")
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="許容する性能低下の割合（デフォルト: 0.3）")
+    parser.add_argument('--quick', action='store_true',
+                        help="小さいサイズのみで短時間に計測する")
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="1回の計測の最短時間（秒）")
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    print(f"=== WiFi Client Notifier ベンチマーク（デバイス数: {', '.join(map(str, sizes))}）===\n")
+    results = run_benchmarks(sizes, args.min_time)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n',
+                                 encoding='utf-8')
+        print(f"\n✓ ベースラインを保存しました: {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nベースラインがありません（--save-baseline で作成できます）: {args.baseline}")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("\n✗ ベースラインから性能が低下しました:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+
+    print(f"\n✓ すべてのケースがベースラインの許容範囲内です（許容低下: {args.tolerance:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
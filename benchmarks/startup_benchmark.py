@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+WiFi Client Notifier 起動時間ベンチマーク
+
+GitHub Actions の定期実行（--single-run）は毎回新しいインタープリターで起動するため、
+実行時間の大部分をインタープリターの起動とモジュールの読み込みが占めます。
+このスクリプトは新しいプロセスで以下を計測し、予算を超えた場合は終了コード1で終了します。
+
+- import: src.wifi_notifier の読み込み時間（空のインタープリターの起動時間を除く）
+- single-run: ローカルの模擬ルータ（JSON形式）に対する --single-run の実行時間
+  （空のインタープリターの起動時間を除く、状態ストアが作成済みの2回目以降の実行）
+
+また、実行経路で使用しない重い依存モジュール（BeautifulSoup、smtplib など）が
+読み込み時に読み込まれていないことを確認します。
+
+使用方法:
+    python benchmarks/startup_benchmark.py                     # 計測して予算と比較
+    python benchmarks/startup_benchmark.py --import-budget 300 --single-run-budget 800
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+# リポジトリのルートを import パスに追加する（src パッケージを読み込むため）
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.router_simulator import RouterSimulatorFarm  # noqa: E402
+
+# src.wifi_notifier の読み込み時に読み込まれてはならないモジュール
+# （HTMLの解析、メール送信、メール以外の通知先、メトリクスサーバー、履歴検索CLI、
+#  セッションキャッシュ、syslogの受信、ローカルのデバイス情報源でのみ使用）
+LAZY_MODULES = (
+    'bs4',
+    'smtplib',
+    'email.mime.multipart',
+    'email.mime.text',
+    'src.notifiers',
+    'http.server',
+    'argparse',
+    'cryptography',
+    'src.syslog_listener',
+    'src.device_sources',
+)
+
+# 予算のデフォルト（ミリ秒、空のインタープリターの起動時間を除く）
+# 共有のCIランナーでは計測値が揺らぐため、現状の値に余裕を持たせています。
+# 遅延読み込みの退行は LAZY_MODULES の確認で検出します
+DEFAULT_IMPORT_BUDGET = 400
+DEFAULT_SINGLE_RUN_BUDGET = 1000
+
+
+def _environment() -> Dict[str, str]:
+    """子プロセスの環境変数（src パッケージを読み込めるようにする）。"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT_DIR), env.get('PYTHONPATH')]))
+    return env
+
+
+def time_process(args: List[str], repeat: int, cwd: str = None) -> float:
+    """
+    新しいプロセスでコマンドを繰り返し実行し、実行時間の中央値を返す。
+
+    Args:
+        args: python インタープリターに渡す引数
+        repeat: 実行回数
+        cwd: 作業ディレクトリ
+
+    Returns:
+        実行時間の中央値（ミリ秒）
+
+    Raises:
+        RuntimeError: コマンドが失敗した場合
+    """
+    env = _environment()
+    timings = []
+    # 1回目はバイトコード（.pyc）の作成を含むため計測から除く
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, *args], cwd=cwd, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        if i:
+            timings.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"{' '.join(args)} が失敗しました（終了コード {result.returncode}）:\n"
+                f"{result.stdout.decode('utf-8', 'replace')}"
+            )
+    return statistics.median(timings)
+
+
+def eagerly_loaded_modules() -> List[str]:
+    """src.wifi_notifier の読み込み時に読み込まれた LAZY_MODULES のモジュールを返す。"""
+    code = (
+        "import json, sys\n"
+        "import src.wifi_notifier\n"
+        f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], env=_environment(),
+                            stdout=subprocess.PIPE, check=True)
+    return json.loads(result.stdout)
+
+
+def write_single_run_config(farm: RouterSimulatorFarm, workdir: str) -> str:
+    """
+    模擬ルータを監視する設定ファイルを作業ディレクトリに書き出す。
+
+    監視対象には存在しないデバイスを指定し、メールを送信しない実行
+    （定期実行で最も多い、変化のないチェック）を計測します。
+    """
+    config = farm.build_config(smtp_port=9)
+    config['monitored_devices'] = ['02:00:00:00:00:01']
+    config['log_level'] = 'WARNING'
+    path = os.path.join(workdir, 'config.yaml')
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+    return path
+
+
+def run_benchmarks(repeat: int) -> Dict[str, float]:
+    """
+    起動時間を計測する。
+
+    Args:
+        repeat: 各計測の実行回数
+
+    Returns:
+        計測名から実行時間（ミリ秒）への辞書
+    """
+    results = {}
+    baseline = time_process(['-c', 'pass'], repeat)
+    results['interpreter'] = baseline
+    results['import'] = time_process(['-c', 'import src.wifi_notifier'], repeat) - baseline
+
+    farm = RouterSimulatorFarm(1, clients=20, churn=0, response_format='json')
+    farm.start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            config_path = write_single_run_config(farm, workdir)
+            args = ['-m', 'src.wifi_notifier', config_path, '--single-run']
+            # 状態ストアの作成と全デバイスの登録は time_process の1回目（計測から除く）で行われる
+            results['single-run'] = time_process(args, repeat, cwd=workdir) - baseline
+    finally:
+        farm.stop()
+    return results
+
+
+def main():
+    """メインエントリーポイント。"""
+    parser = argparse.ArgumentParser(description="WiFi Client Notifier 起動時間ベンチマーク")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="各計測の実行回数（中央値を使用、デフォルト: 5）")
+    parser.add_argument('--import-budget', type=float, default=DEFAULT_IMPORT_BUDGET,
+                        help=f"読み込み時間の予算（ミリ秒、デフォルト: {DEFAULT_IMPORT_BUDGET}）")
+    parser.add_argument('--single-run-budget', type=float, default=DEFAULT_SINGLE_RUN_BUDGET,
+                        help="--single-run の実行時間の予算"
+                             f"（ミリ秒、デフォルト: {DEFAULT_SINGLE_RUN_BUDGET}）")
+    args = parser.parse_args()
+
+    print("=== WiFi Client Notifier 起動時間ベンチマーク ===\n")
+    results = run_benchmarks(args.repeat)
+    print(f"  {'interpreter':<12} {results['interpreter']:8.1f} ms（空のインタープリター）")
+    print(f"  {'import':<12} {results['import']:8.1f} ms（予算 {args.import_budget:.0f} ms）")
+    print(f"  {'single-run':<12} {results['single-run']:8.1f} ms"
+          f"（予算 {args.single_run_budget:.0f} ms）")
+
+    failures = []
+    eager = eagerly_loaded_modules()
+    if eager:
+        failures.append(f"起動時に読み込まれています: {', '.join(eager)}")
+    if results['import'] > args.import_budget:
+        failures.append(f"読み込み時間が予算を超えました: {results['import']:.1f} ms")
+    if results['single-run'] > args.single_run_budget:
+        failures.append(f"--single-run の実行時間が予算を超えました: "
+                        f"{results['single-run']:.1f} ms")
+
+    if failures:
+        print("\n✗ 起動時間の予算を満たしていません:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+    print("\n✓ 起動時間は予算の範囲内です")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+OUI索引ファイル作成スクリプト
+
+IEEE の登録簿のCSV（MA-L: oui.csv、MA-M: mam.csv、MA-S: oui36.csv）から、
+ベンダー名の検索（src/oui.py）で使用する索引ファイルを作成します。
+登録簿は約4万行あり、起動のたびに解析すると時間がかかるため、
+このスクリプトで事前に固定長の配列の索引に変換しておきます。
+
+使用方法:
+    # IEEE のサイトから登録簿をダウンロードして作成（data/oui.idx）
+    python scripts/build_oui_index.py --download
+
+    # ダウンロード済みのCSVから作成
+    python scripts/build_oui_index.py oui.csv mam.csv oui36.csv -o data/oui.idx
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+# リポジトリのルートを import パスに追加する（src パッケージを読み込むため）
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.oui import DEFAULT_INDEX_PATH, PREFIX_WIDTHS, VendorIndex, write_index  # noqa: E402
+
+# IEEE の登録簿（MA-L、MA-M、MA-S）
+REGISTRY_URLS = (
+    'https://standards-oui.ieee.org/oui/oui.csv',
+    'https://standards-oui.ieee.org/oui28/mam.csv',
+    'https://standards-oui.ieee.org/oui36/oui36.csv',
+)
+# ベンダー名として使用しない組織名（細分化されたブロックの親、非公開の登録）
+IGNORED_ORGANIZATIONS = ('IEEE Registration Authority', 'Private')
+
+
+def read_registry(text: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    登録簿のCSVを読み込む。
+
+    Args:
+        text: CSVの内容（見出し: Registry, Assignment, Organization Name, ...）
+
+    Yields:
+        (プレフィックスの幅, プレフィックス, ベンダー名) のタプル
+    """
+    for row in csv.DictReader(io.StringIO(text)):
+        assignment = (row.get('Assignment') or '').strip()
+        organization = ' '.join((row.get('Organization Name') or '').split())
+        width = len(assignment) * 4
+        if width not in PREFIX_WIDTHS or not organization:
+            continue
+        if organization in IGNORED_ORGANIZATIONS:
+            continue
+        try:
+            yield width, int(assignment, 16), organization
+        except ValueError:
+            continue
+
+
+def download(url: str, timeout: float = 60) -> str:
+    """登録簿をダウンロードする。"""
+    # IEEE のサイトは既定の User-Agent を拒否する場合がある
+    request = urllib.request.Request(url, headers={'User-Agent': 'wifi-client-notifier'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read().decode('utf-8', 'replace')
+
+
+def main():
+    """メインエントリーポイント。"""
+    parser = argparse.ArgumentParser(description="IEEE の登録簿からOUI索引ファイルを作成する")
+    parser.add_argument('files', nargs='*', help="登録簿のCSVファイル（oui.csv、mam.csv、oui36.csv）")
+    parser.add_argument('--download', action='store_true',
+                        help="IEEE のサイトから登録簿をダウンロードする")
+    parser.add_argument('-o', '--output', default=DEFAULT_INDEX_PATH,
+                        help=f"出力先（デフォルト: {os.path.relpath(DEFAULT_INDEX_PATH)}）")
+    args = parser.parse_args()
+
+    if not args.files and not args.download:
+        parser.error("CSVファイルを指定するか、--download を指定してください")
+
+    texts: List[str] = []
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            texts.append(f.read())
+    if args.download:
+        for url in REGISTRY_URLS:
+            print(f"ダウンロード中: {url}")
+            texts.append(download(url))
+
+    # 項目がない場合は既存の索引ファイルを置き換えずに終了する
+    entries = [entry for text in texts for entry in read_registry(text)]
+    if not entries:
+        print("✗ 登録簿の項目がありません（CSVの形式を確認してください）")
+        sys.exit(1)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    count = write_index(entries, args.output)
+
+    # 作成した索引の読み込み時間を確認する
+    start = time.perf_counter()
+    index = VendorIndex.open(args.output)
+    elapsed = (time.perf_counter() - start) * 1000
+    size = os.path.getsize(args.output)
+    print(f"✓ {args.output} を作成しました: {count}件のプレフィックス、"
+          f"{index.vendor_count}件のベンダー、{size / 1024:.0f} KiB（読み込み {elapsed:.2f} ms）")
+
+
+if __name__ == "__main__":
+    main()
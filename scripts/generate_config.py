@@ -80,9 +80,22 @@ def generate_config():
             "monitored_devices": parse_list(get_env_optional("MONITORED_DEVICES", "")),
             "check_interval": int(get_env_optional("CHECK_INTERVAL", "60")),
             "log_level": get_env_optional("LOG_LEVEL", "INFO"),
-            "log_file": get_env_optional("LOG_FILE", "wifi_notifier.log")
+            "log_file": get_env_optional("LOG_FILE", "wifi_notifier.log"),
+            "state_store": {
+                "type": "sqlite",
+                "path": get_env_optional("STATE_FILE", "wifi_notifier_state.db")
+            }
         }
         
+        # セッションキャッシュの鍵が設定されている場合は、ログインセッションを実行間で再利用する
+        # （鍵は config.yaml に書き出さず、実行時に環境変数から読み込む）
+        if get_env_optional("WIFI_NOTIFIER_SESSION_KEY"):
+            config["session_cache"] = {
+                "enabled": True,
+                "path": get_env_optional("SESSION_CACHE_FILE", "wifi_notifier_session.cache"),
+                "ttl": int(get_env_optional("SESSION_CACHE_TTL", "3900"))
+            }
+        
         # config.yamlに書き出し
         with open('config.yaml', 'w', encoding='utf-8') as f:
             yaml.dump(config, f, allow_unicode=True, default_flow_style=False, sort_keys=False)
@@ -92,6 +105,7 @@ def generate_config():
         print(f"  - SMTPサーバー: {config['email']['smtp_server']}")
         print(f"  - 受信者数: {len(config['email']['recipient_emails'])}")
         print(f"  - 監視デバイス数: {len(config['monitored_devices'])}")
+        print(f"  - セッションキャッシュ: {'有効' if 'session_cache' in config else '無効'}")
         
     except ValueError as e:
         print(f"✗ エラー: {e}", file=sys.stderr)
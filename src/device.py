@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+デバイス情報の標準表現
+
+ルータから取得したデバイス情報を、MACアドレスを48ビットの整数で保持する
+__slots__ 付きのクラスで表します。解析・差分計算・フィルタリング・状態の保存は
+すべて整数のMACアドレスで行い、文字列への変換は表示や保存の直前だけに限ります。
+
+Device は辞書と同じように device['mac'] や device.get('hostname') で参照できるため、
+デバイス情報を辞書として扱う既存のコードもそのまま使用できます。
+"""
+
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from src.oui import lookup_vendor
+
+# MACアドレスの区切り文字を取り除く変換テーブル（コロン、ハイフン、ドット、空白）
+_SEPARATORS = str.maketrans('', '', ':-. ')
+_MAC_MAX = (1 << 48) - 1
+
+
+def parse_mac(value: Union[int, str]) -> int:
+    """
+    MACアドレスを48ビットの整数に変換する。
+
+    コロン区切り（AA:BB:CC:DD:EE:FF）、ハイフン区切り（AA-BB-CC-DD-EE-FF）、
+    ドット区切り（aabb.ccdd.eeff）、区切りなし（AABBCCDDEEFF）を受け付けます。
+    整数はそのまま返します。
+
+    Args:
+        value: MACアドレス
+
+    Returns:
+        MACアドレスを表す整数
+
+    Raises:
+        ValueError: MACアドレスとして解釈できない場合
+    """
+    if isinstance(value, int):
+        if not 0 <= value <= _MAC_MAX:
+            raise ValueError(f"MACアドレスの範囲外です: {value}")
+        return value
+
+    # コロン・ハイフン区切りは str.replace の方が変換テーブルより速い
+    digits = value.replace(':', '').replace('-', '')
+    if len(digits) != 12:
+        digits = value.translate(_SEPARATORS)
+    # int() が受け付ける符号・アンダースコア・非ASCIIの数字は除外する
+    if len(digits) != 12 or not (digits.isascii() and digits.isalnum()):
+        raise ValueError(f"MACアドレスの形式が不正です: {value}")
+    try:
+        return int(digits, 16)
+    except ValueError:
+        raise ValueError(f"MACアドレスの形式が不正です: {value}") from None
+
+
+def format_mac(value: int, upper: bool = False) -> str:
+    """
+    48ビットの整数をコロン区切りのMACアドレスに変換する。
+
+    Args:
+        value: MACアドレスを表す整数
+        upper: 大文字で出力するか（デフォルトは小文字の正規化形式）
+
+    Returns:
+        MACアドレス（例: aa:bb:cc:dd:ee:ff）
+    """
+    digits = f"{value:012X}" if upper else f"{value:012x}"
+    return ':'.join((digits[0:2], digits[2:4], digits[4:6],
+                     digits[6:8], digits[8:10], digits[10:12]))
+
+
+class Device:
+    """
+    1台のデバイス情報。
+
+    ip と hostname がNoneのデバイスは、状態ストアから復元したMACアドレスのみの
+    記録を表します（has_details がFalse）。vendor はMACアドレスのOUIから
+    参照時に求めるため、保持しません。
+    """
+
+    __slots__ = ('mac_int', 'ip', 'hostname')
+
+    # 辞書として参照できるキー
+    KEYS = ('mac', 'ip', 'hostname', 'vendor')
+
+    def __init__(self, mac: Union[int, str], ip: Optional[str] = '',
+                 hostname: Optional[str] = ''):
+        """
+        デバイス情報を初期化する。
+
+        Args:
+            mac: MACアドレス（文字列または48ビットの整数）
+            ip: IPアドレス
+            hostname: ホスト名
+
+        Raises:
+            ValueError: MACアドレスとして解釈できない場合
+        """
+        self.mac_int = parse_mac(mac)
+        self.ip = ip
+        self.hostname = hostname
+
+    @classmethod
+    def from_mac(cls, mac: Union[int, str]) -> 'Device':
+        """MACアドレスのみの記録（IPアドレス・ホスト名が不明）を作成する。"""
+        return cls(mac, None, None)
+
+    @classmethod
+    def coerce(cls, value: Union['Device', Dict[str, str]]) -> 'Device':
+        """
+        辞書形式のデバイス情報を Device に変換する（Device はそのまま返す）。
+
+        Raises:
+            ValueError: MACアドレスがない、または解釈できない場合
+        """
+        if isinstance(value, Device):
+            return value
+        return cls(value.get('mac') or '', value.get('ip', ''), value.get('hostname', ''))
+
+    @property
+    def mac(self) -> str:
+        """表示用のMACアドレス（大文字・コロン区切り）。"""
+        return format_mac(self.mac_int, upper=True)
+
+    @property
+    def normalized_mac(self) -> str:
+        """正規化されたMACアドレス（小文字・コロン区切り）。"""
+        return format_mac(self.mac_int)
+
+    @property
+    def vendor(self) -> Optional[str]:
+        """MACアドレスのOUIから求めたベンダー名（OUI索引がない・未登録の場合はNone）。"""
+        return lookup_vendor(self.mac_int)
+
+    @property
+    def has_details(self) -> bool:
+        """IPアドレスまたはホスト名が判明しているか。"""
+        return self.ip is not None or self.hostname is not None
+
+    # --- 辞書互換のインターフェース ---
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.KEYS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def get(self, key: str, default=None):
+        """辞書の get と同様に値を返す（値がNoneの場合は default を返す）。"""
+        if key not in self.KEYS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.KEYS
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.KEYS]
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """辞書に変換する（JSONへの書き出し用）。"""
+        return {'mac': self.mac, 'ip': self.ip, 'hostname': self.hostname,
+                'vendor': self.vendor}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Device):
+            return NotImplemented
+        return (self.mac_int, self.ip, self.hostname) == (other.mac_int, other.ip, other.hostname)
+
+    def __hash__(self) -> int:
+        return hash(self.mac_int)
+
+    def __repr__(self) -> str:
+        return f"Device({self.mac!r}, ip={self.ip!r}, hostname={self.hostname!r})"
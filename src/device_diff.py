@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+デバイスリストの差分計算
+
+MACアドレス（48ビットの整数）をキーとしたインデックスを使って、前回と今回の
+デバイスリストから接続・切断・属性変更（IPアドレスやホスト名の変化）を一度に求めます。
+"""
+
+from typing import Dict, Iterable, List, Tuple, Union
+
+from src.device import Device
+
+# 属性変更として検出するデバイス情報のキー
+TRACKED_FIELDS = ('ip', 'hostname')
+
+
+def index_devices(devices: Iterable[Union[Device, Dict[str, str]]]) -> Dict[int, Device]:
+    """
+    デバイスリストを整数のMACアドレスをキーとする辞書に変換する。
+
+    辞書形式のデバイス情報は Device に変換します。MACアドレスがない、
+    または解釈できないデバイスは無視します。
+
+    Args:
+        devices: デバイス情報のリスト
+
+    Returns:
+        整数のMACアドレスをキー、デバイス情報を値とする辞書
+    """
+    index = {}
+    for device in devices:
+        if not isinstance(device, Device):
+            try:
+                device = Device.coerce(device)
+            except ValueError:
+                continue
+        index[device.mac_int] = device
+    return index
+
+
+class DeviceDiff:
+    """2つのデバイスインデックス間の差分。"""
+
+    def __init__(self):
+        """空の差分を初期化する。"""
+        # (MAC, デバイス情報) のリスト
+        self.connected: List[Tuple[int, Device]] = []
+        # MACのリスト
+        self.disconnected: List[int] = []
+        # (MAC, 変更前, 変更後, 変更されたキーのタプル) のリスト
+        self.changed: List[Tuple[int, Device, Device, Tuple[str, ...]]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.connected or self.disconnected or self.changed)
+
+
+def diff_devices(previous: Dict[int, Device], current: Dict[int, Device],
+                 fields: Tuple[str, ...] = TRACKED_FIELDS) -> DeviceDiff:
+    """
+    前回と今回のデバイスインデックスを比較する。
+
+    今回のインデックスを1回走査して接続と属性変更を求めます。切断は前回の
+    デバイス数から算出できる場合のみ前回のインデックスを走査します。
+    前回の記録がMACアドレスのみの場合（状態ストアから復元した記録など）は
+    属性変更を判定しません。
+
+    Args:
+        previous: 前回のデバイスインデックス
+        current: 今回のデバイスインデックス
+        fields: 属性変更として検出するキー
+
+    Returns:
+        差分
+    """
+    diff = DeviceDiff()
+    retained = 0
+
+    for mac, device in current.items():
+        old = previous.get(mac)
+        if old is None:
+            diff.connected.append((mac, device))
+            continue
+
+        retained += 1
+        if old.has_details:
+            changed = tuple(f for f in fields if getattr(old, f) != getattr(device, f))
+            if changed:
+                diff.changed.append((mac, old, device, changed))
+
+    # 前回のデバイスがすべて今回も存在する場合は切断の走査を省略する
+    if retained < len(previous):
+        diff.disconnected = [mac for mac in previous if mac not in current]
+
+    return diff
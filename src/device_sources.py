@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+ローカルのデバイス情報源（ARPテーブル、DHCPリース）
+
+監視をゲートウェイ（ルータ自身やDHCPサーバーを兼ねるホスト）で実行する場合に、
+ルータのWeb UIにHTTPでアクセスせず、カーネルのARPテーブルやDHCPサーバーの
+リースファイルから接続中のデバイスを取得します。WiFiRouter と同じ
+fetch_connected_devices() を持つため、差分計算・通知の処理はそのまま使用できます。
+
+- arp: /proc/net/arp（完了したエントリのみ、インターフェースで絞り込み可能）
+- dnsmasq: dnsmasq のリースファイル（OpenWrt では /tmp/dhcp.leases）
+- isc_dhcp: ISC DHCP サーバーの dhcpd.leases（追記された部分のみを解析）
+
+リースファイルは inode・サイズ・更新時刻が変わった場合のみ読み直します。
+常駐実行時は FileWatcher（inotify、Linuxのみ）でリースファイルの変更を検出し、
+ポーリングの間隔を待たずに読み直すことができます。
+"""
+
+import calendar
+import hashlib
+import inspect
+import logging
+import os
+import re
+import select
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from src.device import Device
+from src.router_session import RouterFetchError
+
+# 情報源の種類
+SOURCE_ARP = 'arp'
+SOURCE_DNSMASQ = 'dnsmasq'
+SOURCE_ISC_DHCP = 'isc_dhcp'
+
+# /proc/net/arp の Flags の ATF_COM（アドレス解決が完了したエントリ）
+_ATF_COM = 0x2
+# ISC DHCP のリースブロック（lease <IPアドレス> { ... }）
+_ISC_LEASE = re.compile(rb'^lease\s+(\S+)\s*\{(.*?)^\}', re.MULTILINE | re.DOTALL)
+_ISC_FIELDS = {
+    'mac': re.compile(rb'^\s*hardware\s+ethernet\s+([0-9A-Fa-f:]+);', re.MULTILINE),
+    'hostname': re.compile(rb'^\s*client-hostname\s+"([^"]*)";', re.MULTILINE),
+    'state': re.compile(rb'^\s*binding\s+state\s+(\w+);', re.MULTILINE),
+    'ends': re.compile(rb'^\s*ends\s+([^;]+);', re.MULTILINE),
+}
+
+
+class WatchedFile:
+    """変更があった場合のみ読み込むファイル（inode・サイズ・更新時刻で変更を判定）。"""
+
+    def __init__(self, path: str):
+        """
+        監視するファイルを初期化する（ファイルは read() で読み込みます）。
+
+        Args:
+            path: ファイルのパス
+        """
+        self.path = path
+        # 解析済みの位置（追記分のみを読み込む場合に使用）
+        self.offset = 0
+        self._signature: Optional[Tuple[int, int, int]] = None
+
+    def read(self, incremental: bool = False) -> Optional[Tuple[bool, bytes]]:
+        """
+        変更があればファイルを読み込む。
+
+        Args:
+            incremental: 同じファイルが伸びた場合に offset 以降のみを読み込むか
+
+        Returns:
+            (追記分のみを読み込んだか, 内容) のタプル（変更がない場合はNone）
+
+        Raises:
+            OSError: ファイルを読み込めない場合
+        """
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if signature == self._signature:
+                return None
+            appended = (incremental and self._signature is not None
+                        and stat.st_ino == self._signature[0] and stat.st_size >= self.offset)
+            if appended:
+                f.seek(self.offset)
+            else:
+                self.offset = 0
+            data = f.read()
+        self._signature = signature
+        return appended, data
+
+
+class DeviceSource(ABC):
+    """
+    ローカルのデバイス情報源の基底クラス。
+
+    WiFiRouter と同じく name、last_fetch_ok、last_fetch_unchanged と
+    fetch_connected_devices() を持ちます。ログインは不要です。
+    """
+
+    kind = ''
+
+    def __init__(self, path: str, name: Optional[str] = None):
+        """
+        情報源を初期化する（ファイルは fetch_connected_devices() で読み込みます）。
+
+        Args:
+            path: 読み込むファイルのパス
+            name: 識別名（省略時は情報源の種類）
+        """
+        self.path = path
+        self.name = name or self.kind
+        self.last_fetch_ok = False
+        self.last_fetch_unchanged = False
+        self._devices: List[Device] = []
+
+    @property
+    def authenticated(self) -> bool:
+        """ログインが不要なため常にTrue。"""
+        return True
+
+    def login(self) -> bool:
+        """ログインは不要なため何もしない。"""
+        return True
+
+    def close(self):
+        """保持しているリソースを解放する（ファイルは読み込みのたびに閉じるため何もしない）。"""
+
+    def watch_paths(self) -> List[str]:
+        """変更を監視するファイルのパスのリスト（inotify で監視できないファイルは含めない）。"""
+        return [self.path]
+
+    def get_connected_devices(self) -> List[Device]:
+        """接続中のデバイスのリストを取得する（失敗時は空のリスト）。"""
+        try:
+            return self.fetch_connected_devices()
+        except RouterFetchError as e:
+            logging.warning(f"[{self.name}] Failed to get device list: {e}")
+            return []
+
+    def fetch_connected_devices(self) -> List[Device]:
+        """
+        接続中のデバイスのリストを取得する（失敗時は例外を送出）。
+
+        前回から変化がない場合は前回のリストを返し、last_fetch_unchanged を
+        Trueに設定します。返されるリストは呼び出し側で変更しないでください。
+
+        Returns:
+            デバイス情報（Device）のリスト
+
+        Raises:
+            RouterFetchError: ファイルを読み込めない場合
+        """
+        self.last_fetch_ok = False
+        self.last_fetch_unchanged = False
+        try:
+            devices = self._read_devices()
+        except OSError as e:
+            raise RouterFetchError(f"{self.path}: {e}") from e
+        self.last_fetch_ok = True
+        if devices is None:
+            self.last_fetch_unchanged = True
+            return self._devices
+        self._devices = devices
+        return devices
+
+    @abstractmethod
+    def _read_devices(self) -> Optional[List[Device]]:
+        """デバイスのリストを読み込む（前回から変化がない場合はNone）。"""
+
+
+class LeaseSource(DeviceSource):
+    """
+    DHCPリースファイルの基底クラス。
+
+    有効期限内のリースを持つデバイスを接続中とみなします。ファイルに変更がなく、
+    前回の読み込み以降に期限切れになったリースもなければ変化なしとします。
+    """
+
+    # 追記分のみを解析できる形式か
+    incremental = False
+
+    def __init__(self, path: str, name: Optional[str] = None):
+        super().__init__(path, name)
+        self._file = WatchedFile(path)
+        # 識別キー -> (デバイス情報, 有効期限のUNIX時刻（無期限はNone）)
+        self._leases: Dict[object, Tuple[Device, Optional[float]]] = {}
+        self._next_expiry: Optional[float] = None
+
+    def _read_devices(self) -> Optional[List[Device]]:
+        now = time.time()
+        changed = self._file.read(self.incremental)
+        if changed is None and (self._next_expiry is None or now < self._next_expiry):
+            return None
+        if changed is not None:
+            appended, data = changed
+            if not appended:
+                self._leases = {}
+            self._file.offset += self._parse(data)
+        return self._active_devices(now)
+
+    def _active_devices(self, now: float) -> List[Device]:
+        """有効期限内のリースのデバイスを返し、次に期限切れになる時刻を記録する。"""
+        devices: Dict[int, Device] = {}
+        next_expiry = None
+        for device, expires in self._leases.values():
+            if expires is not None:
+                if expires <= now:
+                    continue
+                if next_expiry is None or expires < next_expiry:
+                    next_expiry = expires
+            devices[device.mac_int] = device
+        self._next_expiry = next_expiry
+        return list(devices.values())
+
+    @abstractmethod
+    def _parse(self, data: bytes) -> int:
+        """
+        読み込んだ内容のリースを self._leases に反映する。
+
+        Returns:
+            解析を終えたバイト数（書き込み途中の末尾は次回に解析する）
+        """
+
+
+class DnsmasqLeaseSource(LeaseSource):
+    """dnsmasq のリースファイル（"有効期限 MAC IPアドレス ホスト名 クライアントID"）。"""
+
+    kind = SOURCE_DNSMASQ
+
+    def _parse(self, data: bytes) -> int:
+        # dnsmasq はリースの変更のたびにファイル全体を書き直す
+        for line in data.decode('utf-8', 'replace').splitlines():
+            fields = line.split()
+            if len(fields) < 4:
+                continue
+            try:
+                expires = int(fields[0])
+                device = Device(fields[1], fields[2], '' if fields[3] == '*' else fields[3])
+            except ValueError:
+                # IPv6 のリース（duid 行、MACアドレスの代わりにIAID）
+                continue
+            self._leases[fields[2]] = (device, expires or None)
+        return len(data)
+
+
+class IscDhcpLeaseSource(LeaseSource):
+    """ISC DHCP サーバーの dhcpd.leases（リースの更新はファイルの末尾に追記される）。"""
+
+    kind = SOURCE_ISC_DHCP
+    incremental = True
+
+    def _parse(self, data: bytes) -> int:
+        consumed = 0
+        for block in _ISC_LEASE.finditer(data):
+            consumed = block.end()
+            ip = block.group(1).decode('ascii', 'replace')
+            body = block.group(2)
+            fields = {key: regex.search(body) for key, regex in _ISC_FIELDS.items()}
+            state = fields['state'].group(1) if fields['state'] else b'active'
+            if fields['mac'] is None or state != b'active':
+                # 同じIPアドレスの以前のリースは、解放・期限切れの記録で上書きされる
+                self._leases.pop(ip, None)
+                continue
+            hostname = ''
+            if fields['hostname']:
+                hostname = fields['hostname'].group(1).decode('utf-8', 'replace')
+            try:
+                device = Device(fields['mac'].group(1).decode('ascii'), ip, hostname)
+                expires = self._parse_time(fields['ends'].group(1)) if fields['ends'] else None
+            except ValueError:
+                continue
+            self._leases[ip] = (device, expires)
+        return consumed
+
+    @staticmethod
+    def _parse_time(value: bytes) -> Optional[float]:
+        """
+        ends の値をUNIX時刻に変換する。
+
+        "曜日 YYYY/MM/DD HH:MM:SS"（UTC）、"epoch 秒数"（db-time-format local）、
+        "never"（無期限、Noneを返す）を受け付けます。
+
+        Raises:
+            ValueError: 形式が不正な場合
+        """
+        parts = value.decode('ascii', 'replace').split()
+        if parts == ['never']:
+            return None
+        if len(parts) >= 2 and parts[0] == 'epoch':
+            return float(parts[1])
+        if len(parts) != 3:
+            raise ValueError(f"リースの時刻の形式が不正です: {value!r}")
+        return float(calendar.timegm(time.strptime(f"{parts[1]} {parts[2]}", '%Y/%m/%d %H:%M:%S')))
+
+
+class ArpTableSource(DeviceSource):
+    """
+    カーネルのARPテーブル（/proc/net/arp）。
+
+    有線のデバイスも含まれるため、無線のインターフェースで絞り込んでください。
+    切断したデバイスのエントリは近隣キャッシュの有効期限（数分）まで残るため、
+    切断の検出はポーリング間隔より遅れます。
+    """
+
+    kind = SOURCE_ARP
+
+    def __init__(self, path: str = '/proc/net/arp', name: Optional[str] = None,
+                 interfaces: Optional[List[str]] = None,
+                 leases: Optional[LeaseSource] = None):
+        """
+        ARPテーブルの情報源を初期化する。
+
+        Args:
+            path: ARPテーブルのパス
+            name: 識別名（省略時は 'arp'）
+            interfaces: 対象とするインターフェース名（省略時はすべて）
+            leases: ホスト名を補うDHCPリースファイル（省略時はホスト名なし）
+        """
+        super().__init__(path, name)
+        self.interfaces = set(interfaces) if interfaces else None
+        self.leases = leases
+        self._last_digest = None
+        # MACアドレス -> リースファイルのホスト名
+        self._hostnames: Dict[int, str] = {}
+
+    def watch_paths(self) -> List[str]:
+        # procfs のファイルは inotify で変更を検出できないため、リースファイルのみを監視する
+        return self.leases.watch_paths() if self.leases else []
+
+    def _read_devices(self) -> Optional[List[Device]]:
+        # procfs はサイズ・更新時刻が変わらないため、毎回読み込んで内容で判定する
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        hostnames_changed = False
+        if self.leases is not None:
+            try:
+                leased = self.leases.fetch_connected_devices()
+            except RouterFetchError as e:
+                logging.warning(f"[{self.name}] Failed to read leases: {e}")
+            else:
+                if not self.leases.last_fetch_unchanged:
+                    self._hostnames = {d.mac_int: d.hostname for d in leased}
+                    hostnames_changed = True
+
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest == self._last_digest and not hostnames_changed:
+            return None
+        self._last_digest = digest
+
+        devices = []
+        # 1行目は見出し（IP address, HW type, Flags, HW address, Mask, Device）
+        for line in data.decode('ascii', 'replace').splitlines()[1:]:
+            fields = line.split()
+            if len(fields) < 6:
+                continue
+            ip, _hw_type, flags, mac, _mask, interface = fields[:6]
+            if self.interfaces is not None and interface not in self.interfaces:
+                continue
+            try:
+                if not int(flags, 16) & _ATF_COM:
+                    continue
+                device = Device(mac, ip)
+            except ValueError:
+                continue
+            if device.mac_int == 0:
+                continue
+            device.hostname = self._hostnames.get(device.mac_int, '')
+            devices.append(device)
+        return devices
+
+
+# 情報源の種類 -> クラス
+SOURCES: Dict[str, Type[DeviceSource]] = {}
+
+
+def register_source(kind: str) -> Callable[[Type[DeviceSource]], Type[DeviceSource]]:
+    """
+    情報源のクラスを登録するデコレーター。
+
+    Args:
+        kind: ルータ設定の source に指定する種類
+
+    Raises:
+        TypeError: 抽象メソッドを実装していないクラスを登録しようとした場合
+    """
+    def decorator(cls: Type[DeviceSource]) -> Type[DeviceSource]:
+        if inspect.isabstract(cls):
+            missing = ', '.join(sorted(cls.__abstractmethods__))
+            raise TypeError(f"{cls.__name__} が実装していないメソッドがあります: {missing}")
+        cls.kind = kind
+        SOURCES[kind] = cls
+        return cls
+    return decorator
+
+
+register_source(SOURCE_ARP)(ArpTableSource)
+register_source(SOURCE_DNSMASQ)(DnsmasqLeaseSource)
+register_source(SOURCE_ISC_DHCP)(IscDhcpLeaseSource)
+
+# リースファイルの既定のパス
+DEFAULT_LEASE_PATHS = {
+    SOURCE_DNSMASQ: '/var/lib/misc/dnsmasq.leases',
+    SOURCE_ISC_DHCP: '/var/lib/dhcp/dhcpd.leases',
+}
+
+
+def create_device_source(config: Dict) -> DeviceSource:
+    """
+    ルータ設定（source を指定したもの）から情報源を生成する。
+
+    Args:
+        config: routers リストの要素または router 設定
+
+    Returns:
+        情報源
+
+    Raises:
+        ValueError: 未知の種類が指定された場合
+    """
+    kind = config['source']
+    if kind not in SOURCES:
+        available = ', '.join(sorted(SOURCES))
+        raise ValueError(f"未対応のデバイス情報源です: {kind}（対応する情報源: {available}）")
+
+    name = config.get('name')
+    if kind == SOURCE_ARP:
+        leases = None
+        if config.get('leases'):
+            lease_format = config.get('lease_format', SOURCE_DNSMASQ)
+            if lease_format not in DEFAULT_LEASE_PATHS:
+                raise ValueError(f"未対応のリースファイルの形式です: {lease_format}")
+            leases = SOURCES[lease_format](config['leases'])
+        return ArpTableSource(
+            config.get('path', '/proc/net/arp'), name=name,
+            interfaces=config.get('interfaces'), leases=leases
+        )
+    return SOURCES[kind](config.get('path', DEFAULT_LEASE_PATHS.get(kind, '')), name=name)
+
+
+class FileWatcher:
+    """
+    inotify でファイルの変更を監視し、変更されたファイルのキーでコールバックを呼び出す。
+
+    ファイルの置き換え（一時ファイルからの rename）も検出できるよう、親ディレクトリを
+    監視します。短時間に続く変更は debounce 秒の間まとめて1回の呼び出しにします。
+    inotify を使用できない環境（Linux以外）では start() がFalseを返します。
+    """
+
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    _MASK = 0x2 | 0x8 | 0x80 | 0x100
+    _EVENT = struct.Struct('iIII')
+
+    def __init__(self, callback: Callable[[str], None], debounce: float = 0.2):
+        """
+        監視を初期化する（監視するファイルは add() で追加し、start() で開始します）。
+
+        Args:
+            callback: 変更されたファイルのキーを受け取る関数（監視スレッドで呼び出されます）
+            debounce: 変更をまとめる秒数
+        """
+        self.callback = callback
+        self.debounce = debounce
+        # (ディレクトリ, ファイル名) -> キーのリスト
+        self._files: Dict[Tuple[str, str], List[str]] = {}
+        self._fd: Optional[int] = None
+        self._pipe: Optional[Tuple[int, int]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, path: str, key: str):
+        """
+        監視するファイルを追加する（start() の前に呼び出してください）。
+
+        Args:
+            path: ファイルのパス
+            key: 変更時にコールバックに渡すキー
+        """
+        directory, filename = os.path.split(os.path.abspath(path))
+        self._files.setdefault((directory, filename), []).append(key)
+
+    def start(self) -> bool:
+        """
+        監視を開始する。
+
+        Returns:
+            監視を開始した場合はTrue（inotify を使用できない場合や監視対象がない場合はFalse）
+        """
+        if not self._files:
+            return False
+        try:
+            # inotify は標準ライブラリにないため、libc を直接呼び出す
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            logging.info(f"File change notification unavailable ({e}), using polling only")
+            return False
+        if fd < 0:
+            logging.info("File change notification unavailable, using polling only")
+            return False
+
+        directories: Dict[int, str] = {}
+        for directory in {d for d, _ in self._files}:
+            wd = libc.inotify_add_watch(fd, directory.encode(), self._MASK)
+            if wd < 0:
+                logging.warning(f"Cannot watch {directory} for changes "
+                                f"(errno {ctypes.get_errno()})")
+                continue
+            directories[wd] = directory
+
+        self._fd = fd
+        self._pipe = os.pipe()
+        self._thread = threading.Thread(
+            target=self._run, args=(directories,), name='file-watcher', daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """監視を停止する。"""
+        if self._thread is None:
+            return
+        os.write(self._pipe[1], b'x')
+        self._thread.join(timeout=5)
+        for fd in (self._fd, *self._pipe):
+            os.close(fd)
+        self._thread = None
+
+    def _run(self, directories: Dict[int, str]):
+        """inotify のイベントを読み込み、変更されたファイルのキーを通知する。"""
+        pending: Dict[str, float] = {}
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, min(pending.values()) - time.monotonic())
+            readable, _, _ = select.select([self._fd, self._pipe[0]], [], [], timeout)
+            if self._pipe[0] in readable:
+                return
+            if self._fd in readable:
+                due = time.monotonic() + self.debounce
+                for key in self._read_events(directories):
+                    pending.setdefault(key, due)
+
+            now = time.monotonic()
+            for key in [k for k, due in pending.items() if due <= now]:
+                del pending[key]
+                try:
+                    self.callback(key)
+                except Exception as e:
+                    logging.error(f"Error handling file change for {key}: {e}")
+
+    def _read_events(self, directories: Dict[int, str]) -> List[str]:
+        """読み込み可能な inotify のイベントから、監視対象のファイルのキーを返す。"""
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return []
+        keys = []
+        offset = 0
+        while offset + self._EVENT.size <= len(data):
+            wd, _mask, _cookie, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            filename = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            keys.extend(self._files.get((directories.get(wd), filename), ()))
+        return keys
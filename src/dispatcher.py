@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+通知の非同期ディスパッチキュー
+
+ポーリング処理から通知送信を切り離すため、上限付きのキューと
+ワーカースレッドで通知を送信します。送信に失敗した通知は指数バックオフで
+再試行し、最終的に失敗したものはデッドレターファイルに記録します。
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class NotificationJob:
+    """キューに投入される1件の通知。"""
+
+    def __init__(self, devices: List[Dict[str, str]], suppressed: int = 0):
+        """
+        通知ジョブを初期化する。
+
+        Args:
+            devices: 通知対象のデバイス情報のリスト
+            suppressed: 前回の通知以降にレート制限などで送信しなかった通知の件数
+        """
+        self.devices = devices
+        self.suppressed = suppressed
+        self.attempts = 0
+        self.created_at = time.time()
+
+
+class NotificationDispatcher:
+    """上限付きキューとワーカースレッドで通知を非同期に送信する。"""
+
+    def __init__(self, notifier, workers: int = 1, queue_size: int = 100,
+                 max_retries: int = 3, backoff_base: float = 2.0, backoff_max: float = 300,
+                 enqueue_timeout: float = 5,
+                 dead_letter_file: Optional[str] = 'wifi_notifier_dead_letter.jsonl',
+                 name: str = 'email'):
+        """
+        ディスパッチャーを初期化し、ワーカースレッドを起動する。
+
+        Args:
+            notifier: send_notifications(devices, suppressed) を持つ通知オブジェクト
+            workers: ワーカースレッド数
+            queue_size: キューの最大長
+            max_retries: 初回送信後の最大再試行回数
+            backoff_base: 再試行待機時間の基準秒数（試行ごとに2倍）
+            backoff_max: 再試行待機時間の上限秒数
+            enqueue_timeout: キューが満杯の場合に投入を待つ最大秒数
+            dead_letter_file: 最終的に送信できなかった通知の記録先（Noneの場合は記録しない）
+            name: 通知先の名前（ログとデッドレターの記録に使用）
+        """
+        self.notifier = notifier
+        self.name = name
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.enqueue_timeout = enqueue_timeout
+        self.dead_letter_file = dead_letter_file
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stop_event = threading.Event()
+        self._dead_letter_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f'notifier-{name}-{i}', daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, devices: List[Dict[str, str]], suppressed: int = 0) -> bool:
+        """
+        通知をキューに投入する。
+
+        ダイジェストモードでは全デバイスを1件の通知として、それ以外は
+        デバイスごとに投入します。キューが満杯の場合は1回の呼び出し全体で
+        enqueue_timeout 秒まで待機し（バックプレッシャー）、それでも投入できない
+        通知はデッドレターファイルに記録します。
+
+        Args:
+            devices: 通知対象のデバイス情報のリスト
+            suppressed: 前回の通知以降に送信しなかった通知の件数（最初の通知で報告）
+
+        Returns:
+            すべての通知を投入できた場合はTrue
+        """
+        if not devices:
+            return True
+
+        if getattr(self.notifier, 'digest', False):
+            jobs = [NotificationJob(devices)]
+        else:
+            jobs = [NotificationJob([device]) for device in devices]
+        jobs[0].suppressed = suppressed
+
+        accepted = True
+        # 多数のデバイスを一度に投入してもポーリングを止める時間が enqueue_timeout を超えないよう、
+        # 待機の期限は投入する通知全体で共有する（期限後は待たずにデッドレターに記録する）
+        deadline = time.monotonic() + self.enqueue_timeout
+        for job in jobs:
+            try:
+                self._queue.put(job, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                logging.warning(f"[{self.name}] Notification queue is full, dropping notification")
+                self._write_dead_letter(job, "queue full")
+                accepted = False
+        return accepted
+
+    def pending(self) -> int:
+        """キューで待機中の通知数を返す。"""
+        return self._queue.qsize()
+
+    def _backoff(self, attempts: int) -> float:
+        """再試行までの待機秒数を計算する。"""
+        return min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+
+    def _worker(self):
+        """キューから通知を取り出して送信するワーカー。"""
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._deliver(job)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, job: NotificationJob):
+        """通知を送信し、失敗した場合は指数バックオフで再試行する。"""
+        error = "send failed"
+        while job.attempts <= self.max_retries:
+            job.attempts += 1
+            try:
+                if self.notifier.send_notifications(job.devices, suppressed=job.suppressed):
+                    return
+            except Exception as e:
+                error = str(e)
+                logging.error(f"[{self.name}] Notification dispatch error: {e}")
+
+            if job.attempts > self.max_retries or self._stop_event.is_set():
+                break
+
+            delay = self._backoff(job.attempts)
+            logging.warning(
+                f"[{self.name}] Notification failed (attempt {job.attempts}), "
+                f"retrying in {delay:.1f}s"
+            )
+            # 停止要求があった場合は待機を打ち切る
+            if self._stop_event.wait(delay):
+                break
+
+        self._write_dead_letter(job, error)
+
+    def _write_dead_letter(self, job: NotificationJob, error: str):
+        """送信できなかった通知をデッドレターファイルに記録する。"""
+        logging.error(
+            f"[{self.name}] Notification for {len(job.devices)} device(s) "
+            f"failed permanently: {error}"
+        )
+        if not self.dead_letter_file:
+            return
+
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'notifier': self.name,
+            'created_at': datetime.fromtimestamp(job.created_at).isoformat(timespec='seconds'),
+            'attempts': job.attempts,
+            'suppressed': job.suppressed,
+            'error': error,
+            'devices': [dict(device.items()) for device in job.devices],
+        }
+        try:
+            with self._dead_letter_lock:
+                with open(self.dead_letter_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except Exception as e:
+            logging.error(f"Failed to write dead letter: {e}")
+
+    def close(self, timeout: float = 60):
+        """
+        キューに残っている通知を送信してからワーカーを停止する。
+
+        timeout 秒以内に送信しきれなかった通知は再試行を打ち切り、
+        デッドレターファイルに記録します。
+
+        Args:
+            timeout: 送信完了を待つ最大秒数
+        """
+        deadline = time.monotonic() + timeout
+        for _ in self._workers:
+            try:
+                # キューが満杯のまま空かない場合も timeout を超えて待たない
+                self._queue.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                # 再試行待ちを打ち切って残りの通知を処理させる（停止の目印は入れられない）
+                logging.warning(f"[{self.name}] Notification queue still full at shutdown, "
+                                f"aborting retries")
+                self._stop_event.set()
+                break
+
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+
+        if any(worker.is_alive() for worker in self._workers):
+            # 再試行待ちを打ち切り、残りの通知をデッドレターに記録させる
+            self._stop_event.set()
+            for worker in self._workers:
+                worker.join(5)
+
+        # 停止の目印を入れられなかった場合などに残った通知をデッドレターに記録する
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._write_dead_letter(job, "shutdown")
@@ -6,78 +6,178 @@ WiFiルータクライアント - Webスクレイピングを使用した代替
 Webインターフェースからデバイス情報をスクレイピングする関数を提供します。
 """
 
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 import re
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict
 
+from src.device import Device
 
-def parse_wireless_lan_status(html_content: str) -> List[Dict[str, str]]:
+
+# MACアドレスパターン: XX:XX:XX:XX:XX:XX
+MAC_PATTERN = re.compile(r'([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})')
+# IPv4アドレスパターン
+IP_PATTERN = re.compile(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}')
+
+# parse_wireless_lan_status で選択できるパーサー
+PARSER_FAST = 'fast'
+PARSER_BS4 = 'bs4'
+
+
+class _TableCellCollector(HTMLParser):
     """
-    無線LANステータスページを解析して接続デバイスを抽出する。
+    テーブル内の各行のセル（td）テキストを収集するストリーミングパーサー。
     
-    この関数は一般的なルータのHTML形式の解析を試みます。
+    BeautifulSoupのようにドキュメントツリーを構築せず、タグのイベントから
+    行ごとのセルテキストのリストだけを組み立てます。
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: List[List[str]] = []
+        self._table_depth = 0
+        self._row = None
+        self._cell = None
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self._table_depth += 1
+        elif not self._table_depth:
+            return
+        elif tag == 'tr':
+            self._end_row()
+            self._row = []
+        elif tag == 'td' and self._row is not None:
+            # 終了タグが省略されたセルは次のセルの開始で閉じる
+            self._end_cell()
+            self._cell = []
+    
+    def handle_endtag(self, tag):
+        if tag == 'td':
+            self._end_cell()
+        elif tag == 'tr':
+            self._end_row()
+        elif tag == 'table' and self._table_depth:
+            self._end_row()
+            self._table_depth -= 1
+    
+    def handle_data(self, data):
+        if self._cell is not None:
+            # get_text(strip=True) と同様に、各テキスト片をstripして連結する
+            text = data.strip()
+            if text:
+                self._cell.append(text)
+    
+    def _end_cell(self):
+        if self._cell is not None:
+            self._row.append(''.join(self._cell))
+            self._cell = None
+    
+    def _end_row(self):
+        self._end_cell()
+        if self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+
+def _extract_devices_from_rows(rows: Iterable[List[str]]) -> List[Device]:
+    """
+    テーブル行のセルテキストからデバイス情報を抽出する。
     
     Args:
-        html_content: ルータの無線ステータスページからのHTMLコンテンツ
+        rows: 各行のセルテキストのリスト
         
     Returns:
-        デバイス情報を含む辞書のリスト
+        デバイス情報のリスト
     """
     devices = []
+    mac_search = MAC_PATTERN.search
+    ip_search = IP_PATTERN.search
     
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # デバイス情報を含むテーブルを検索
-        tables = soup.find_all('table')
+    for cells in rows:
+        if len(cells) < 2:
+            continue
         
-        for table in tables:
-            rows = table.find_all('tr')
+        # MACアドレスパターンを探す
+        for i, text in enumerate(cells):
+            mac_match = mac_search(text)
+            if not mac_match:
+                continue
+            
+            ip = ''
+            hostname = ''
+            
+            # 近くのセルからIPアドレスを取得を試みる
+            if i + 1 < len(cells):
+                ip_match = ip_search(cells[i + 1])
+                if ip_match:
+                    ip = ip_match.group(0)
+            
+            # ホスト名を取得を試みる
+            if i > 0:
+                prev_text = cells[i - 1]
+                if prev_text and not mac_search(prev_text):
+                    hostname = prev_text
             
-            for row in rows:
-                cells = row.find_all('td')
-                
-                if len(cells) >= 2:
-                    # MACアドレスパターンを探す
-                    for i, cell in enumerate(cells):
-                        text = cell.get_text(strip=True)
-                        
-                        # MACアドレスパターン: XX:XX:XX:XX:XX:XX
-                        mac_pattern = r'([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})'
-                        mac_match = re.search(mac_pattern, text)
-                        
-                        if mac_match:
-                            device = {
-                                'mac': mac_match.group(0).upper(),
-                                'ip': '',
-                                'hostname': ''
-                            }
-                            
-                            # 近くのセルからIPアドレスを取得を試みる
-                            if i + 1 < len(cells):
-                                next_text = cells[i + 1].get_text(strip=True)
-                                ip_pattern = r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}'
-                                ip_match = re.search(ip_pattern, next_text)
-                                if ip_match:
-                                    device['ip'] = ip_match.group(0)
-                            
-                            # ホスト名を取得を試みる
-                            if i > 0:
-                                prev_text = cells[i - 1].get_text(strip=True)
-                                if prev_text and not re.search(mac_pattern, prev_text):
-                                    device['hostname'] = prev_text
-                            
-                            devices.append(device)
-                            break
+            # MACアドレスはパターンに一致しているため、そのまま整数に変換できる
+            devices.append(Device(mac_match.group(0), ip, hostname))
+            break
+    
+    return devices
+
+
+def _iter_bs4_rows(html_content: str) -> Iterator[List[str]]:
+    """BeautifulSoupでドキュメントツリーを構築し、テーブル行のセルテキストを返す。"""
+    # BeautifulSoup の読み込みは重いため、使用する場合にのみ読み込む
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    # デバイス情報を含むテーブルを検索
+    for table in soup.find_all('table'):
+        for row in table.find_all('tr'):
+            yield [cell.get_text(strip=True) for cell in row.find_all('td')]
+
+
+def _parse_rows_fast(html_content: str) -> List[List[str]]:
+    """ストリーミングパーサーでテーブル行のセルテキストを収集する。"""
+    collector = _TableCellCollector()
+    collector.feed(html_content)
+    collector.close()
+    collector._end_row()
+    return collector.rows
+
+
+def parse_wireless_lan_status(html_content: str,
+                              parser: str = PARSER_FAST) -> List[Device]:
+    """
+    無線LANステータスページを解析して接続デバイスを抽出する。
+    
+    この関数は一般的なルータのHTML形式の解析を試みます。
+    デフォルトではドキュメントツリーを構築しないストリーミングパーサーを使用し、
+    解析に失敗した場合はBeautifulSoupによる解析にフォールバックします。
+    
+    Args:
+        html_content: ルータの無線ステータスページからのHTMLコンテンツ
+        parser: 使用するパーサー（'fast' または 'bs4'、デフォルト: 'fast'）
         
-        return devices
+    Returns:
+        デバイス情報のリスト（Device は辞書と同様に参照できます）
+    """
+    if parser == PARSER_FAST:
+        try:
+            return _extract_devices_from_rows(_parse_rows_fast(html_content))
+        except Exception as e:
+            print(f"Fast HTML parser failed, falling back to BeautifulSoup: {e}")
+    
+    try:
+        return _extract_devices_from_rows(_iter_bs4_rows(html_content))
         
     except Exception as e:
         print(f"Error parsing HTML: {e}")
         return []
 
 
-def extract_devices_from_json(json_data: Dict) -> List[Dict[str, str]]:
+def extract_devices_from_json(json_data: Dict) -> List[Device]:
     """
     JSONレスポンスからデバイス情報を抽出する。
     
@@ -87,7 +187,7 @@ def extract_devices_from_json(json_data: Dict) -> List[Dict[str, str]]:
         json_data: ルータからのJSONレスポンス
         
     Returns:
-        デバイス情報を含む辞書のリスト
+        デバイス情報のリスト（Device は辞書と同様に参照できます）
     """
     devices = []
     
@@ -112,14 +212,19 @@ def extract_devices_from_json(json_data: Dict) -> List[Dict[str, str]]:
         
         for client in client_list:
             if isinstance(client, dict):
-                device = {
-                    'mac': client.get('mac', client.get('macaddr', '')).upper(),
-                    'ip': client.get('ip', client.get('ipaddr', '')),
-                    'hostname': client.get('hostname', client.get('name', ''))
-                }
-                
-                if device['mac']:
-                    devices.append(device)
+                mac = client.get('mac', client.get('macaddr', ''))
+                if not mac:
+                    continue
+                try:
+                    device = Device(
+                        mac,
+                        client.get('ip', client.get('ipaddr', '')),
+                        client.get('hostname', client.get('name', ''))
+                    )
+                except ValueError:
+                    # MACアドレスとして解釈できないエントリは無視する
+                    continue
+                devices.append(device)
         
         return devices
         
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+非同期ロギングパイプライン
+
+ポーリングスレッドからはログレコードをキューに投入するだけにし、ファイル・
+コンソールへの書き込みは QueueListener のバックグラウンドスレッドで行います。
+ログファイルはサイズまたは時刻でローテーションし、ディスク使用量を抑えます。
+
+また、デバイスの接続・切断・属性変更を1行1件のJSONで記録するイベントログを
+提供します。
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime
+from typing import Dict, List, Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# ローテーション方式
+ROTATION_SIZE = 'size'
+ROTATION_TIME = 'time'
+ROTATION_NONE = 'none'
+
+# イベントの種別
+EVENT_CONNECT = 'connect'
+EVENT_DISCONNECT = 'disconnect'
+EVENT_CHANGE = 'change'
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """キューが満杯の場合はレコードを破棄し、ログ出力で呼び出し元を待たせない。"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def create_file_handler(path: str, rotation: str = ROTATION_SIZE,
+                        max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                        when: str = 'midnight') -> logging.Handler:
+    """
+    ローテーション設定に応じたファイルハンドラーを作成する。
+
+    Args:
+        path: ログファイルのパス
+        rotation: ローテーション方式（'size'、'time' または 'none'）
+        max_bytes: サイズローテーションでのファイルサイズの上限（バイト）
+        backup_count: 保持する過去ファイルの数
+        when: 時刻ローテーションの単位（'midnight'、'H'、'D' など）
+
+    Returns:
+        ファイルハンドラー
+
+    Raises:
+        ValueError: 未知のローテーション方式が指定された場合
+    """
+    if rotation == ROTATION_SIZE:
+        return logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+    if rotation == ROTATION_TIME:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8'
+        )
+    if rotation == ROTATION_NONE:
+        return logging.FileHandler(path, encoding='utf-8')
+    raise ValueError(f"未知のログローテーション方式です: {rotation}")
+
+
+class LoggingPipeline:
+    """キューを介してバックグラウンドスレッドでログを書き出す。"""
+
+    def __init__(self, handlers: List[logging.Handler], queue_size: int = 10000):
+        """
+        パイプラインを初期化する。
+
+        Args:
+            handlers: 実際に書き込みを行うハンドラー
+            queue_size: キューの最大長（超えた分のログは破棄、0以下で無制限）
+        """
+        self.handlers = handlers
+        self.queue: queue.Queue = queue.Queue(max(0, queue_size))
+        self.queue_handler = _DroppingQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *handlers, respect_handler_level=True
+        )
+        self._running = False
+
+    @property
+    def dropped(self) -> int:
+        """キューが満杯で破棄したログの件数。"""
+        return self.queue_handler.dropped
+
+    def start(self):
+        """バックグラウンドスレッドを開始する。"""
+        if not self._running:
+            self.listener.start()
+            self._running = True
+
+    def stop(self):
+        """キューに残ったログを書き出してスレッドを停止し、ハンドラーを閉じる。"""
+        if not self._running:
+            return
+        self._running = False
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+
+# 現在ルートロガーに設定されているパイプライン
+_active_pipeline: Optional[LoggingPipeline] = None
+
+
+def setup_logging(level: str = 'INFO', log_file: str = 'wifi_notifier.log',
+                  config: Optional[Dict] = None) -> LoggingPipeline:
+    """
+    ルートロガーを非同期ロギングパイプラインで設定する。
+
+    既に設定済みのパイプラインがある場合は停止してから置き換えます。
+    プロセス終了時には、キューに残ったログを書き出してから停止します。
+
+    Args:
+        level: ログレベル
+        log_file: ログファイルのパス
+        config: config.yaml の logging 設定
+
+    Returns:
+        設定したパイプライン
+    """
+    global _active_pipeline
+    config = config or {}
+
+    file_handler = create_file_handler(
+        log_file,
+        rotation=config.get('rotation', ROTATION_SIZE),
+        max_bytes=config.get('max_bytes', 10 * 1024 * 1024),
+        backup_count=config.get('backup_count', 5),
+        when=config.get('when', 'midnight')
+    )
+    handlers = [file_handler, logging.StreamHandler()]
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if _active_pipeline is not None:
+        _active_pipeline.stop()
+    else:
+        atexit.register(_stop_active_pipeline)
+
+    pipeline = LoggingPipeline(handlers, queue_size=config.get('queue_size', 10000))
+    # 書式は書き込み側のハンドラーで適用するため、キューにはメッセージのみを渡す
+    pipeline.queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    pipeline.start()
+    _active_pipeline = pipeline
+
+    logging.basicConfig(
+        level=getattr(logging, level),
+        handlers=[pipeline.queue_handler],
+        force=True
+    )
+    return pipeline
+
+
+def _stop_active_pipeline():
+    """プロセス終了時に現在のパイプラインを停止する。"""
+    if _active_pipeline is not None:
+        _active_pipeline.stop()
+
+
+class _JSONEventFormatter(logging.Formatter):
+    """イベントレコードを1行のJSONに変換する。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(),
+            **getattr(record, 'event', {}),
+        }
+        return json.dumps(event, ensure_ascii=False)
+
+
+class EventLog:
+    """デバイスの接続・切断・属性変更を記録するJSON Lines形式のイベントログ。"""
+
+    def __init__(self, path: str, rotation: str = ROTATION_SIZE,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 when: str = 'midnight', queue_size: int = 10000):
+        """
+        イベントログを初期化する。
+
+        Args:
+            path: イベントログのパス
+            rotation: ローテーション方式（'size'、'time' または 'none'）
+            max_bytes: サイズローテーションでのファイルサイズの上限（バイト）
+            backup_count: 保持する過去ファイルの数
+            when: 時刻ローテーションの単位
+            queue_size: キューの最大長
+        """
+        handler = create_file_handler(path, rotation, max_bytes, backup_count, when)
+        handler.setFormatter(_JSONEventFormatter())
+        self.pipeline = LoggingPipeline([handler], queue_size=queue_size)
+        self.pipeline.start()
+
+        # 通常のログに混ざらないよう、専用のロガーを使用する
+        self.logger = logging.getLogger(f"wifi_notifier.events.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(self.pipeline.queue_handler)
+
+    def record(self, event: str, router: str, mac: str,
+               device: Optional[Dict[str, str]] = None, **fields):
+        """
+        イベントを記録する。
+
+        Args:
+            event: イベントの種別（EVENT_CONNECT など）
+            router: ルータ名
+            mac: MACアドレス
+            device: デバイス情報（ip、hostname を記録する）
+            **fields: 追加で記録する項目
+        """
+        data = {'event': event, 'router': router, 'mac': mac}
+        if device:
+            data['ip'] = device.get('ip', '')
+            data['hostname'] = device.get('hostname', '')
+        data.update(fields)
+        self.logger.info(event, extra={'event': data})
+
+    def close(self):
+        """キューに残ったイベントを書き出してイベントログを閉じる。"""
+        self.logger.removeHandler(self.pipeline.queue_handler)
+        self.pipeline.stop()
+
+
+def create_event_log(config: Optional[Dict]) -> Optional[EventLog]:
+    """
+    設定からイベントログを作成する。
+
+    Args:
+        config: config.yaml の event_log 設定
+
+    Returns:
+        イベントログ（無効の場合はNone）
+    """
+    if not config or not config.get('enabled', False):
+        return None
+    return EventLog(
+        config.get('path', 'wifi_notifier_events.jsonl'),
+        rotation=config.get('rotation', ROTATION_SIZE),
+        max_bytes=config.get('max_bytes', 10 * 1024 * 1024),
+        backup_count=config.get('backup_count', 5),
+        when=config.get('when', 'midnight'),
+        queue_size=config.get('queue_size', 10000)
+    )
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Prometheus形式のメトリクス
+
+ログイン・取得・解析・差分計算・通知の各段階の処理回数と所要時間（ヒストグラム）、
+ルータごとの接続デバイス数、最後にポーリングに成功した時刻、SMTPの失敗回数を
+収集します。収集したメトリクスはPrometheusのテキスト形式で、HTTPエンドポイント
+（/metrics）から提供するか、node_exporter の textfile collector 用のファイルに書き出します。
+"""
+
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# 所要時間ヒストグラムのバケット（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 処理段階
+STAGE_LOGIN = 'login'
+STAGE_FETCH = 'fetch'
+STAGE_PARSE = 'parse'
+STAGE_DIFF = 'diff'
+STAGE_NOTIFY = 'notify'
+
+
+def _escape(value: str) -> str:
+    """ラベル値をPrometheusのテキスト形式用にエスケープする。"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """ラベルを {name="value",...} 形式に変換する。"""
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    """数値をPrometheusのテキスト形式に変換する。"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """ラベル付きメトリクスの基底クラス。"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        """ラベルの辞書を、ラベル名の順に並べた値のタプルに変換する。"""
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """(サンプル名, ラベル名, ラベル値, 値) のリストを返す。"""
+
+    def render(self) -> str:
+        """Prometheusのテキスト形式に変換する。"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for sample_name, names, values, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(names, values)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """単調増加するカウンター。"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        """カウンターを増やす。"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """現在の値を返す。"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labelnames, key, value)
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """任意に増減する値。"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        """値を設定する。"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        """現在の値を返す。"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labelnames, key, value)
+                    for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """観測値の分布（バケットごとの件数・合計・件数）。"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # ラベル値 -> [バケットごとの件数..., 合計, 件数]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        """観測値を記録する。"""
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        names = self.labelnames + ('le',)
+        result = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    result.append((f"{self.name}_bucket", names,
+                                   key + (_format_value(bound),), cumulative))
+                result.append((f"{self.name}_sum", self.labelnames, key, state[-2]))
+                result.append((f"{self.name}_count", self.labelnames, key, state[-1]))
+        return result
+
+
+class MetricsRegistry:
+    """メトリクスを登録し、まとめてテキスト形式に変換する。"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"メトリクス名が重複しています: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """カウンターを登録する。"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """ゲージを登録する。"""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """ヒストグラムを登録する。"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """登録済みの全メトリクスをPrometheusのテキスト形式に変換する。"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+    def write_textfile(self, path: str):
+        """
+        メトリクスをファイルに書き出す（node_exporter の textfile collector 用）。
+
+        読み込み途中のファイルが読まれないよう、一時ファイルに書いてから置き換えます。
+
+        Args:
+            path: 書き出し先のパス（拡張子は .prom）
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+# アプリケーション全体で共有するレジストリとメトリクス
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'wifi_notifier_stage_duration_seconds',
+    'Time spent in each polling stage.',
+    ('stage', 'router')
+)
+STAGE_TOTAL = REGISTRY.counter(
+    'wifi_notifier_stage_total',
+    'Number of times each polling stage ran, by result.',
+    ('stage', 'router', 'result')
+)
+DEVICES_CONNECTED = REGISTRY.gauge(
+    'wifi_notifier_devices_connected',
+    'Number of devices currently connected to each router.',
+    ('router',)
+)
+LAST_SUCCESS = REGISTRY.gauge(
+    'wifi_notifier_last_success_timestamp_seconds',
+    'Unix time of the last successful poll of each router.',
+    ('router',)
+)
+SMTP_FAILURES = REGISTRY.counter(
+    'wifi_notifier_smtp_failures_total',
+    'Number of SMTP failures, by kind.',
+    ('kind',)
+)
+
+
+class _StageTimer:
+    """time_stage が返す、段階の結果を失敗として記録するためのオブジェクト。"""
+
+    def __init__(self):
+        self.ok = True
+
+    def fail(self):
+        """例外を送出せずに失敗した場合に呼び出す。"""
+        self.ok = False
+
+
+@contextmanager
+def time_stage(stage: str, router: str = '') -> Iterator[_StageTimer]:
+    """
+    処理段階の所要時間と結果を記録するコンテキストマネージャー。
+
+    ブロック内で例外が発生した場合、または fail() が呼ばれた場合は失敗として記録します。
+
+    Args:
+        stage: 処理段階（STAGE_LOGIN など）
+        router: ルータ名（ルータに依存しない段階では空文字列）
+    """
+    timer = _StageTimer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    except BaseException:
+        timer.ok = False
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage, router=router)
+        STAGE_TOTAL.inc(stage=stage, router=router, result='ok' if timer.ok else 'error')
+
+
+def record_poll_success(router: str, device_count: int):
+    """
+    ルータのポーリング成功を記録する。
+
+    Args:
+        router: ルータ名
+        device_count: 接続中のデバイス数
+    """
+    DEVICES_CONNECTED.set(device_count, router=router)
+    LAST_SUCCESS.set(time.time(), router=router)
+
+
+class MetricsServer:
+    """メトリクスをHTTP（/metrics）で提供する軽量サーバー。"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = '127.0.0.1',
+                 port: int = 9108):
+        """
+        サーバーを初期化する。
+
+        Args:
+            registry: 提供するメトリクスのレジストリ
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional['ThreadingHTTPServer'] = None
+
+    def start(self):
+        """バックグラウンドスレッドでサーバーを起動する。"""
+        # http.server はメトリクスを有効にした場合にのみ読み込む
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                data = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logging.debug(f"Metrics request: {format % args}")
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+        logging.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """サーバーを停止する。"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+メール以外の通知バックエンド
+
+新しいデバイス接続の通知先として、メール（EmailNotifier）に加えて以下を提供します。
+通知先は config.yaml の notifiers で指定します。
+
+- webhook: Slack/Discord 形式または汎用のJSONをPOST（接続プールを使用）
+- command: ローカルのコマンドを実行し、標準入力にJSONを渡す
+- file: JSON Lines形式でファイルに追記
+- syslog: syslog（ローカルのソケットまたはUDP/TCP）に送信
+
+各バックエンドは send_notifications(devices, suppressed) と close() を持ちます。
+NotifierGroup は複数のバックエンドへ並行して送信し、バックエンドごとの
+タイムアウトで待機を打ち切るため、応答の遅いバックエンドが他の通知を遅らせません。
+
+独自のバックエンドを追加する場合は Notifier を継承したクラスを作成し、
+register_notifier デコレーターで登録してください。
+"""
+
+import inspect
+import json
+import logging
+import logging.handlers
+import os
+import shlex
+import socket
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Type
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Webhookの本文形式
+WEBHOOK_SLACK = 'slack'
+WEBHOOK_DISCORD = 'discord'
+WEBHOOK_JSON = 'json'
+
+
+def build_payload(devices: List[Dict[str, str]], suppressed: int = 0) -> Dict:
+    """
+    通知内容をJSONに変換できる辞書にする。
+
+    Args:
+        devices: デバイス情報のリスト
+        suppressed: 前回の通知以降に送信しなかった通知の件数
+
+    Returns:
+        'event'、'time'、'devices'、'suppressed' を含む辞書
+    """
+    return {
+        'event': 'connect',
+        'time': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'devices': [
+            {
+                'mac': device.get('mac', ''),
+                'ip': device.get('ip', ''),
+                'hostname': device.get('hostname', ''),
+                'vendor': device.get('vendor', ''),
+            }
+            for device in devices
+        ],
+        'suppressed': suppressed,
+    }
+
+
+def format_text(devices: List[Dict[str, str]], suppressed: int = 0) -> str:
+    """
+    チャットやsyslog向けの短い通知文を作成する。
+
+    Args:
+        devices: デバイス情報のリスト
+        suppressed: 前回の通知以降に送信しなかった通知の件数
+
+    Returns:
+        通知文
+    """
+    lines = [f"新しいWiFi接続を検出: {len(devices)}台"]
+    for device in devices:
+        lines.append(
+            f"- {device.get('hostname') or device.get('vendor') or 'Unknown'} "
+            f"({device.get('mac', 'Unknown')}, {device.get('ip') or 'IP不明'})"
+        )
+    if suppressed > 0:
+        lines.append(f"（前回の通知以降、{suppressed}件の通知を省略しました）")
+    return "\n".join(lines)
+
+
+class Notifier(ABC):
+    """通知バックエンドの基底クラス（from_config と send を実装してください）。"""
+
+    # config.yaml の notifiers[].type に指定する種別（register_notifier で設定）
+    kind = ''
+
+    def __init__(self, name: str, timeout: float = 10, digest: bool = True):
+        """
+        通知バックエンドを初期化する。
+
+        Args:
+            name: バックエンド名（ログ・デッドレターの記録に使用）
+            timeout: 1回の送信のタイムアウト秒数
+            digest: 複数デバイスを1回の送信にまとめるか
+        """
+        self.name = name
+        self.timeout = timeout
+        self.digest = digest
+
+    @classmethod
+    @abstractmethod
+    def from_config(cls, config: Dict) -> 'Notifier':
+        """
+        notifiers の1項目からバックエンドを作成する。
+
+        Args:
+            config: バックエンドの設定
+
+        Returns:
+            バックエンドのインスタンス
+        """
+
+    @abstractmethod
+    def send(self, devices: List[Dict[str, str]], suppressed: int) -> None:
+        """
+        通知を送信する（失敗時は例外を送出）。
+
+        Args:
+            devices: デバイス情報のリスト
+            suppressed: 前回の通知以降に送信しなかった通知の件数
+        """
+
+    def send_notifications(self, devices: List[Dict[str, str]], suppressed: int = 0) -> bool:
+        """
+        通知を送信する。
+
+        digest がFalseの場合はデバイスごとに送信します。
+
+        Args:
+            devices: デバイス情報のリスト
+            suppressed: 前回の通知以降に送信しなかった通知の件数（最初の送信に含めます）
+
+        Returns:
+            すべての送信に成功した場合はTrue
+        """
+        if not devices:
+            return True
+        batches = [devices] if self.digest else [[device] for device in devices]
+        ok = True
+        for i, batch in enumerate(batches):
+            try:
+                self.send(batch, suppressed if i == 0 else 0)
+            except Exception as e:
+                logging.error(f"Notifier '{self.name}' failed: {e}")
+                ok = False
+        return ok
+
+    def close(self):
+        """保持中のリソースを解放する。"""
+
+
+# 種別 -> バックエンドクラス
+NOTIFIERS: Dict[str, Type[Notifier]] = {}
+
+
+def register_notifier(kind: str) -> Callable[[Type[Notifier]], Type[Notifier]]:
+    """
+    バックエンドクラスを登録するデコレーター。
+
+    Args:
+        kind: config.yaml の notifiers[].type に指定する種別
+
+    Raises:
+        TypeError: from_config または send を実装していないクラスを登録しようとした場合
+    """
+    def decorator(cls: Type[Notifier]) -> Type[Notifier]:
+        if inspect.isabstract(cls):
+            missing = ', '.join(sorted(cls.__abstractmethods__))
+            raise TypeError(f"{cls.__name__} が実装していないメソッドがあります: {missing}")
+        cls.kind = kind
+        NOTIFIERS[kind.lower()] = cls
+        return cls
+    return decorator
+
+
+def create_notifier(config: Dict) -> Notifier:
+    """
+    notifiers の1項目からバックエンドを作成する。
+
+    Args:
+        config: バックエンドの設定（'type' キーで種別を指定）
+
+    Returns:
+        バックエンドのインスタンス
+
+    Raises:
+        ValueError: 未登録の種別が指定された場合
+    """
+    kind = str(config.get('type', '')).lower()
+    if kind not in NOTIFIERS:
+        available = ', '.join(sorted(NOTIFIERS))
+        raise ValueError(f"未対応の通知先です: {config.get('type')}（対応: {available}）")
+    return NOTIFIERS[kind].from_config(config)
+
+
+@register_notifier('webhook')
+class WebhookNotifier(Notifier):
+    """Webhook（HTTP POST）による通知。"""
+
+    def __init__(self, url: str, name: str = 'webhook', fmt: str = WEBHOOK_SLACK,
+                 timeout: float = 5, headers: Optional[Dict[str, str]] = None,
+                 digest: bool = True, pool_size: int = 4):
+        """
+        Webhook通知を初期化する。
+
+        Args:
+            url: POST先のURL
+            name: バックエンド名
+            fmt: 本文形式（'slack'、'discord' または 'json'）
+            timeout: 接続・応答のタイムアウト秒数
+            headers: 追加のHTTPヘッダー
+            digest: 複数デバイスを1回のPOSTにまとめるか
+            pool_size: 保持する接続の最大数
+
+        Raises:
+            ValueError: 未知の本文形式が指定された場合
+        """
+        super().__init__(name, timeout, digest)
+        if fmt not in (WEBHOOK_SLACK, WEBHOOK_DISCORD, WEBHOOK_JSON):
+            raise ValueError(f"未知のWebhook形式です: {fmt}")
+        self.url = url
+        self.fmt = fmt
+        # 送信ごとに接続し直さないよう、接続プール付きのセッションを使い回す
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(headers or {})
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'WebhookNotifier':
+        return cls(
+            config['url'],
+            name=config.get('name', 'webhook'),
+            fmt=config.get('format', WEBHOOK_SLACK),
+            timeout=config.get('timeout', 5),
+            headers=config.get('headers'),
+            digest=config.get('digest', True),
+            pool_size=config.get('pool_size', 4)
+        )
+
+    def _body(self, devices: List[Dict[str, str]], suppressed: int) -> Dict:
+        """本文形式に応じたJSONを作成する。"""
+        if self.fmt == WEBHOOK_SLACK:
+            return {'text': format_text(devices, suppressed)}
+        if self.fmt == WEBHOOK_DISCORD:
+            return {'content': format_text(devices, suppressed)}
+        return build_payload(devices, suppressed)
+
+    def send(self, devices: List[Dict[str, str]], suppressed: int) -> None:
+        response = self.session.post(
+            self.url, json=self._body(devices, suppressed), timeout=self.timeout
+        )
+        if response.status_code >= 300:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    def close(self):
+        self.session.close()
+
+
+@register_notifier('command')
+class CommandNotifier(Notifier):
+    """ローカルのコマンドを実行する通知（標準入力に通知内容のJSONを渡す）。"""
+
+    def __init__(self, command: Sequence[str], name: str = 'command', timeout: float = 10,
+                 digest: bool = True):
+        """
+        コマンド通知を初期化する。
+
+        コマンドはシェルを介さずに実行します。環境変数 WIFI_NOTIFIER_COUNT に
+        デバイス数を、WIFI_NOTIFIER_MACS に空白区切りのMACアドレスを設定します。
+
+        Args:
+            command: 実行するコマンド（引数のリスト、または空白区切りの文字列）
+            name: バックエンド名
+            timeout: コマンドの実行時間の上限（秒、超えた場合は強制終了）
+            digest: 複数デバイスを1回の実行にまとめるか
+        """
+        super().__init__(name, timeout, digest)
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        if not self.command:
+            raise ValueError("command が指定されていません")
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'CommandNotifier':
+        return cls(
+            config['command'],
+            name=config.get('name', 'command'),
+            timeout=config.get('timeout', 10),
+            digest=config.get('digest', True)
+        )
+
+    def send(self, devices: List[Dict[str, str]], suppressed: int) -> None:
+        env = {
+            'WIFI_NOTIFIER_COUNT': str(len(devices)),
+            'WIFI_NOTIFIER_MACS': ' '.join(device.get('mac', '') for device in devices),
+        }
+        result = subprocess.run(
+            self.command,
+            input=json.dumps(build_payload(devices, suppressed), ensure_ascii=False),
+            capture_output=True, text=True, timeout=self.timeout,
+            env={**os.environ, **env}
+        )
+        if result.returncode != 0:
+            stderr = result.stderr.strip().splitlines()
+            raise RuntimeError(
+                f"exit status {result.returncode}" + (f": {stderr[-1]}" if stderr else "")
+            )
+
+
+@register_notifier('file')
+class FileNotifier(Notifier):
+    """JSON Lines形式でファイルに追記する通知。"""
+
+    def __init__(self, path: str, name: str = 'file', timeout: float = 5, digest: bool = True):
+        """
+        ファイル通知を初期化する。
+
+        Args:
+            path: 追記するファイルのパス
+            name: バックエンド名
+            timeout: 1回の送信のタイムアウト秒数
+            digest: 複数デバイスを1行にまとめるか
+        """
+        super().__init__(name, timeout, digest)
+        self.path = path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'FileNotifier':
+        return cls(
+            config.get('path', 'wifi_notifier_notifications.jsonl'),
+            name=config.get('name', 'file'),
+            timeout=config.get('timeout', 5),
+            digest=config.get('digest', True)
+        )
+
+    def send(self, devices: List[Dict[str, str]], suppressed: int) -> None:
+        line = json.dumps(build_payload(devices, suppressed), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class _RaisingSysLogHandler(logging.handlers.SysLogHandler):
+    """送信エラーを握りつぶさずに呼び出し元へ送出する SysLogHandler。"""
+
+    def handleError(self, record: logging.LogRecord):
+        # emit() の except 節から呼ばれるため、処理中の例外をそのまま送出する
+        raise
+
+
+@register_notifier('syslog')
+class SyslogNotifier(Notifier):
+    """syslog に送信する通知。"""
+
+    def __init__(self, address='/dev/log', name: str = 'syslog', facility: str = 'user',
+                 protocol: str = 'udp', timeout: float = 5, digest: bool = False):
+        """
+        syslog通知を初期化する。
+
+        Args:
+            address: ローカルのソケットのパス、または [ホスト, ポート]
+            name: バックエンド名
+            facility: syslogのファシリティ（'user'、'local0' など）
+            protocol: リモートへの送信に使用するプロトコル（'udp' または 'tcp'）
+            timeout: 1回の送信のタイムアウト秒数
+            digest: 複数デバイスを1つのメッセージにまとめるか（デフォルトはデバイスごと）
+        """
+        super().__init__(name, timeout, digest)
+        if isinstance(address, (list, tuple)):
+            address = (address[0], int(address[1]))
+        socktype = socket.SOCK_STREAM if protocol == 'tcp' else socket.SOCK_DGRAM
+        self.handler = _RaisingSysLogHandler(
+            address=address,
+            facility=logging.handlers.SysLogHandler.facility_names[facility],
+            socktype=socktype if isinstance(address, tuple) else None
+        )
+        self.handler.setFormatter(logging.Formatter('wifi-notifier: %(message)s'))
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'SyslogNotifier':
+        return cls(
+            address=config.get('address', '/dev/log'),
+            name=config.get('name', 'syslog'),
+            facility=config.get('facility', 'user'),
+            protocol=config.get('protocol', 'udp'),
+            timeout=config.get('timeout', 5),
+            digest=config.get('digest', False)
+        )
+
+    def send(self, devices: List[Dict[str, str]], suppressed: int) -> None:
+        record = logging.LogRecord(
+            'wifi_notifier', logging.INFO, __file__, 0,
+            format_text(devices, suppressed).replace('\n', ' '), None, None
+        )
+        self.handler.handle(record)
+
+    def close(self):
+        self.handler.close()
+
+
+class NotifierGroup:
+    """複数の通知バックエンドへ並行して送信する。"""
+
+    def __init__(self, notifiers: List):
+        """
+        通知バックエンドのグループを初期化する。
+
+        バックエンドごとに専用のスレッドで送信するため、応答しないバックエンドが
+        あっても他のバックエンドの送信は妨げられません。notifiers は後から
+        置き換えることができます（スレッドはバックエンド名ごとに再利用します）。
+
+        Args:
+            notifiers: name 属性と send_notifications(devices, suppressed) を持つ
+                通知オブジェクトのリスト
+        """
+        self.notifiers = notifiers
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+
+    def _executor(self, notifier) -> ThreadPoolExecutor:
+        """バックエンド専用のスレッドを取得する（未作成の場合は作成）。"""
+        name = _name(notifier)
+        executor = self._executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'notify-{name}')
+            self._executors[name] = executor
+        return executor
+
+    def send_notifications(self, devices: List[Dict[str, str]], suppressed: int = 0) -> bool:
+        """
+        すべてのバックエンドへ並行して送信し、バックエンドごとのタイムアウトまで待つ。
+
+        タイムアウトしたバックエンドの送信はバックグラウンドで継続します。
+
+        Args:
+            devices: デバイス情報のリスト
+            suppressed: 前回の通知以降に送信しなかった通知の件数
+
+        Returns:
+            すべてのバックエンドがタイムアウト内に送信に成功した場合はTrue
+        """
+        if not devices:
+            return True
+        notifiers = list(self.notifiers)
+        started = time.monotonic()
+        futures = [
+            self._executor(notifier).submit(
+                notifier.send_notifications, devices, suppressed=suppressed
+            )
+            for notifier in notifiers
+        ]
+
+        ok = True
+        for notifier, future in zip(notifiers, futures):
+            # デバイスごとに送信するバックエンドは送信回数分だけ待機時間を延ばす
+            sends = 1 if getattr(notifier, 'digest', False) else len(devices)
+            deadline = started + getattr(notifier, 'timeout', 30) * sends
+            try:
+                ok = future.result(timeout=max(0.0, deadline - time.monotonic())) and ok
+            except FutureTimeoutError:
+                logging.warning(f"Notifier '{_name(notifier)}' timed out")
+                ok = False
+            except Exception as e:
+                logging.error(f"Notifier '{_name(notifier)}' failed: {e}")
+                ok = False
+        return ok
+
+    def close(self):
+        """送信用のスレッドを停止する（バックエンド自体は閉じません）。"""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+        self._executors.clear()
+
+
+def _name(notifier) -> str:
+    """通知オブジェクトの名前（ログ用）。"""
+    return getattr(notifier, 'name', type(notifier).__name__)
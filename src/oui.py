@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+MACアドレスのOUIによるベンダー名の検索
+
+IEEE の登録簿（MA-L: 24ビット、MA-M: 28ビット、MA-S: 36ビット）から作成した
+索引ファイルを読み込み、MACアドレスの先頭のプレフィックスからベンダー名を求めます。
+ルータがホスト名を返さないデバイスの通知に、ベンダー名を付加するために使用します。
+
+索引ファイルは scripts/build_oui_index.py で登録簿のCSVから作成します。
+プレフィックスの幅ごとのオープンアドレス法のハッシュ表と、ベンダー名の
+文字列表を固定長の配列として格納しているため、起動時に登録簿を解析せず、
+ファイルをメモリマップするだけで使用できます（検索はO(1)）。
+
+索引ファイル（ネイティブのバイトオーダー、各セクションは8バイト境界に配置）:
+
+- ヘッダー: マジック、バイトオーダー、ベンダー数、表ごとの (幅, スロット数のビット数, 項目数)
+- 表ごと: キー（プレフィックス+1、0は空き。36ビットは uint64、それ以外は uint32）、
+  値（uint32、ベンダー番号）
+- ベンダー名の開始位置（uint32、ベンダー数+1）と UTF-8 の文字列
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 索引ファイルの既定のパス（リポジトリの data ディレクトリ）
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'oui.idx'
+)
+# プレフィックスの幅（ビット数、検索ではより長いプレフィックスを優先する）
+PREFIX_WIDTHS = (36, 28, 24)
+# ローカル管理アドレス（ランダム化されたMACアドレスなど）を示すビット
+LOCALLY_ADMINISTERED = 0x02 << 40
+
+_MAGIC = b'OUI1'
+_HEADER = struct.Struct('<4sBxxxI')
+_TABLE = struct.Struct('<III')
+# フィボナッチハッシュの乗数（2^64 / 黄金比）
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+def _slot(key: int, bits: int) -> int:
+    """キーのハッシュ表での初期位置を返す。"""
+    return ((key * _HASH_MULTIPLIER) & _MASK64) >> (64 - bits)
+
+
+def _key_format(width: int) -> str:
+    """プレフィックスの幅に応じたキーの配列の型コードを返す。"""
+    return 'Q' if width > 31 else 'I'
+
+
+def _align(offset: int) -> int:
+    """8バイト境界に切り上げる。"""
+    return (offset + 7) & ~7
+
+
+def is_locally_administered(mac: int) -> bool:
+    """
+    ローカル管理アドレス（端末がランダムに生成したアドレスなど）かどうかを返す。
+
+    ローカル管理アドレスはIEEEの登録簿に含まれないため、ベンダー名は求められません。
+
+    Args:
+        mac: MACアドレスを表す整数
+    """
+    return bool(mac & LOCALLY_ADMINISTERED)
+
+
+class VendorIndex:
+    """メモリマップした索引ファイルによるベンダー名の検索。"""
+
+    def __init__(self, buffer):
+        """
+        索引を初期化する。
+
+        Args:
+            buffer: 索引ファイルの内容（mmap または bytes）
+
+        Raises:
+            ValueError: 索引ファイルの形式が不正な場合
+        """
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size + _TABLE.size * len(PREFIX_WIDTHS):
+            raise ValueError("OUI索引ファイルが短すぎます")
+        magic, byteorder, vendor_count = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError("OUI索引ファイルではありません")
+        if byteorder != (sys.byteorder == 'big'):
+            raise ValueError("異なるバイトオーダーの環境で作成されたOUI索引です（作成し直してください）")
+
+        self._buffer = buffer
+        # (幅, スロット数のビット数, キー, 値)
+        self._tables: List[Tuple[int, int, memoryview, memoryview]] = []
+        self._count = 0
+        offset = _HEADER.size
+        layout = []
+        for _ in PREFIX_WIDTHS:
+            layout.append(_TABLE.unpack_from(view, offset))
+            offset += _TABLE.size
+        offset = _align(offset)
+
+        try:
+            for width, bits, count in layout:
+                self._count += count
+                slots = 1 << bits if bits else 0
+                key_format = _key_format(width)
+                key_size = struct.calcsize(key_format)
+                keys = view[offset:offset + slots * key_size].cast(key_format)
+                offset = _align(offset + slots * key_size)
+                values = view[offset:offset + slots * 4].cast('I')
+                offset = _align(offset + slots * 4)
+                if len(keys) != slots or len(values) != slots:
+                    raise ValueError("OUI索引ファイルが途中で切れています")
+                if slots:
+                    self._tables.append((width, bits, keys, values))
+            self._offsets = view[offset:offset + (vendor_count + 1) * 4].cast('I')
+            if len(self._offsets) != vendor_count + 1:
+                raise ValueError("OUI索引ファイルが途中で切れています")
+            self._names = view[_align(offset + (vendor_count + 1) * 4):]
+        except TypeError as e:
+            raise ValueError(f"OUI索引ファイルの形式が不正です: {e}")
+        self.vendor_count = vendor_count
+        # ベンダー番号 -> デコード済みのベンダー名（検索されたものだけを保持する）
+        self._decoded: Dict[int, str] = {}
+
+    @classmethod
+    def open(cls, path: str) -> 'VendorIndex':
+        """
+        索引ファイルをメモリマップして開く。
+
+        Args:
+            path: 索引ファイルのパス
+
+        Returns:
+            索引
+
+        Raises:
+            OSError: ファイルを開けない場合
+            ValueError: 索引ファイルの形式が不正な場合
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError("OUI索引ファイルが空です")
+            # ファイルを閉じてもマップは有効
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        """登録されているプレフィックスの数。"""
+        return self._count
+
+    def lookup(self, mac: int) -> Optional[str]:
+        """
+        MACアドレスのベンダー名を返す。
+
+        Args:
+            mac: MACアドレスを表す整数
+
+        Returns:
+            ベンダー名（ローカル管理アドレスや未登録のプレフィックスの場合はNone）
+        """
+        if mac & LOCALLY_ADMINISTERED:
+            return None
+        for width, bits, keys, values in self._tables:
+            key = (mac >> (48 - width)) + 1
+            mask = (1 << bits) - 1
+            slot = _slot(key, bits)
+            while True:
+                found = keys[slot]
+                if found == key:
+                    return self._vendor(values[slot])
+                if not found:
+                    break
+                slot = (slot + 1) & mask
+        return None
+
+    def _vendor(self, number: int) -> str:
+        """ベンダー番号のベンダー名を返す。"""
+        name = self._decoded.get(number)
+        if name is None:
+            start, end = self._offsets[number], self._offsets[number + 1]
+            name = self._decoded[number] = str(self._names[start:end], 'utf-8')
+        return name
+
+
+def write_index(entries: Iterable[Tuple[int, int, str]], path: str) -> int:
+    """
+    登録簿の項目から索引ファイルを作成する。
+
+    Args:
+        entries: (プレフィックスの幅, プレフィックス, ベンダー名) のタプル
+        path: 出力先のパス（一時ファイルに書き込んでから置き換えます）
+
+    Returns:
+        登録したプレフィックスの数
+
+    Raises:
+        ValueError: 未対応の幅のプレフィックスが含まれる場合、項目がない場合
+    """
+    vendors: Dict[str, int] = {}
+    prefixes: Dict[int, Dict[int, int]] = {width: {} for width in PREFIX_WIDTHS}
+    for width, prefix, vendor in entries:
+        if width not in prefixes:
+            raise ValueError(f"未対応のプレフィックスの幅です: {width}")
+        prefixes[width][prefix] = vendors.setdefault(vendor, len(vendors))
+    if not vendors:
+        # 使用中の索引ファイルを空の索引で置き換えない
+        raise ValueError("登録簿の項目がありません")
+
+    header = bytearray(_HEADER.pack(_MAGIC, sys.byteorder == 'big', len(vendors)))
+    sections = []
+    for width in PREFIX_WIDTHS:
+        table = prefixes[width]
+        # 負荷率を50%以下に保ち、線形探索の長さを短くする
+        bits = max(len(table) * 2 - 1, 1).bit_length() if table else 0
+        header += _TABLE.pack(width, bits, len(table))
+        if not table:
+            continue
+        slots = 1 << bits
+        keys = array(_key_format(width), bytes(struct.calcsize(_key_format(width)) * slots))
+        values = array('I', bytes(4 * slots))
+        for prefix, number in table.items():
+            key = prefix + 1
+            slot = _slot(key, bits)
+            while keys[slot]:
+                slot = (slot + 1) & (slots - 1)
+            keys[slot] = key
+            values[slot] = number
+        sections += [keys.tobytes(), values.tobytes()]
+
+    names = [vendor.encode('utf-8') for vendor in vendors]
+    offsets = array('I', [0])
+    for name in names:
+        offsets.append(offsets[-1] + len(name))
+    sections += [offsets.tobytes(), b''.join(names)]
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for section in sections:
+            f.write(bytes(_align(f.tell()) - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, path)
+    return sum(len(table) for table in prefixes.values())
+
+
+# --- 通知で使用する既定の索引 ---
+
+_lock = threading.Lock()
+_index_path: Optional[str] = DEFAULT_INDEX_PATH
+_index: Optional[VendorIndex] = None
+_loaded = False
+
+
+def configure_vendor_lookup(config: Optional[Dict]):
+    """
+    config.yaml の oui 設定を反映する（索引ファイルは最初の検索で読み込みます）。
+
+    Args:
+        config: oui 設定（省略時は既定のパスの索引ファイルを使用）
+    """
+    global _index_path, _index, _loaded
+    config = config or {}
+    enabled = config.get('enabled', True)
+    with _lock:
+        _index_path = config.get('path', DEFAULT_INDEX_PATH) if enabled else None
+        _index = None
+        _loaded = False
+
+
+def _get_index() -> Optional[VendorIndex]:
+    """既定の索引を返す（初回は索引ファイルを読み込む、使用できない場合はNone）。"""
+    global _index, _loaded
+    if _loaded:
+        return _index
+    with _lock:
+        if not _loaded:
+            if _index_path:
+                try:
+                    _index = VendorIndex.open(_index_path)
+                    logging.debug(f"Loaded OUI index {_index_path} ({_index.vendor_count} vendors)")
+                except FileNotFoundError:
+                    logging.info(f"Vendor lookup disabled: OUI index not found at {_index_path} "
+                                 f"(build it with scripts/build_oui_index.py)")
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Vendor lookup disabled: cannot load {_index_path}: {e}")
+            _loaded = True
+    return _index
+
+
+def lookup_vendor(mac: int) -> Optional[str]:
+    """
+    既定の索引でMACアドレスのベンダー名を検索する。
+
+    Args:
+        mac: MACアドレスを表す整数
+
+    Returns:
+        ベンダー名（索引がない場合や未登録の場合はNone）
+    """
+    index = _get_index()
+    return index.lookup(mac) if index is not None else None
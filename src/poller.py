@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+複数ルータ並行ポーリングエンジン
+
+スレッドプールを使用して複数のポーリングジョブを同時に実行します。
+各ジョブは個別のスケジュール（間隔・ジッター・適応調整）を持ち、応答の遅い
+ルータが他のルータのポーリングを妨げないようにスケジューリングされます。
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Callable, Dict, List, Optional
+
+from src.scheduler import OUTCOME_FAILED, AdaptiveSchedule
+
+
+class PollJob:
+    """ポーリングエンジンに登録される1件のジョブ。"""
+
+    def __init__(self, name: str, func: Callable[[], Optional[str]],
+                 schedule: AdaptiveSchedule):
+        """
+        ジョブを初期化する。
+
+        Args:
+            name: ジョブ名（ルータ名など）
+            func: 1回分のポーリング処理（ポーリング結果の種別を返す）
+            schedule: 実行間隔を決めるスケジュール
+        """
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        # 初回はすぐに実行するが、複数ジョブの開始時刻はジッターの範囲で分散させる
+        self.slot: Optional[float] = None
+        self.next_due = time.monotonic() + abs(schedule.jitter_offset())
+        self.future: Optional[Future] = None
+        # 投入してから次回実行時刻を設定し終えるまでの間 True（_on_job_done でのみ解除する）
+        self.in_flight = False
+        # 実行中に trigger() され、完了後すぐに再実行するか
+        self.triggered = False
+
+    @property
+    def running(self) -> bool:
+        """ジョブが実行中かどうか（完了後の次回実行時刻の設定が終わるまでを含む）。"""
+        return self.in_flight
+
+
+class PollingEngine:
+    """複数のポーリングジョブをスレッドプールで並行実行する。"""
+
+    def __init__(self, max_workers: int = 8):
+        """
+        ポーリングエンジンを初期化する。
+
+        Args:
+            max_workers: 同時に実行するジョブの最大数
+        """
+        self.max_workers = max(1, max_workers)
+        self.jobs: Dict[str, PollJob] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+
+    def add_job(self, name: str, func: Callable[[], Optional[str]], interval: float,
+                schedule: Optional[AdaptiveSchedule] = None):
+        """
+        ポーリングジョブを登録する。
+
+        Args:
+            name: ジョブ名（一意である必要があります）
+            func: 1回分のポーリング処理（ポーリング結果の種別を返す）
+            interval: 実行間隔（秒）
+            schedule: 実行間隔を決めるスケジュール（省略時はジッターなしの固定間隔）
+        """
+        if schedule is None:
+            schedule = AdaptiveSchedule(interval, adaptive=False, jitter=0)
+        self.jobs[name] = PollJob(name, func, schedule)
+        self._wakeup.set()
+
+    def remove_job(self, name: str):
+        """
+        ポーリングジョブを登録解除する（実行中の処理は完了まで継続します）。
+
+        Args:
+            name: ジョブ名
+        """
+        self.jobs.pop(name, None)
+        self._wakeup.set()
+
+    def update_job(self, name: str, func: Optional[Callable[[], Optional[str]]] = None,
+                   schedule: Optional[AdaptiveSchedule] = None):
+        """
+        登録済みジョブの処理またはスケジュールを置き換える（実行中の処理は完了まで継続します）。
+
+        スケジュールを置き換えた場合、待機中のジョブの次回実行時刻は
+        新しい間隔を超えないように前倒しされます。
+
+        Args:
+            name: ジョブ名
+            func: 新しいポーリング処理（省略時は変更しない）
+            schedule: 新しいスケジュール（省略時は変更しない）
+        """
+        job = self.jobs[name]
+        if func is not None:
+            job.func = func
+        if schedule is not None:
+            job.schedule = schedule
+            if job.slot is not None and not job.running:
+                job.next_due = min(job.next_due, job.slot + schedule.current_interval)
+        self._wakeup.set()
+
+    def trigger(self, name: str):
+        """
+        ジョブを次回実行時刻を待たずに実行する（実行中の場合は完了後すぐに再実行します）。
+
+        ファイルの変更通知など、ポーリングの間隔より早く変化を検出できる場合に使用します。
+        未登録のジョブ名は無視します。
+
+        Args:
+            name: ジョブ名
+        """
+        job = self.jobs.get(name)
+        if job is None:
+            return
+        # 実行中の場合、next_due は完了時に上書きされる
+        job.triggered = job.running
+        job.next_due = time.monotonic()
+        self._wakeup.set()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """スレッドプールを取得する（未作成の場合は作成）。"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='poller'
+            )
+        return self._executor
+
+    def _run_job(self, job: PollJob):
+        """ジョブを実行し、結果をスケジュールに記録して次回実行時刻を設定する。"""
+        try:
+            try:
+                outcome = job.func()
+            except Exception as e:
+                logging.error(f"Polling job '{job.name}' failed: {e}")
+                outcome = OUTCOME_FAILED
+            job.schedule.record(outcome)
+        finally:
+            # future の完了より前に設定し、run_forever が古い next_due で再投入しないようにする
+            self._on_job_done(job)
+
+    def _on_job_done(self, job: PollJob):
+        """ジョブ完了時に、前回の予定時刻を基準とした固定周期で次回実行時刻を設定する。"""
+        now = time.monotonic()
+        job.slot = job.schedule.next_slot(job.slot, now)
+        job.next_due = max(now, job.slot + job.schedule.jitter_offset())
+        if job.triggered:
+            job.triggered = False
+            job.next_due = now
+        job.in_flight = False
+        self._wakeup.set()
+
+    def _submit(self, job: PollJob):
+        """ジョブをスレッドプールに投入する。"""
+        if job.slot is None:
+            job.slot = time.monotonic()
+        job.triggered = False
+        job.in_flight = True
+        job.future = self._get_executor().submit(self._run_job, job)
+        # stop() で実行前に取り消された場合は _run_job が呼ばれないため、ここで解除する
+        job.future.add_done_callback(lambda f, j=job: f.cancelled() and self._on_job_done(j))
+
+    def run_once(self):
+        """登録済みの全ジョブを1回ずつ並行実行し、すべての完了を待つ。"""
+        jobs = list(self.jobs.values())
+        for job in jobs:
+            if not job.running:
+                self._submit(job)
+        wait([job.future for job in jobs if job.future is not None])
+
+    def run_forever(self):
+        """
+        stop() が呼ばれるまで各ジョブを個別の間隔で繰り返し実行する。
+
+        実行中のジョブは次回実行時刻になっても再投入されないため、
+        応答の遅いルータの処理が積み重なることはありません。
+        """
+        self._stop_event.clear()
+
+        while not self._stop_event.is_set():
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_wakeup: Optional[float] = None
+
+            for job in list(self.jobs.values()):
+                if job.running:
+                    continue
+                if job.next_due <= now:
+                    self._submit(job)
+                    continue
+                if next_wakeup is None or job.next_due < next_wakeup:
+                    next_wakeup = job.next_due
+
+            timeout = None if next_wakeup is None else max(0.0, next_wakeup - now)
+            # ジョブ完了・追加・停止のいずれかで即座に再評価する
+            self._wakeup.wait(timeout)
+
+    def stop(self):
+        """ポーリングを停止し、スレッドプールを終了する。"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def running_jobs(self) -> List[str]:
+        """実行中のジョブ名のリストを返す。"""
+        return [job.name for job in self.jobs.values() if job.running]
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+デバイスの在席履歴
+
+デバイスの接続から切断までを1件の区間としてSQLiteに記録します。ポーリングごとの
+サンプルではなく接続・切断のイベントだけを保存するため、1分間隔のポーリングを
+1年間続けてもデータ量は接続・切断の回数に比例した大きさに収まります。
+MACアドレスは48ビットの整数、時刻はUNIX時刻（秒）の整数で保存します。
+
+区間はMACアドレスと開始時刻のインデックス、および時刻範囲のR-Treeインデックスで
+検索でき、次の問い合わせに高速に応答します。
+
+- あるデバイスの指定期間の在席区間
+- ある時刻に接続していたデバイスの一覧
+
+使用方法:
+    python -m src.presence_history wifi_notifier_history.db intervals AA:BB:CC:DD:EE:FF --days 30
+    python -m src.presence_history wifi_notifier_history.db online --at 2026-10-01T12:00
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+from src.device import format_mac, parse_mac
+
+# R-Treeインデックス上で接続中（未終了）の区間の終了時刻として使用する値
+OPEN_END = 1e11
+
+
+class PresenceInterval(NamedTuple):
+    """デバイスが接続していた1つの区間。"""
+
+    router: str
+    mac: str
+    started_at: int
+    ended_at: Optional[int]  # 接続中の場合はNone
+
+    def duration(self, now: Optional[float] = None) -> float:
+        """区間の長さ（秒、接続中の場合は現在時刻まで）。"""
+        end = self.ended_at if self.ended_at is not None else (now or time.time())
+        return end - self.started_at
+
+
+class PresenceHistory:
+    """デバイスの在席区間をSQLiteに記録・検索する。"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS intervals (
+            id INTEGER PRIMARY KEY,
+            router TEXT NOT NULL,
+            mac INTEGER NOT NULL,
+            started_at INTEGER NOT NULL,
+            ended_at INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS intervals_mac ON intervals (mac, started_at);
+        CREATE INDEX IF NOT EXISTS intervals_started ON intervals (started_at);
+        CREATE INDEX IF NOT EXISTS intervals_open ON intervals (router, mac)
+            WHERE ended_at IS NULL;
+    """
+
+    def __init__(self, path: str):
+        """
+        在席履歴を初期化する。
+
+        Args:
+            path: SQLiteデータベースファイルのパス
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        self.rtree = self._create_rtree()
+
+    def _create_rtree(self) -> bool:
+        """時刻範囲のR-Treeインデックスを作成する（R-Tree非対応のSQLiteではFalse）。"""
+        try:
+            self._conn.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS intervals_time '
+                'USING rtree(id, t_start, t_end)'
+            )
+        except sqlite3.OperationalError:
+            logging.debug("SQLite R-Tree module is not available, using B-tree index only")
+            return False
+        return True
+
+    def record(self, router: str, connected_macs: Iterable[Union[int, str]],
+               disconnected_macs: Iterable[Union[int, str]], timestamp: Optional[float] = None):
+        """
+        1回分のポーリングで検出した接続・切断を記録する。
+
+        Args:
+            router: ルータ名
+            connected_macs: 新たに接続されたMACアドレス
+            disconnected_macs: 切断されたMACアドレス
+            timestamp: 検出時刻（UNIX時刻、省略時は現在時刻）
+        """
+        now = int(timestamp if timestamp is not None else time.time())
+        connected = [parse_mac(mac) for mac in connected_macs]
+        disconnected = [parse_mac(mac) for mac in disconnected_macs]
+        if not connected and not disconnected:
+            return
+
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute('BEGIN')
+            try:
+                self._close(cur, router, disconnected, now)
+                self._open(cur, router, connected, now)
+                cur.execute('COMMIT')
+            except Exception:
+                cur.execute('ROLLBACK')
+                raise
+
+    def sync_router(self, router: str, current_macs: Iterable[Union[int, str]],
+                    timestamp: Optional[float] = None):
+        """
+        ルータの接続中デバイスに合わせて接続中の区間を揃える。
+
+        前回の実行で開いたままになった区間のうち、現在接続していないデバイスの区間を
+        閉じ、接続中なのに区間がないデバイスの区間を開きます。監視開始時の
+        初期デバイスリスト取得後に呼び出します。
+
+        Args:
+            router: ルータ名
+            current_macs: 現在接続中のMACアドレス
+            timestamp: 取得時刻（UNIX時刻、省略時は現在時刻）
+        """
+        now = int(timestamp if timestamp is not None else time.time())
+        current = {parse_mac(mac) for mac in current_macs}
+
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute('BEGIN')
+            try:
+                open_macs = {
+                    mac for (mac,) in cur.execute(
+                        'SELECT mac FROM intervals WHERE router = ? AND ended_at IS NULL',
+                        (router,)
+                    )
+                }
+                self._close(cur, router, list(open_macs - current), now)
+                self._open(cur, router, list(current - open_macs), now)
+                cur.execute('COMMIT')
+            except Exception:
+                cur.execute('ROLLBACK')
+                raise
+
+    def _open(self, cur: sqlite3.Cursor, router: str, macs: List[int], now: int):
+        """接続中の区間を作成する。"""
+        for mac in macs:
+            cur.execute(
+                'INSERT INTO intervals (router, mac, started_at) VALUES (?, ?, ?)',
+                (router, mac, now)
+            )
+            if self.rtree:
+                cur.execute(
+                    'INSERT INTO intervals_time (id, t_start, t_end) VALUES (?, ?, ?)',
+                    (cur.lastrowid, now, OPEN_END)
+                )
+
+    def _close(self, cur: sqlite3.Cursor, router: str, macs: List[int], now: int):
+        """接続中の区間を閉じる。"""
+        for mac in macs:
+            rows = cur.execute(
+                'SELECT id FROM intervals WHERE router = ? AND mac = ? AND ended_at IS NULL',
+                (router, mac)
+            ).fetchall()
+            for (interval_id,) in rows:
+                cur.execute('UPDATE intervals SET ended_at = ? WHERE id = ?', (now, interval_id))
+                if self.rtree:
+                    cur.execute('UPDATE intervals_time SET t_end = ? WHERE id = ?',
+                                (now, interval_id))
+
+    def intervals(self, mac: Union[int, str], since: Optional[float] = None,
+                  until: Optional[float] = None,
+                  router: Optional[str] = None) -> List[PresenceInterval]:
+        """
+        デバイスの在席区間を取得する。
+
+        Args:
+            mac: MACアドレス
+            since: 期間の開始（UNIX時刻、省略時は制限なし）
+            until: 期間の終了（UNIX時刻、省略時は制限なし）
+            router: ルータ名（省略時は全ルータ）
+
+        Returns:
+            期間と重なる在席区間のリスト（開始時刻順）
+        """
+        sql = 'SELECT router, mac, started_at, ended_at FROM intervals WHERE mac = ?'
+        params: List = [parse_mac(mac)]
+        if until is not None:
+            sql += ' AND started_at < ?'
+            params.append(int(until))
+        if since is not None:
+            sql += ' AND (ended_at IS NULL OR ended_at > ?)'
+            params.append(int(since))
+        if router is not None:
+            sql += ' AND router = ?'
+            params.append(router)
+        sql += ' ORDER BY started_at'
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [PresenceInterval(r, format_mac(m), s, e) for r, m, s, e in rows]
+
+    def online_at(self, timestamp: float, router: Optional[str] = None) -> List[PresenceInterval]:
+        """
+        指定時刻に接続していたデバイスの在席区間を取得する。
+
+        Args:
+            timestamp: 時刻（UNIX時刻）
+            router: ルータ名（省略時は全ルータ）
+
+        Returns:
+            指定時刻を含む在席区間のリスト（ルータ名・MACアドレス順）
+        """
+        t = int(timestamp)
+        if self.rtree:
+            # R-Treeは座標を丸めて保持するため、候補を絞り込んだ後に正確な時刻で判定する
+            sql = (
+                'SELECT i.router, i.mac, i.started_at, i.ended_at '
+                'FROM intervals_time r JOIN intervals i ON i.id = r.id '
+                'WHERE r.t_start <= ? AND r.t_end >= ? '
+                'AND i.started_at <= ? AND (i.ended_at IS NULL OR i.ended_at > ?)'
+            )
+            params: List = [t, t, t, t]
+        else:
+            sql = (
+                'SELECT router, mac, started_at, ended_at FROM intervals '
+                'WHERE started_at <= ? AND (ended_at IS NULL OR ended_at > ?)'
+            )
+            params = [t, t]
+        if router is not None:
+            sql += ' AND router = ?'
+            params.append(router)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return sorted(PresenceInterval(r, format_mac(m), s, e) for r, m, s, e in rows)
+
+    def close(self):
+        """データベース接続を閉じる。"""
+        with self._lock:
+            self._conn.close()
+
+
+def create_presence_history(config: Optional[Dict]) -> Optional[PresenceHistory]:
+    """
+    設定から在席履歴を作成する。
+
+    Args:
+        config: config.yaml の presence_history 設定
+
+    Returns:
+        在席履歴（無効の場合はNone）
+    """
+    if not config or not config.get('enabled', False):
+        return None
+    path = config.get('path', 'wifi_notifier_history.db')
+    logging.info(f"Recording presence history to {path}")
+    return PresenceHistory(path)
+
+
+def _parse_time(value: str) -> float:
+    """ISO 8601形式の日時（タイムゾーン省略時はローカル時刻）をUNIX時刻に変換する。"""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _format_time(timestamp: Optional[float]) -> str:
+    """UNIX時刻をローカル時刻の文字列に変換する。"""
+    if timestamp is None:
+        return '(接続中)'
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _format_duration(seconds: float) -> str:
+    """秒数を H:MM:SS 形式に変換する。"""
+    return str(timedelta(seconds=int(seconds)))
+
+
+def main():
+    """メインエントリーポイント。"""
+    # コマンドラインでの検索時のみ使用するため、監視プロセスの起動時には読み込まない
+    import argparse
+
+    parser = argparse.ArgumentParser(description="デバイスの在席履歴を検索する")
+    parser.add_argument('database', help="在席履歴のSQLiteファイル")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    intervals_parser = subparsers.add_parser('intervals', help="デバイスの在席区間を表示する")
+    intervals_parser.add_argument('mac', help="MACアドレス")
+    intervals_parser.add_argument('--days', type=float, default=30,
+                                  help="現在から遡る日数（デフォルト: 30）")
+    intervals_parser.add_argument('--router', help="ルータ名で絞り込む")
+
+    online_parser = subparsers.add_parser('online', help="指定時刻に接続していたデバイスを表示する")
+    online_parser.add_argument('--at', help="日時（例: 2026-10-01T12:00、省略時は現在）")
+    online_parser.add_argument('--router', help="ルータ名で絞り込む")
+
+    args = parser.parse_args()
+
+    at = None
+    if args.command == 'online' and args.at:
+        try:
+            at = _parse_time(args.at)
+        except ValueError:
+            parser.error(f"日時の形式が不正です: {args.at}（例: 2026-10-01T12:00）")
+    # 存在しないパスを指定した場合に空のデータベースを作成しない
+    if not os.path.isfile(args.database):
+        parser.error(f"在席履歴のファイルがありません: {args.database}")
+
+    try:
+        history = PresenceHistory(args.database)
+    except sqlite3.Error as e:
+        print(f"在席履歴を開けません: {e}")
+        sys.exit(1)
+
+    try:
+        now = time.time()
+        if args.command == 'intervals':
+            since = now - args.days * 86400
+            try:
+                results = history.intervals(args.mac, since=since, router=args.router)
+            except ValueError as e:
+                print(f"エラー: {e}")
+                sys.exit(1)
+            total = 0.0
+            for interval in results:
+                # 期間の開始より前から接続していた区間は、期間内の長さのみを集計する
+                start = max(interval.started_at, since)
+                end = interval.ended_at if interval.ended_at is not None else now
+                total += end - start
+                print(f"{interval.router}\t{_format_time(interval.started_at)}\t"
+                      f"{_format_time(interval.ended_at)}\t"
+                      f"{_format_duration(interval.duration(now))}")
+            print(f"\n{len(results)} 区間、合計 {_format_duration(total)}（過去 {args.days:g} 日間）")
+        else:
+            if at is None:
+                at = now
+            results = history.online_at(at, router=args.router)
+            for interval in results:
+                print(f"{interval.router}\t{interval.mac}\t"
+                      f"{_format_time(interval.started_at)} から接続")
+            print(f"\n{_format_time(at)} に接続していたデバイス: {len(results)} 台")
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+デバイスの在席状態のデバウンス
+
+バンドの切り替えや無線のスリープでデバイスが1回のポーリングだけデバイスリストから
+消えても、再接続のたびに新規接続として通知しないよう在席状態を管理します。
+在席と不在の判定には異なるしきい値（ヒステリシス）を使用します。
+
+- absence_grace: 切断とみなすまでの不在時間（秒）。この時間内に再び現れた
+  デバイスは新規接続として扱いません
+- connect_delay: 新規接続とみなすまでの在席時間（秒）。この時間より前に
+  いなくなったデバイスは通知しません
+
+不在・確認待ちのデバイスだけを期限順のヒープで管理するため、1回のポーリングの
+処理量はデバイスの総数ではなく、変化したデバイスと期限を迎えたデバイスの数に
+比例します。
+"""
+
+import heapq
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 切断とみなすまでの不在時間のデフォルト（秒）
+DEFAULT_ABSENCE_GRACE = 300
+# ヒープ内の古い項目がこの数と有効な項目の数の合計を超えたらヒープを作り直す
+_HEAP_SLACK = 64
+
+
+class PresenceChanges:
+    """1回の更新で確定した在席状態の変化。"""
+
+    def __init__(self):
+        """空の変化を初期化する。"""
+        # 新規接続として確定したMACのリスト
+        self.arrived: List[int] = []
+        # 猶予時間内に再び現れたMACのリスト（新規接続として扱わない）
+        self.returned: List[int] = []
+        # 切断として確定した (MAC, 最終検出時刻) のリスト
+        self.departed: List[Tuple[int, float]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.arrived or self.returned or self.departed)
+
+
+class _RouterPresence:
+    """1台のルータの不在・確認待ちのデバイス。"""
+
+    __slots__ = ('last_poll', 'absent', 'absent_heap', 'pending', 'pending_heap')
+
+    def __init__(self):
+        # 前回の更新時刻（接続中デバイスの最終検出時刻）
+        self.last_poll: Optional[float] = None
+        # MAC -> 最終検出時刻
+        self.absent: Dict[int, float] = {}
+        self.absent_heap: List[Tuple[float, int]] = []
+        # MAC -> 初回検出時刻
+        self.pending: Dict[int, float] = {}
+        self.pending_heap: List[Tuple[float, int]] = []
+
+
+class PresenceTracker:
+    """ルータごとのデバイスの在席状態を猶予時間付きで判定する。"""
+
+    def __init__(self, absence_grace: float = 0, connect_delay: float = 0):
+        """
+        在席状態の判定を初期化する。
+
+        Args:
+            absence_grace: 切断とみなすまでの不在時間（秒、0で即座に切断）
+            connect_delay: 新規接続とみなすまでの在席時間（秒、0で即座に接続）
+        """
+        self.absence_grace = 0.0
+        self.connect_delay = 0.0
+        self.configure(absence_grace, connect_delay)
+        self._routers: Dict[str, _RouterPresence] = {}
+
+    def configure(self, absence_grace: float, connect_delay: float):
+        """
+        しきい値を変更する（判定中のデバイスは次回の更新から新しいしきい値で判定します）。
+
+        Args:
+            absence_grace: 切断とみなすまでの不在時間（秒）
+            connect_delay: 新規接続とみなすまでの在席時間（秒）
+        """
+        self.absence_grace = max(0.0, float(absence_grace))
+        self.connect_delay = max(0.0, float(connect_delay))
+
+    def _state(self, router: str) -> _RouterPresence:
+        """ルータの状態を取得する（未登録の場合は作成）。"""
+        state = self._routers.get(router)
+        if state is None:
+            state = self._routers.setdefault(router, _RouterPresence())
+        return state
+
+    def restore_absent(self, router: str, last_seen: Dict[int, float]):
+        """
+        前回の実行までに切断されたデバイスを不在として登録する。
+
+        再起動や --single-run の実行をまたいでも猶予時間内の再接続を
+        新規接続として扱わないようにするために使用します。
+
+        Args:
+            router: ルータ名
+            last_seen: MACアドレスから最終検出時刻への辞書
+        """
+        state = self._state(router)
+        for mac, seen in last_seen.items():
+            self._mark_absent(state, mac, seen)
+
+    def update(self, router: str, connected: Iterable[int], disconnected: Iterable[int],
+               timestamp: Optional[float] = None,
+               departed_at: Optional[float] = None) -> PresenceChanges:
+        """
+        デバイスリストの差分を反映し、確定した在席状態の変化を返す。
+
+        Args:
+            router: ルータ名
+            connected: 前回のデバイスリストになかったMACアドレス
+            disconnected: 今回のデバイスリストからなくなったMACアドレス
+            timestamp: 今回のポーリング時刻（UNIX時刻、省略時は現在時刻）
+            departed_at: 切断したデバイスの最終検出時刻（syslogなどで切断の時刻が
+                         わかっている場合。省略時は前回の更新時刻）
+
+        Returns:
+            確定した在席状態の変化
+        """
+        now = timestamp if timestamp is not None else time.time()
+        state = self._state(router)
+        if departed_at is not None:
+            last_seen = departed_at
+        else:
+            last_seen = state.last_poll if state.last_poll is not None else now
+        changes = PresenceChanges()
+
+        for mac in disconnected:
+            # 接続が確定する前にいなくなったデバイスは接続・切断とも扱わない
+            if state.pending.pop(mac, None) is None:
+                self._mark_absent(state, mac, last_seen)
+
+        self._expire_absent(state, now, changes)
+
+        for mac in connected:
+            if state.absent.pop(mac, None) is not None:
+                changes.returned.append(mac)
+            elif self.connect_delay > 0:
+                state.pending[mac] = now
+                _push(state.pending_heap, state.pending, (now, mac))
+            else:
+                changes.arrived.append(mac)
+
+        self._expire_pending(state, now, changes)
+        state.last_poll = now
+        return changes
+
+    def advance(self, router: str, timestamp: Optional[float] = None) -> PresenceChanges:
+        """
+        デバイスリストに変化がない場合に、猶予時間を過ぎたデバイスの状態を確定させる。
+
+        Args:
+            router: ルータ名
+            timestamp: 今回のポーリング時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            確定した在席状態の変化
+        """
+        return self.update(router, (), (), timestamp)
+
+    def last_seen(self, router: str, mac: int) -> Optional[float]:
+        """
+        不在中のデバイスの最終検出時刻を返す。
+
+        Args:
+            router: ルータ名
+            mac: MACアドレス（整数）
+
+        Returns:
+            最終検出時刻（不在として判定中でない場合はNone）
+        """
+        state = self._routers.get(router)
+        return state.absent.get(mac) if state is not None else None
+
+    def pending_count(self, router: str) -> Tuple[int, int]:
+        """
+        判定中のデバイス数を返す。
+
+        Args:
+            router: ルータ名
+
+        Returns:
+            (不在として判定中の数, 接続の確認待ちの数)
+        """
+        state = self._routers.get(router)
+        if state is None:
+            return 0, 0
+        return len(state.absent), len(state.pending)
+
+    def forget(self, router: str):
+        """
+        ルータの状態を破棄する。
+
+        Args:
+            router: ルータ名
+        """
+        self._routers.pop(router, None)
+
+    @staticmethod
+    def _mark_absent(state: _RouterPresence, mac: int, last_seen: float):
+        """デバイスを不在として登録する。"""
+        state.absent[mac] = last_seen
+        _push(state.absent_heap, state.absent, (last_seen, mac))
+
+    def _expire_absent(self, state: _RouterPresence, now: float, changes: PresenceChanges):
+        """猶予時間を過ぎた不在のデバイスを切断として確定させる。"""
+        heap = state.absent_heap
+        while heap and heap[0][0] + self.absence_grace <= now:
+            seen, mac = heapq.heappop(heap)
+            # 再接続済み、または再び不在になったデバイスの古い項目は読み捨てる
+            if state.absent.get(mac) == seen:
+                del state.absent[mac]
+                changes.departed.append((mac, seen))
+
+    def _expire_pending(self, state: _RouterPresence, now: float, changes: PresenceChanges):
+        """在席時間が connect_delay に達したデバイスを新規接続として確定させる。"""
+        heap = state.pending_heap
+        while heap and heap[0][0] + self.connect_delay <= now:
+            first_seen, mac = heapq.heappop(heap)
+            if state.pending.get(mac) == first_seen:
+                del state.pending[mac]
+                changes.arrived.append(mac)
+
+
+def _push(heap: List[Tuple[float, int]], entries: Dict[int, float], item: Tuple[float, int]):
+    """
+    ヒープに項目を追加する。
+
+    再接続を繰り返すデバイスの古い項目で期限前のヒープが膨らまないよう、
+    古い項目が多くなったら有効な項目だけでヒープを作り直します。
+    """
+    if len(heap) > 2 * len(entries) + _HEAP_SLACK:
+        heap[:] = [(value, mac) for mac, value in entries.items()]
+        heapq.heapify(heap)
+        # entries には追加する項目が登録済みのため、ここで追加済みになる
+        return
+    heapq.heappush(heap, item)
+
+
+def create_presence_tracker(config: Optional[Dict]) -> PresenceTracker:
+    """
+    設定から在席状態の判定を生成する。
+
+    Args:
+        config: config.yaml の presence 設定
+
+    Returns:
+        在席状態の判定
+    """
+    config = config or {}
+    return PresenceTracker(
+        absence_grace=config.get('absence_grace', DEFAULT_ABSENCE_GRACE),
+        connect_delay=config.get('connect_delay', 0)
+    )
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+通知のレート制限と集約
+
+異常な動作をするデバイスや、ルータの不具合でデバイスリストが一時的に空になった
+場合などに大量のメールが送信され、メールアカウントが送信制限を受けることを防ぎます。
+
+- デバイス（MACアドレス）ごとのトークンバケット: 同じデバイスの通知の頻度を制限
+- プロセス全体のトークンバケット: 送信するメッセージの数を制限
+- 集約ウィンドウ: 一定時間内の通知を1回の送信にまとめ、同じデバイスの
+  繰り返しの接続は1件に統合
+
+制限や統合によって送信しなかった通知の件数は、次に送信するメッセージで報告します。
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.device import Device
+
+
+class TokenBucket:
+    """トークンバケット（一定の速度で補充され、容量までバーストを許容する）。"""
+
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, capacity: float, now: float):
+        """
+        満杯のトークンバケットを作成する。
+
+        Args:
+            capacity: バケットの容量
+            now: 作成時刻（time.monotonic() の値）
+        """
+        self.tokens = capacity
+        self.updated_at = now
+
+    def refill(self, rate: float, capacity: float, now: float) -> float:
+        """
+        経過時間分のトークンを補充する。
+
+        Args:
+            rate: 1秒あたりの補充量
+            capacity: バケットの容量
+            now: 現在時刻（time.monotonic() の値）
+
+        Returns:
+            補充後のトークン数
+        """
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(capacity, self.tokens + elapsed * rate)
+            self.updated_at = now
+        return self.tokens
+
+    def take(self, rate: float, capacity: float, now: float, count: int = 1) -> int:
+        """
+        最大 count 個のトークンを取り出す。
+
+        Args:
+            rate: 1秒あたりの補充量
+            capacity: バケットの容量
+            now: 現在時刻（time.monotonic() の値）
+            count: 取り出したいトークン数
+
+        Returns:
+            取り出せたトークン数
+        """
+        taken = min(count, int(self.refill(rate, capacity, now)))
+        self.tokens -= taken
+        return taken
+
+
+class NotificationBatch:
+    """1回の送信にまとめた通知。"""
+
+    def __init__(self, devices: List[Device], suppressed: int = 0):
+        """
+        通知をまとめる。
+
+        Args:
+            devices: 通知対象のデバイス情報のリスト
+            suppressed: 前回の送信以降に制限・統合により送信しなかった通知の件数
+        """
+        self.devices = devices
+        self.suppressed = suppressed
+
+
+class NotificationThrottle:
+    """デバイスごと・プロセス全体のレート制限と集約ウィンドウを適用する。"""
+
+    # デバイスごとのバケット数がこの数を超えたら、満杯（しばらく通知のない）バケットを破棄する
+    PRUNE_THRESHOLD = 1024
+
+    def __init__(self, device_burst: int = 3, device_per_hour: float = 6,
+                 global_burst: int = 30, global_per_hour: float = 100,
+                 coalesce_window: float = 0, digest: bool = False):
+        """
+        レート制限を初期化する。
+
+        Args:
+            device_burst: 1台のデバイスについて続けて送信できる通知の数（0以下で無制限）
+            device_per_hour: 1台のデバイスについて1時間あたりに補充される通知の数
+            global_burst: プロセス全体で続けて送信できるメッセージの数（0以下で無制限）
+            global_per_hour: プロセス全体で1時間あたりに補充されるメッセージの数
+            coalesce_window: 通知をまとめて送信するまでの待ち時間（秒、0でまとめない）
+            digest: ダイジェストモードか（複数デバイスを1通のメッセージとして数える）
+        """
+        self._lock = threading.Lock()
+        self._device_buckets: Dict[int, TokenBucket] = {}
+        self._prune_at = self.PRUNE_THRESHOLD
+        self._global_bucket: Optional[TokenBucket] = None
+        # 集約ウィンドウ内の通知（MAC -> デバイス情報）とウィンドウの開始時刻
+        self._pending: Dict[int, Device] = {}
+        self._window_started: Optional[float] = None
+        self._suppressed = 0
+        self.configure(device_burst, device_per_hour, global_burst, global_per_hour,
+                       coalesce_window, digest)
+
+    def configure(self, device_burst: int, device_per_hour: float, global_burst: int,
+                  global_per_hour: float, coalesce_window: float, digest: bool):
+        """
+        制限の設定を変更する（各バケットの残りトークンは維持されます）。
+
+        引数は __init__ と同じです。
+        """
+        with self._lock:
+            self.device_burst = device_burst
+            self.device_rate = max(0.0, device_per_hour) / 3600
+            self.global_burst = global_burst
+            self.global_rate = max(0.0, global_per_hour) / 3600
+            self.coalesce_window = max(0.0, coalesce_window)
+            self.digest = digest
+
+    @property
+    def suppressed(self) -> int:
+        """まだ報告していない、送信しなかった通知の件数。"""
+        return self._suppressed
+
+    def submit(self, devices: List[Device],
+               now: Optional[float] = None) -> Optional[NotificationBatch]:
+        """
+        通知対象のデバイスにレート制限を適用する。
+
+        集約ウィンドウが有効な場合は通知を保留し、ウィンドウの終了後に
+        flush() で送信します。
+
+        Args:
+            devices: 通知対象のデバイス情報のリスト
+            now: 現在時刻（time.monotonic() の値、省略時は現在時刻）
+
+        Returns:
+            今すぐ送信する通知（送信するものがない場合はNone）
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            admitted = self._admit_devices(devices, now)
+            if self.coalesce_window > 0:
+                for device in admitted:
+                    if device.mac_int in self._pending:
+                        # ウィンドウ内で繰り返し接続したデバイスは最新の情報で1件にまとめる
+                        self._suppressed += 1
+                    self._pending[device.mac_int] = device
+                if self._pending and self._window_started is None:
+                    self._window_started = now
+                return None
+            return self._take_batch(admitted, now)
+
+    def flush(self, now: Optional[float] = None,
+              force: bool = False) -> Optional[NotificationBatch]:
+        """
+        集約ウィンドウが終了していれば、保留中の通知をまとめて返す。
+
+        Args:
+            now: 現在時刻（time.monotonic() の値、省略時は現在時刻）
+            force: ウィンドウの終了前でも返す（終了時など）
+
+        Returns:
+            送信する通知（送信するものがない場合はNone）
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._window_started is None:
+                return None
+            if not force and now - self._window_started < self.coalesce_window:
+                return None
+            devices = list(self._pending.values())
+            self._pending.clear()
+            self._window_started = None
+            return self._take_batch(devices, now)
+
+    def _admit_devices(self, devices: List[Device], now: float) -> List[Device]:
+        """デバイスごとのレート制限を適用し、通知できるデバイスを返す。"""
+        if self.device_burst <= 0:
+            return list(devices)
+
+        admitted = []
+        for device in devices:
+            bucket = self._device_buckets.get(device.mac_int)
+            if bucket is None:
+                bucket = self._device_buckets[device.mac_int] = TokenBucket(self.device_burst, now)
+            if bucket.take(self.device_rate, self.device_burst, now):
+                admitted.append(device)
+            else:
+                self._suppressed += 1
+                logging.debug(f"Notification rate limit reached for {device.mac}")
+
+        if len(self._device_buckets) > self._prune_at:
+            self._prune_device_buckets(now)
+        return admitted
+
+    def _prune_device_buckets(self, now: float):
+        """満杯まで補充されたバケット（新しく作るのと同じ状態）を破棄する。"""
+        self._device_buckets = {
+            mac: bucket for mac, bucket in self._device_buckets.items()
+            if bucket.refill(self.device_rate, self.device_burst, now) < self.device_burst
+        }
+        self._prune_at = max(self.PRUNE_THRESHOLD, 2 * len(self._device_buckets))
+
+    def _take_batch(self, devices: List[Device], now: float) -> Optional[NotificationBatch]:
+        """プロセス全体のレート制限を適用し、送信する通知を作成する。"""
+        if not devices:
+            return None
+
+        if self.global_burst > 0:
+            if self._global_bucket is None:
+                self._global_bucket = TokenBucket(self.global_burst, now)
+            # ダイジェストモードでは1通、それ以外はデバイスごとに1通として数える
+            wanted = 1 if self.digest else len(devices)
+            allowed = self._global_bucket.take(self.global_rate, self.global_burst, now, wanted)
+            if allowed < wanted:
+                self._suppressed += len(devices) - allowed
+                logging.warning(
+                    f"Global notification rate limit reached, "
+                    f"{len(devices) - allowed} notification(s) suppressed"
+                )
+                devices = devices[:allowed]
+            if not devices:
+                return None
+
+        batch = NotificationBatch(devices, self._suppressed)
+        self._suppressed = 0
+        return batch
+
+
+def create_notification_throttle(config: Optional[Dict],
+                                 digest: bool = False) -> Optional[NotificationThrottle]:
+    """
+    設定から通知のレート制限を生成する。
+
+    Args:
+        config: config.yaml の rate_limit 設定
+        digest: ダイジェストモードか
+
+    Returns:
+        通知のレート制限（無効の場合はNone）
+    """
+    config = config or {}
+    if not config.get('enabled', True):
+        return None
+    return NotificationThrottle(**throttle_settings(config), digest=digest)
+
+
+def throttle_settings(config: Optional[Dict]) -> Dict[str, float]:
+    """
+    rate_limit 設定からレート制限のパラメーターを取得する（省略された項目はデフォルト値）。
+
+    Args:
+        config: config.yaml の rate_limit 設定
+
+    Returns:
+        NotificationThrottle のキーワード引数（digest を除く）
+    """
+    config = config or {}
+    return {
+        'device_burst': config.get('device_burst', 3),
+        'device_per_hour': config.get('device_per_hour', 6),
+        'global_burst': config.get('global_burst', 30),
+        'global_per_hour': config.get('global_per_hour', 100),
+        'coalesce_window': config.get('coalesce_window', 0),
+    }
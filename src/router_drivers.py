@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+ルータモデル別ドライバー
+
+ルータのモデルごとに認証方法（Basic認証、SHA-256ハッシュ）、デバイスリストの
+エンドポイント、レスポンス形式を定義します。ドライバーは config.yaml の
+router.model で選択します。
+
+独自のモデルに対応する場合は RouterDriver を継承したクラスを作成し、
+register_driver デコレーターで登録してください。
+"""
+
+import hashlib
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Type, Union
+
+from requests.auth import HTTPBasicAuth
+
+from src.device import Device
+from src.html_parser import PARSER_FAST, parse_wireless_lan_status, extract_devices_from_json
+
+# 認証方法
+AUTH_BASIC = 'basic'
+AUTH_SHA256 = 'sha256'
+
+# レスポンス形式（auto は初回取得時に判定して以降は固定する）
+FORMAT_AUTO = 'auto'
+FORMAT_JSON = 'json'
+FORMAT_HTML = 'html'
+
+
+class Endpoint:
+    """デバイスリストのエンドポイント。"""
+
+    def __init__(self, path: str, fmt: str = FORMAT_AUTO):
+        """
+        エンドポイントを初期化する。
+
+        Args:
+            path: ルータのURLパス（例: /index.cgi/wireless_client_list）
+            fmt: レスポンス形式（'json'、'html' または 'auto'）
+        """
+        if fmt not in (FORMAT_AUTO, FORMAT_JSON, FORMAT_HTML):
+            raise ValueError(f"未知のレスポンス形式です: {fmt}")
+        self.path = path
+        self.fmt = fmt
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.path!r}, {self.fmt!r})"
+
+
+class RouterDriver:
+    """
+    汎用ルータドライバー（Basic認証）。
+
+    サブクラスではクラス属性を上書きしてモデル固有の設定を定義します。
+    """
+
+    model = 'generic'
+    # 認証方法（AUTH_BASIC または AUTH_SHA256）
+    auth = AUTH_BASIC
+    # Basic認証では認証確認用のページ、SHA-256ではログインフォームの送信先
+    login_path = '/index.html'
+    # SHA-256ログインで送信するフォームのフィールド名（ユーザー名, パスワード）
+    login_fields = ('user', 'passwd')
+    # デバイスリストのエンドポイント候補（優先順、(パス, 形式) のタプル）
+    endpoints: Sequence = (('/index.cgi/wireless_client_list', FORMAT_AUTO),)
+    # syslog で受信する接続・切断ログのパターン（イベント -> 正規表現のタプル、
+    # {mac} はMACアドレスの名前付きグループに置き換えられる）。
+    # 既定は hostapd（OpenWrt などで使用）の形式。独自のパターンを持たないドライバー
+    # （wg2600、wf1200 など）では hostapd 形式のログのみを認識する
+    syslog_patterns: Dict[str, Sequence[str]] = {
+        'connect': (
+            r'AP-STA-CONNECTED {mac}',
+            r'STA {mac} IEEE 802\.11: associated',
+        ),
+        'disconnect': (
+            r'AP-STA-DISCONNECTED {mac}',
+            r'STA {mac} IEEE 802\.11: (?:disassociated|deauthenticated)',
+        ),
+    }
+
+    def __init__(self, endpoints: Optional[Sequence[Union[str, Dict, Sequence]]] = None):
+        """
+        ドライバーを初期化する。
+
+        Args:
+            endpoints: エンドポイント候補の上書き（パス文字列、{'path', 'format'} 辞書、
+                       または (パス, 形式) のタプルのリスト）
+        """
+        self.endpoint_list: List[Endpoint] = [
+            self._to_endpoint(e) for e in (endpoints or self.endpoints)
+        ]
+        # 取得に成功したエンドポイント（以降はこのエンドポイントのみを使用する）
+        self.active_endpoint: Optional[Endpoint] = None
+
+    @staticmethod
+    def _to_endpoint(value: Union[str, Dict, Sequence]) -> Endpoint:
+        """設定値をEndpointに変換する。"""
+        if isinstance(value, Endpoint):
+            return value
+        if isinstance(value, str):
+            return Endpoint(value)
+        if isinstance(value, dict):
+            return Endpoint(value['path'], value.get('format', FORMAT_AUTO))
+        return Endpoint(*value)
+
+    def login(self, router) -> bool:
+        """
+        ルータにログインする。
+
+        Args:
+            router: 対象の WiFiRouter
+
+        Returns:
+            ログイン成功時はTrue、失敗時はFalse
+        """
+        if self.auth == AUTH_SHA256:
+            return self._login_sha256(router)
+        return self._login_basic(router)
+
+    def resume(self, router):
+        """
+        キャッシュしたセッションを使用するための認証情報を設定する（リクエストは送信しない）。
+
+        セッションCookieは呼び出し側で復元します。Basic認証では
+        認証確認用のページへのアクセスを省略します。
+
+        Args:
+            router: 対象の WiFiRouter
+        """
+        if self.auth == AUTH_BASIC:
+            router.session.auth = HTTPBasicAuth(router.username, router.password)
+
+    def _login_basic(self, router) -> bool:
+        """Basic認証を設定し、認証が必要なページにアクセスして確認する。"""
+        router.session.auth = HTTPBasicAuth(router.username, router.password)
+        response = router.session.get(f"{router.base_url}{self.login_path}",
+                                      timeout=router.timeout)
+        return response.status_code == 200
+
+    def _login_sha256(self, router) -> bool:
+        """SHA-256でハッシュ化したパスワードをログインフォームに送信する。"""
+        password_hash = hashlib.sha256(router.password.encode()).hexdigest()
+        user_field, password_field = self.login_fields
+        response = router.session.post(
+            f"{router.base_url}{self.login_path}",
+            data={user_field: router.username, password_field: password_hash},
+            timeout=router.timeout
+        )
+        return response.status_code == 200
+
+    def candidate_endpoints(self) -> List[Endpoint]:
+        """今回のポーリングで試すエンドポイントのリストを返す。"""
+        if self.active_endpoint is not None:
+            return [self.active_endpoint]
+        return self.endpoint_list
+
+    def parse(self, endpoint: Endpoint, content: str,
+              html_parser: str = PARSER_FAST) -> List[Device]:
+        """
+        エンドポイントの形式に従ってレスポンスを解析する。
+
+        形式が 'auto' の場合はJSONとして解析できるかで形式を判定し、
+        エンドポイントの形式を確定させます（以降のポーリングでは判定を省略）。
+
+        Args:
+            endpoint: レスポンスを返したエンドポイント
+            content: レスポンス本文
+            html_parser: HTML解析に使用するパーサー
+
+        Returns:
+            デバイス情報（Device）のリスト
+        """
+        if endpoint.fmt == FORMAT_HTML:
+            return parse_wireless_lan_status(content, parser=html_parser)
+
+        try:
+            json_data = json.loads(content)
+        except ValueError:
+            if endpoint.fmt == FORMAT_JSON:
+                raise
+            endpoint.fmt = FORMAT_HTML
+            logging.debug(f"Endpoint {endpoint.path} detected as HTML")
+            return parse_wireless_lan_status(content, parser=html_parser)
+
+        if endpoint.fmt == FORMAT_AUTO:
+            endpoint.fmt = FORMAT_JSON
+            logging.debug(f"Endpoint {endpoint.path} detected as JSON")
+        return extract_devices_from_json(json_data)
+
+
+# モデル名 -> ドライバークラス
+DRIVERS: Dict[str, Type[RouterDriver]] = {}
+
+
+def register_driver(model: str) -> Callable[[Type[RouterDriver]], Type[RouterDriver]]:
+    """
+    ドライバークラスを登録するデコレーター。
+
+    Args:
+        model: config.yaml の router.model に指定するモデル名
+    """
+    def decorator(cls: Type[RouterDriver]) -> Type[RouterDriver]:
+        cls.model = model
+        DRIVERS[model.lower()] = cls
+        return cls
+    return decorator
+
+
+def get_driver(model: Optional[str] = None,
+               endpoints: Optional[Sequence] = None) -> RouterDriver:
+    """
+    モデル名からドライバーを生成する。
+
+    Args:
+        model: モデル名（省略時は 'generic'）
+        endpoints: エンドポイント候補の上書き
+
+    Returns:
+        ドライバーのインスタンス
+
+    Raises:
+        ValueError: 未登録のモデル名が指定された場合
+    """
+    key = (model or 'generic').lower()
+    if key not in DRIVERS:
+        available = ', '.join(sorted(DRIVERS))
+        raise ValueError(f"未対応のルータモデルです: {model}（対応モデル: {available}）")
+    return DRIVERS[key](endpoints=endpoints)
+
+
+register_driver('generic')(RouterDriver)
+
+
+@register_driver('wg2600')
+class WG2600Driver(RouterDriver):
+    """WG2600シリーズ（SHA-256ハッシュ認証）。"""
+
+    auth = AUTH_SHA256
+    login_path = '/index.cgi/login'
+    endpoints = (('/index.cgi/wireless_client_list', FORMAT_AUTO),)
+
+
+@register_driver('wf1200')
+class WF1200Driver(RouterDriver):
+    """WF1200シリーズ（Basic認証）。"""
+
+    auth = AUTH_BASIC
+    login_path = '/cgi-bin/login.cgi'
+    endpoints = (('/cgi-bin/wireless_list.cgi', FORMAT_AUTO),)
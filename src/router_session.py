@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+ルータHTTPセッション管理
+
+requests.Session にコネクションプール・キープアライブ・再試行（バックオフ付き）を
+設定し、ルータのセッション切れ（認証切れ）を検出した場合は自動的に
+再ログインしてリクエストをやり直します。
+"""
+
+import logging
+from typing import Callable, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+
+class RouterFetchError(Exception):
+    """ルータからのデータ取得に失敗したことを示す例外（デバイス0台とは区別される）。"""
+
+
+class RouterSession(requests.Session):
+    """再試行と自動再ログインを備えたルータ用HTTPセッション。"""
+
+    # 再試行の対象とする一時的なエラーのステータスコード
+    RETRY_STATUSES = (500, 502, 503, 504)
+    # ログインページへのリダイレクトとみなすステータスコード
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+    def __init__(self, retries: int = 2, backoff_factor: float = 0.5, pool_maxsize: int = 2,
+                 auth_failure_statuses: Iterable[int] = (401, 403),
+                 expired_markers: Iterable[str] = ()):
+        """
+        セッションを初期化する。
+
+        Args:
+            retries: 接続エラー・一時的なエラー時の再試行回数
+            backoff_factor: 再試行間隔の係数（秒、再試行ごとに2倍）
+            pool_maxsize: ルータごとに保持する接続数の上限
+            auth_failure_statuses: 認証切れとみなすステータスコード
+            expired_markers: レスポンス本文に含まれていれば認証切れとみなす文字列
+                             （ステータス200でログインページを返すルータ用）
+        """
+        super().__init__()
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+        self.auth_failure_statuses = set(auth_failure_statuses)
+        self.expired_markers = list(expired_markers)
+        # 再ログイン処理（ログイン成功時にTrueを返す）
+        self.reauthenticate: Optional[Callable[[], bool]] = None
+        # ログイン済みの場合のみ認証切れの検出と再ログインを行う
+        self.authenticated = False
+        self.relogin_count = 0
+
+    def is_auth_expired(self, response: requests.Response) -> bool:
+        """
+        レスポンスがセッション切れ（認証切れ）を示しているか判定する。
+
+        Args:
+            response: ルータからのレスポンス
+
+        Returns:
+            認証切れと判定した場合はTrue
+        """
+        if response.status_code in self.auth_failure_statuses:
+            return True
+
+        # ログインページへのリダイレクト
+        for redirect in response.history:
+            location = redirect.headers.get('Location', '').lower()
+            if redirect.status_code in self.REDIRECT_STATUSES and 'login' in location:
+                return True
+
+        if self.expired_markers and response.status_code == 200:
+            text = response.text
+            return any(marker in text for marker in self.expired_markers)
+
+        return False
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        """
+        リクエストを送信し、認証切れの場合は再ログインして1回だけやり直す。
+        """
+        response = super().request(method, url, *args, **kwargs)
+
+        if not self.authenticated or self.reauthenticate is None:
+            return response
+        if not self.is_auth_expired(response):
+            return response
+
+        logging.info(f"Router session expired ({response.status_code}), re-authenticating")
+        self.authenticated = False
+        if not self.reauthenticate():
+            logging.warning("Re-authentication failed")
+            return response
+
+        self.relogin_count += 1
+        return super().request(method, url, *args, **kwargs)
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+ローカルルータシミュレーター
+
+WiFiRouter が使用するエンドポイント（/index.html、/index.cgi/wireless_client_list）を
+Basic認証付きで提供するHTTPサーバーです。デバイスの接続・切断（チャーン）、
+応答遅延、エラー、セッション切れを設定でき、多数のルータを同時に起動して
+実機なしでポーリング処理の負荷試験を行えます。
+
+使用方法:
+    python -m src.router_simulator --routers 100 --clients 50 --write-config sim.yaml
+    python -m src.wifi_notifier sim.yaml
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from base64 import b64encode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import yaml
+
+LOGIN_PATH = '/index.html'
+CLIENT_LIST_PATH = '/index.cgi/wireless_client_list'
+
+
+class SimulatedRouter:
+    """1台分の模擬ルータ（デバイスの状態とHTTPサーバー）。"""
+
+    def __init__(self, name: str, index: int = 0, username: str = 'admin',
+                 password: str = 'password', clients: int = 20, churn: float = 0.05,
+                 churn_interval: float = 10.0, latency: float = 0.0,
+                 latency_jitter: float = 0.0, error_rate: float = 0.0,
+                 session_ttl: Optional[float] = None, response_format: str = 'json',
+                 seed: Optional[int] = None):
+        """
+        模擬ルータを初期化する。
+
+        Args:
+            name: ルータ名
+            index: ルータ番号（MAC/IPアドレスをルータ間で重複させないために使用）
+            username: Basic認証のユーザー名
+            password: Basic認証のパスワード
+            clients: 接続中のデバイス数
+            churn: チャーン間隔ごとに入れ替わるデバイスの割合（0.05で5%）
+            churn_interval: デバイスを入れ替える間隔（秒）
+            latency: 応答の遅延（秒）
+            latency_jitter: 応答の遅延に加えるランダムな揺らぎの最大値（秒）
+            error_rate: HTTP 500 を返す確率（0〜1）
+            session_ttl: ログインから認証切れ（HTTP 401）になるまでの秒数（Noneで無期限）
+            response_format: デバイスリストの形式（'json' または 'html'）
+            seed: 乱数のシード
+        """
+        if response_format not in ('json', 'html'):
+            raise ValueError(f"未知のレスポンス形式です: {response_format}")
+
+        self.name = name
+        self.index = index
+        self.username = username
+        self.password = password
+        self.churn = churn
+        self.churn_interval = churn_interval
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.session_ttl = session_ttl
+        self.response_format = response_format
+        self.stats = {'requests': 0, 'logins': 0, 'errors': 0, 'expired': 0, 'not_modified': 0}
+
+        self._rng = random.Random(seed if seed is not None else index)
+        self._lock = threading.Lock()
+        # 接続中と未接続を合わせたデバイスの候補（入れ替え用に接続数の2倍を用意する）
+        pool = [self._make_device(i) for i in range(max(clients * 2, clients + 1))]
+        self._online = pool[:clients]
+        self._offline = pool[clients:]
+        self._last_churn = time.monotonic()
+        self._session_started: Optional[float] = None
+        self._auth_header = 'Basic ' + b64encode(f"{username}:{password}".encode()).decode()
+
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _make_device(self, number: int) -> Dict[str, str]:
+        """ルータ番号とデバイス番号から一意なデバイス情報を生成する。"""
+        # 先頭オクテット 02 はローカル管理アドレス（実在のベンダーと重複しない）
+        mac = '02:{:02X}:{:02X}:{:02X}:{:02X}:{:02X}'.format(
+            (self.index >> 8) & 0xFF, self.index & 0xFF,
+            (number >> 16) & 0xFF, (number >> 8) & 0xFF, number & 0xFF
+        )
+        return {
+            'mac': mac,
+            'ip': f"10.{self.index & 0xFF}.{(number >> 8) & 0xFF}.{number & 0xFF}",
+            'hostname': f"{self.name}-device-{number:05d}",
+        }
+
+    def _apply_churn(self):
+        """前回の入れ替えからの経過時間に応じてデバイスを入れ替える。"""
+        if self.churn <= 0 or self.churn_interval <= 0 or not self._online:
+            return
+        now = time.monotonic()
+        ticks = int((now - self._last_churn) / self.churn_interval)
+        if ticks <= 0:
+            return
+        self._last_churn += ticks * self.churn_interval
+
+        # 長時間アクセスがなかった場合でも入れ替え回数は候補の数までに抑える
+        for _ in range(min(ticks, len(self._online) + len(self._offline))):
+            expected = self.churn * len(self._online)
+            count = int(expected) + (self._rng.random() < expected - int(expected))
+            count = min(count, len(self._online), len(self._offline))
+            for _ in range(count):
+                leaving = self._online.pop(self._rng.randrange(len(self._online)))
+                joining = self._offline.pop(self._rng.randrange(len(self._offline)))
+                self._online.append(joining)
+                self._offline.append(leaving)
+
+    def devices(self) -> List[Dict[str, str]]:
+        """現在接続中のデバイスのリストを返す。"""
+        with self._lock:
+            self._apply_churn()
+            return list(self._online)
+
+    def render_client_list(self) -> str:
+        """デバイスリストのレスポンス本文を生成する。"""
+        devices = self.devices()
+        if self.response_format == 'json':
+            return json.dumps({'clients': devices})
+
+        rows = ''.join(
+            f"<tr><td>{d['hostname']}</td><td>{d['mac']}</td><td>{d['ip']}</td></tr>"
+            for d in devices
+        )
+        return (
+            '<html><head><title>無線LAN接続状態</title></head><body><table>'
+            '<tr><th>ホスト名</th><th>MACアドレス</th><th>IPアドレス</th></tr>'
+            f'{rows}</table></body></html>'
+        )
+
+    def check_auth(self, header: Optional[str]) -> bool:
+        """Authorizationヘッダーが正しいか確認する。"""
+        return header == self._auth_header
+
+    def start_session(self):
+        """ログインページへのアクセスでセッションを開始する。"""
+        with self._lock:
+            self._session_started = time.monotonic()
+        self.count('logins')
+
+    def count(self, key: str):
+        """統計情報のカウンターを1つ増やす。"""
+        with self._lock:
+            self.stats[key] += 1
+
+    def session_valid(self) -> bool:
+        """セッションが有効か（ログイン済みで期限内か）を返す。"""
+        with self._lock:
+            if self._session_started is None:
+                return False
+            if self.session_ttl is None:
+                return True
+            return time.monotonic() - self._session_started < self.session_ttl
+
+    def simulate_latency(self):
+        """設定された応答遅延の分だけ待機する。"""
+        delay = self.latency
+        if self.latency_jitter:
+            delay += self._rng.uniform(0, self.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        """今回のリクエストでエラーを返すかを決める。"""
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+    @property
+    def address(self) -> str:
+        """config.yaml の router.ip に指定するアドレス（ホスト:ポート）。"""
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self, host: str = '127.0.0.1', port: int = 0):
+        """
+        HTTPサーバーを起動する。
+
+        Args:
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート（0で空きポートを自動選択）
+        """
+        handler = type('RouterHandler', (_RouterRequestHandler,), {'router': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name=f"simulator-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """HTTPサーバーを停止する。"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class _RouterRequestHandler(BaseHTTPRequestHandler):
+    """模擬ルータのHTTPリクエストハンドラー。"""
+
+    router: SimulatedRouter
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        router = self.router
+        router.count('requests')
+        router.simulate_latency()
+
+        path = self.path.split('?', 1)[0]
+        if path not in (LOGIN_PATH, CLIENT_LIST_PATH):
+            self._send(404, 'Not Found')
+            return
+
+        if not router.check_auth(self.headers.get('Authorization')):
+            self._send(401, 'Unauthorized',
+                       {'WWW-Authenticate': f'Basic realm="{router.name}"'})
+            return
+
+        if router.should_fail():
+            router.count('errors')
+            self._send(500, 'Internal Server Error')
+            return
+
+        if path == LOGIN_PATH:
+            router.start_session()
+            self._send(200, f"<html><body>{router.name}</body></html>")
+            return
+
+        if not router.session_valid():
+            router.count('expired')
+            self._send(401, 'Session expired')
+            return
+
+        body = router.render_client_list()
+        etag = '"' + hashlib.blake2b(body.encode(), digest_size=16).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            router.count('not_modified')
+            self._send(304, '', {'ETag': etag})
+            return
+
+        content_type = 'application/json' if router.response_format == 'json' else 'text/html'
+        self._send(200, body, {'ETag': etag, 'Content-Type': f'{content_type}; charset=utf-8'})
+
+    def _send(self, status: int, body: str, headers: Optional[Dict[str, str]] = None):
+        """レスポンスを送信する。"""
+        data = body.encode('utf-8') if status != 304 else b''
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.debug(f"[{self.router.name}] {format % args}")
+
+
+class RouterSimulatorFarm:
+    """複数の模擬ルータをまとめて起動・停止する。"""
+
+    def __init__(self, count: int, host: str = '127.0.0.1', base_port: int = 0, **options):
+        """
+        模擬ルータ群を初期化する。
+
+        Args:
+            count: ルータの台数
+            host: 待ち受けるアドレス
+            base_port: 最初のルータのポート（以降は連番、0で空きポートを自動選択）
+            **options: SimulatedRouter に渡すオプション
+        """
+        self.host = host
+        self.base_port = base_port
+        self.routers = [
+            SimulatedRouter(f"sim-{i:04d}", index=i, **options) for i in range(count)
+        ]
+
+    def start(self):
+        """すべての模擬ルータを起動する。"""
+        for i, router in enumerate(self.routers):
+            router.start(self.host, self.base_port + i if self.base_port else 0)
+
+    def stop(self):
+        """すべての模擬ルータを停止する。"""
+        for router in self.routers:
+            router.stop()
+
+    def total_stats(self) -> Dict[str, int]:
+        """全ルータの統計情報の合計を返す。"""
+        totals: Dict[str, int] = {}
+        for router in self.routers:
+            for key, value in router.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def build_config(self, check_interval: int = 60, smtp_server: str = '127.0.0.1',
+                     smtp_port: int = 1025) -> Dict:
+        """
+        模擬ルータ群を監視する config.yaml の内容を生成する。
+
+        Args:
+            check_interval: チェック間隔（秒）
+            smtp_server: 通知先のSMTPサーバー（ローカルのテスト用サーバーを想定）
+            smtp_port: 通知先のSMTPポート
+
+        Returns:
+            設定内容の辞書
+        """
+        return {
+            'routers': [
+                {
+                    'name': router.name,
+                    'ip': router.address,
+                    'username': router.username,
+                    'password': router.password,
+                }
+                for router in self.routers
+            ],
+            'email': {
+                'smtp_server': smtp_server,
+                'smtp_port': smtp_port,
+                'smtp_user': 'simulator',
+                'smtp_password': 'simulator',
+                'sender_email': 'simulator@example.com',
+                'recipient_emails': ['simulator@example.com'],
+                'use_tls': False,
+            },
+            'check_interval': check_interval,
+            'log_level': 'INFO',
+        }
+
+
+def main():
+    """メインエントリーポイント。"""
+    parser = argparse.ArgumentParser(description="ローカルルータシミュレーター")
+    parser.add_argument('--routers', type=int, default=1, help="ルータの台数")
+    parser.add_argument('--clients', type=int, default=20, help="ルータごとの接続デバイス数")
+    parser.add_argument('--churn', type=float, default=0.05,
+                        help="チャーン間隔ごとに入れ替わるデバイスの割合")
+    parser.add_argument('--churn-interval', type=float, default=10.0,
+                        help="デバイスを入れ替える間隔（秒）")
+    parser.add_argument('--latency', type=float, default=0.0, help="応答の遅延（秒）")
+    parser.add_argument('--latency-jitter', type=float, default=0.0,
+                        help="応答の遅延の揺らぎの最大値（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="HTTP 500 を返す確率")
+    parser.add_argument('--session-ttl', type=float, default=None,
+                        help="ログインから認証切れになるまでの秒数")
+    parser.add_argument('--format', choices=('json', 'html'), default='json',
+                        help="デバイスリストの形式")
+    parser.add_argument('--host', default='127.0.0.1', help="待ち受けるアドレス")
+    parser.add_argument('--base-port', type=int, default=0,
+                        help="最初のルータのポート（省略時は空きポートを自動選択）")
+    parser.add_argument('--username', default='admin', help="Basic認証のユーザー名")
+    parser.add_argument('--password', default='password', help="Basic認証のパスワード")
+    parser.add_argument('--write-config', metavar='PATH',
+                        help="模擬ルータ群を監視する設定ファイルを書き出す")
+    parser.add_argument('--check-interval', type=int, default=60,
+                        help="書き出す設定ファイルのチェック間隔（秒）")
+    parser.add_argument('--smtp-port', type=int, default=1025,
+                        help="書き出す設定ファイルのSMTPポート（ローカルのテスト用サーバー）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    farm = RouterSimulatorFarm(
+        args.routers, host=args.host, base_port=args.base_port,
+        username=args.username, password=args.password, clients=args.clients,
+        churn=args.churn, churn_interval=args.churn_interval, latency=args.latency,
+        latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+        session_ttl=args.session_ttl, response_format=args.format
+    )
+    farm.start()
+    logging.info(f"Started {len(farm.routers)} simulated routers "
+                 f"({args.clients} clients each)")
+    for router in farm.routers[:5]:
+        logging.info(f"  {router.name}: http://{router.address}")
+    if len(farm.routers) > 5:
+        logging.info(f"  ... and {len(farm.routers) - 5} more")
+
+    if args.write_config:
+        config = farm.build_config(args.check_interval, smtp_port=args.smtp_port)
+        with open(args.write_config, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+        logging.info(f"Wrote monitor configuration to {args.write_config}")
+
+    try:
+        while True:
+            time.sleep(60)
+            logging.info(f"Simulator stats: {farm.total_stats()}")
+    except KeyboardInterrupt:
+        logging.info("Stopping simulated routers")
+    finally:
+        farm.stop()
+        logging.info(f"Simulator stats: {farm.total_stats()}")
+
+
+if __name__ == "__main__":
+    main()
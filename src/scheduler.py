@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+適応型ポーリングスケジューラ
+
+処理時間に左右されない固定の周期（ケイデンス）でポーリング時刻を決め、
+ランダムなジッターを加えます。適応モードでは、直近にデバイスの変化があった
+場合は間隔を短くし、変化のない状態が続く場合やルータへのアクセスに
+失敗している場合は間隔を延ばします。
+"""
+
+import math
+import random
+from typing import Optional
+
+# ポーリング結果の種別
+OUTCOME_CHANGED = 'changed'   # デバイスの接続・切断・属性変更があった
+OUTCOME_QUIET = 'quiet'       # 変化なし
+OUTCOME_FAILED = 'failed'     # ログインまたはデバイスリストの取得に失敗した
+
+
+class AdaptiveSchedule:
+    """1つのポーリングジョブの実行間隔と次回実行時刻を決める。"""
+
+    def __init__(self, interval: float, adaptive: bool = True, jitter: float = 0.1,
+                 min_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 quiet_polls: int = 10, rng: Optional[random.Random] = None):
+        """
+        スケジュールを初期化する。
+
+        Args:
+            interval: 基準となる実行間隔（秒）
+            adaptive: ポーリング結果に応じて間隔を調整するか
+            jitter: 実行時刻に加えるジッターの割合（0.1で間隔の±10%）
+            min_interval: 変化があった直後の最短間隔（省略時は基準間隔の1/4）
+            max_interval: 変化がない場合・失敗時の最長間隔（省略時は基準間隔の2倍）
+            quiet_polls: この回数連続で変化がない場合に間隔を延ばし始める
+            rng: ジッター用の乱数生成器
+        """
+        self.interval = interval
+        self.adaptive = adaptive
+        self.jitter = max(0.0, min(jitter, 0.5))
+        self.min_interval = min_interval if min_interval is not None else interval / 4
+        self.max_interval = max_interval if max_interval is not None else interval * 2
+        self.quiet_polls = quiet_polls
+        self.current_interval = interval
+        self._rng = rng or random.Random()
+        self._quiet_count = 0
+        self._failures = 0
+
+    def record(self, outcome: Optional[str]):
+        """
+        ポーリング結果を記録して次回の実行間隔を調整する。
+
+        Args:
+            outcome: OUTCOME_CHANGED / OUTCOME_QUIET / OUTCOME_FAILED のいずれか
+                     （Noneの場合は間隔を変更しない）
+        """
+        if not self.adaptive or outcome is None:
+            return
+
+        if outcome == OUTCOME_FAILED:
+            # ルータの負荷を避けるため、連続失敗回数に応じて指数的に間隔を延ばす
+            self._failures += 1
+            self._quiet_count = 0
+            self.current_interval = min(self.max_interval, self.interval * 2 ** self._failures)
+        elif outcome == OUTCOME_CHANGED:
+            # 変化の直後は続けて変化が起こりやすいため、間隔を短くする
+            self._failures = 0
+            self._quiet_count = 0
+            self.current_interval = self.min_interval
+        else:
+            self._failures = 0
+            self._quiet_count += 1
+            if self._quiet_count >= self.quiet_polls:
+                self.current_interval = min(self.max_interval, self.current_interval * 1.5)
+            elif self.current_interval < self.interval:
+                # 変化後の短い間隔から基準間隔へ段階的に戻す
+                self.current_interval = min(self.interval, self.current_interval * 2)
+            else:
+                self.current_interval = self.interval
+
+    def next_slot(self, slot: float, now: float) -> float:
+        """
+        前回の予定時刻から固定周期で次の予定時刻を求める。
+
+        処理時間が間隔を超えた場合は、過ぎてしまった予定時刻を読み飛ばします。
+
+        Args:
+            slot: 前回の予定時刻（ジッターを含まない）
+            now: 現在時刻
+
+        Returns:
+            次回の予定時刻（ジッターを含まない）
+        """
+        delay = self.current_interval
+        next_slot = slot + delay
+        if next_slot <= now:
+            next_slot += math.floor((now - next_slot) / delay + 1) * delay
+        return next_slot
+
+    def jitter_offset(self) -> float:
+        """予定時刻に加えるジッター（秒）を返す。"""
+        if not self.jitter:
+            return 0.0
+        return self._rng.uniform(-self.jitter, self.jitter) * self.current_interval
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+ルータのログインセッションの暗号化キャッシュ
+
+--single-run の実行ごとにログイン（SHA-256ログインでは複数回のリクエスト）と
+認証確認のリクエストを行わずに済むよう、ルータのセッションCookieを暗号化して
+ファイルに保存し、次回の実行で再利用します。キャッシュしたセッションが
+拒否された場合はログインからやり直します。
+
+暗号化には cryptography パッケージの Fernet（AES-128-CBC + HMAC-SHA256）を使用します。
+cryptography がインストールされていない場合や鍵が設定されていない場合は、
+警告を出してキャッシュを無効にします（平文では保存しません）。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# 鍵を config.yaml に記載しない場合に参照する環境変数
+KEY_ENV = 'WIFI_NOTIFIER_SESSION_KEY'
+# キャッシュファイルの形式のバージョン
+_FORMAT_VERSION = 1
+# セッションを有効とみなす秒数のデフォルト（毎時の定期実行の間隔より長くする。
+# ルータ側で期限切れになったセッションは拒否され、ログインしてやり直す）
+DEFAULT_TTL = 3900
+
+
+class SessionCache:
+    """ルータ名ごとのセッションCookieを暗号化してファイルに保存する。"""
+
+    def __init__(self, path: str, cipher, ttl: float = DEFAULT_TTL):
+        """
+        セッションキャッシュを初期化する（ファイルは load() で読み込みます）。
+
+        Args:
+            path: キャッシュファイルのパス
+            cipher: 暗号化に使用する Fernet のインスタンス
+            ttl: 最後に使用してからセッションを有効とみなす秒数
+                 （実行の間隔より長く設定してください。ルータが期限切れのセッションを
+                 拒否した場合はログインしてやり直します）
+        """
+        self.path = path
+        self.ttl = ttl
+        self._cipher = cipher
+        self._lock = threading.Lock()
+        # ルータ名 -> {'fingerprint', 'cookies', 'saved_at'}
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+
+    def load(self):
+        """キャッシュファイルを読み込む（存在しない・復号できない場合は空のキャッシュ）。"""
+        try:
+            with open(self.path, 'rb') as f:
+                token = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logging.warning(f"Failed to read session cache {self.path}: {e}")
+            return
+
+        try:
+            data = json.loads(self._cipher.decrypt(token))
+        except Exception as e:
+            # 鍵の変更やファイルの破損（改ざんを含む）。次回の保存で作り直す
+            logging.warning(f"Ignoring unreadable session cache {self.path}: "
+                            f"{type(e).__name__}")
+            return
+
+        if data.get('version') != _FORMAT_VERSION:
+            return
+        with self._lock:
+            self._entries = data.get('routers', {})
+
+    def get(self, router: str, fingerprint: str,
+            now: Optional[float] = None) -> Optional[List[Dict]]:
+        """
+        有効なキャッシュ済みセッションを取得する。
+
+        Args:
+            router: ルータ名
+            fingerprint: ルータの接続先と認証情報から求めた値（変更されていれば無効）
+            now: 現在時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            セッションCookieのリスト（有効なセッションがない場合はNone）
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(router)
+            if entry is None:
+                return None
+            if entry.get('fingerprint') != fingerprint or now - entry['saved_at'] >= self.ttl:
+                return None
+            cookies = entry.get('cookies', [])
+            # 期限付きのCookieが1つでも期限切れであればセッションは使用できない
+            if any(c.get('expires') is not None and c['expires'] <= now for c in cookies):
+                return None
+            return cookies
+
+    def put(self, router: str, fingerprint: str, cookies: List[Dict],
+            now: Optional[float] = None):
+        """
+        セッションを登録する（ファイルへの書き込みは save() で行います）。
+
+        Args:
+            router: ルータ名
+            fingerprint: ルータの接続先と認証情報から求めた値
+            cookies: セッションCookieのリスト
+            now: 最後にセッションを使用した時刻（UNIX時刻、省略時は現在時刻）
+        """
+        with self._lock:
+            self._entries[router] = {
+                'fingerprint': fingerprint,
+                'cookies': cookies,
+                'saved_at': time.time() if now is None else now,
+            }
+            self._dirty = True
+
+    def discard(self, router: str):
+        """
+        セッションを削除する。
+
+        Args:
+            router: ルータ名
+        """
+        with self._lock:
+            if self._entries.pop(router, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """変更があればキャッシュファイルを書き込む（所有者のみ読み書き可能）。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            # 削除されたルータなど、期限切れのセッションはファイルに残さない
+            now = time.time()
+            self._entries = {
+                name: entry for name, entry in self._entries.items()
+                if now - entry['saved_at'] < self.ttl
+            }
+            data = {'version': _FORMAT_VERSION, 'routers': self._entries}
+            token = self._cipher.encrypt(json.dumps(data).encode('utf-8'))
+            self._dirty = False
+
+        # 書き込み途中で中断しても前回のファイルが壊れないよう、一時ファイルから置き換える
+        tmp_path = f"{self.path}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(token)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Failed to write session cache {self.path}: {e}")
+
+
+def create_session_cache(config: Optional[Dict]) -> Optional[SessionCache]:
+    """
+    設定からセッションキャッシュを生成し、キャッシュファイルを読み込む。
+
+    Args:
+        config: config.yaml の session_cache 設定
+
+    Returns:
+        セッションキャッシュ（無効の場合、または暗号化できない場合はNone）
+
+    Raises:
+        ValueError: 鍵が Fernet の鍵として不正な場合
+    """
+    config = config or {}
+    if not config.get('enabled', False):
+        return None
+
+    key = config.get('key') or os.environ.get(KEY_ENV)
+    if not key:
+        logging.warning(f"Session cache disabled: no key configured "
+                        f"(set session_cache.key or {KEY_ENV})")
+        return None
+
+    try:
+        # cryptography はオプションの依存パッケージのため、キャッシュを使用する場合にのみ読み込む
+        from cryptography.fernet import Fernet
+    except ImportError:
+        logging.warning("Session cache disabled: the 'cryptography' package is not installed")
+        return None
+
+    try:
+        cipher = Fernet(key)
+    except ValueError as e:
+        raise ValueError(f"session_cache.key が不正です（Fernetの鍵を指定してください）: {e}")
+
+    cache = SessionCache(
+        config.get('path', 'wifi_notifier_session.cache'),
+        cipher,
+        ttl=config.get('ttl', DEFAULT_TTL)
+    )
+    cache.load()
+    return cache
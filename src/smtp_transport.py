@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+SMTP接続を再利用する送信トランスポート
+
+一度確立したSMTP接続（STARTTLS・ログイン済み）を保持して複数のメール送信で
+再利用します。アイドル時間が長い場合はNOOPで接続を確認し、
+切断されていた場合は自動的に再接続します。
+"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+from src.metrics import SMTP_FAILURES
+
+if TYPE_CHECKING:
+    import smtplib
+    from email.message import Message
+
+
+class SMTPTransport:
+    """ログイン済みのSMTP接続を保持して再利用する。"""
+
+    def __init__(self, smtp_server: str, smtp_port: int, smtp_user: str,
+                 smtp_password: str, use_tls: bool = True, keep_alive: bool = True,
+                 idle_timeout: float = 60, timeout: float = 30):
+        """
+        SMTPトランスポートを初期化する。
+
+        Args:
+            smtp_server: SMTPサーバーアドレス
+            smtp_port: SMTPサーバーポート
+            smtp_user: SMTPユーザー名
+            smtp_password: SMTPパスワード
+            use_tls: TLSを使用するか（デフォルト: True）
+            keep_alive: 送信後も接続を保持するか（デフォルト: True）
+            idle_timeout: この秒数以上アイドルだった接続は送信前にNOOPで確認する
+            timeout: ソケットのタイムアウト秒数
+        """
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.smtp_user = smtp_user
+        self.smtp_password = smtp_password
+        self.use_tls = use_tls
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._server: Optional['smtplib.SMTP'] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> 'smtplib.SMTP':
+        """SMTPサーバーに接続してログインする。"""
+        # smtplib は最初に送信する時点で読み込む（通知のない実行では読み込まない）
+        import smtplib
+
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            self._close_server(server)
+            raise
+        logging.debug(f"SMTP connection established: {self.smtp_server}:{self.smtp_port}")
+        return server
+
+    @staticmethod
+    def _close_server(server: 'smtplib.SMTP'):
+        """SMTP接続を閉じる（エラーは無視する）。"""
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _is_alive(self) -> bool:
+        """保持中の接続が使用可能かNOOPで確認する。"""
+        try:
+            return self._server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _get_server(self) -> 'smtplib.SMTP':
+        """使用可能なSMTP接続を取得する（必要に応じて再接続）。"""
+        if self._server is not None:
+            idle = time.monotonic() - self._last_used
+            if idle < self.idle_timeout or self._is_alive():
+                return self._server
+            logging.debug("SMTP connection is stale, reconnecting")
+            self._close_server(self._server)
+            self._server = None
+
+        self._server = self._connect()
+        return self._server
+
+    def send(self, msg: 'Message'):
+        """
+        メールを送信する。
+
+        保持中の接続で送信に失敗した場合は、1回だけ再接続して再送します。
+
+        Args:
+            msg: 送信するメールメッセージ
+
+        Raises:
+            smtplib.SMTPException: 再接続後も送信に失敗した場合
+        """
+        with self._lock:
+            reused = self._server is not None
+            try:
+                self._get_server().send_message(msg)
+            except Exception as e:
+                self._discard()
+                if not (reused and self._is_connection_error(e)):
+                    SMTP_FAILURES.inc(kind='send')
+                    raise
+                # 保持していた接続がサーバー側で切断されていた場合は再接続して再送
+                logging.debug(f"SMTP connection lost ({e}), reconnecting and retrying")
+                SMTP_FAILURES.inc(kind='connection_lost')
+                try:
+                    self._get_server().send_message(msg)
+                except Exception:
+                    self._discard()
+                    SMTP_FAILURES.inc(kind='send')
+                    raise
+
+            self._last_used = time.monotonic()
+            if not self.keep_alive:
+                self._discard()
+
+    @staticmethod
+    def _is_connection_error(error: Exception) -> bool:
+        """接続断（再接続で回復しうるエラー）かどうかを判定する。"""
+        import smtplib
+
+        if isinstance(error, (smtplib.SMTPServerDisconnected, OSError)):
+            return True
+        # 421: サーバー側のタイムアウト等によるサービス終了
+        return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == 421
+
+    def _discard(self):
+        """保持中の接続を破棄する。"""
+        if self._server is not None:
+            self._close_server(self._server)
+            self._server = None
+
+    def close(self):
+        """保持中の接続を閉じる。"""
+        with self._lock:
+            self._discard()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+既知デバイスの状態ストア
+
+ルータごとの既知デバイス（MACアドレス）を初回検出時刻・最終検出時刻と共に
+保持します。SQLiteバックエンドを使用するとプロセスの再起動や
+--single-run の実行をまたいで状態が引き継がれます。
+
+MACアドレスは48ビットの整数で受け渡しします（SQLiteには小文字・コロン区切りの
+文字列で保存します）。
+
+接続中のデバイスの最終検出時刻はルータ単位で記録し（ルータの最終ポーリング時刻）、
+デバイスごとの最終検出時刻は切断時にのみ書き込みます。これにより1回の
+ポーリングで書き込む件数は、接続中のデバイス数ではなく変化したデバイス数に
+比例します。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from src.device import format_mac, parse_mac
+
+
+class DeviceStateStore:
+    """既知デバイス状態ストアの基底クラス（メモリ上のみで保持）。"""
+
+    def __init__(self):
+        """状態ストアを初期化する。"""
+        self._known: Dict[str, Dict[int, Dict[str, float]]] = {}
+        # ルータ名 -> 最終ポーリング時刻（接続中デバイスの最終検出時刻）
+        self._last_poll: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def load_known_devices(self) -> Dict[str, Set[int]]:
+        """
+        初期化済みルータごとの接続中デバイスを読み込む。
+
+        Returns:
+            ルータ名をキー、接続中のMACアドレス（整数）のセットを値とする辞書
+        """
+        with self._lock:
+            return {
+                router: {mac for mac, rec in devices.items() if rec['connected']}
+                for router, devices in self._known.items()
+            }
+
+    def initialize_router(self, router: str, macs: Iterable[int],
+                          timestamp: Optional[float] = None):
+        """
+        ルータの初期デバイスリストを記録する。
+
+        Args:
+            router: ルータ名
+            macs: 初期デバイスのMACアドレス（整数）
+            timestamp: 検出時刻（UNIX時刻、省略時は現在時刻）
+        """
+        self.update(router, macs, macs, (), timestamp)
+
+    def load_recent_departures(self, since: float) -> Dict[str, Dict[int, float]]:
+        """
+        指定時刻以降に最後に検出され、現在は切断されているデバイスを読み込む。
+
+        Args:
+            since: 最終検出時刻の下限（UNIX時刻）
+
+        Returns:
+            ルータ名をキー、MACアドレス（整数）から最終検出時刻への辞書を値とする辞書
+        """
+        with self._lock:
+            departures: Dict[str, Dict[int, float]] = {}
+            for router, devices in self._known.items():
+                for mac, rec in devices.items():
+                    if not rec['connected'] and rec['last_seen'] >= since:
+                        departures.setdefault(router, {})[mac] = rec['last_seen']
+            return departures
+
+    def update(self, router: str, current_macs: Iterable[int], new_macs: Iterable[int],
+               disconnected_macs: Iterable[int], timestamp: Optional[float] = None):
+        """
+        1回分のポーリング結果を記録する。
+
+        接続中のデバイスの最終検出時刻はルータの最終ポーリング時刻で表すため、
+        書き込むのは接続・切断されたデバイスのみです。切断されたデバイスの
+        最終検出時刻は前回のポーリング時刻になります。
+
+        Args:
+            router: ルータ名
+            current_macs: 現在接続中のMACアドレス（最終検出時刻はルータ単位で記録するため未使用）
+            new_macs: 新たに接続されたMACアドレス
+            disconnected_macs: 切断されたMACアドレス
+            timestamp: 検出時刻（UNIX時刻、省略時は現在時刻）
+        """
+        now = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            devices = self._known.setdefault(router, {})
+            previous_poll = self._last_poll.get(router, now)
+            for mac in disconnected_macs:
+                rec = devices.get(mac)
+                if rec is not None and rec['connected']:
+                    rec['connected'] = False
+                    rec['last_seen'] = max(rec['last_seen'], previous_poll)
+            for mac in new_macs:
+                rec = devices.setdefault(mac, {'first_seen': now})
+                rec['last_seen'] = now
+                rec['connected'] = True
+            self._last_poll[router] = now
+
+    def touch(self, router: str, timestamp: Optional[float] = None):
+        """
+        接続中の全デバイスの最終検出時刻を更新する（デバイスリストに変化がない場合）。
+
+        Args:
+            router: ルータ名
+            timestamp: 検出時刻（UNIX時刻、省略時は現在時刻）
+        """
+        now = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            if router in self._known:
+                self._last_poll[router] = now
+
+    def get_device(self, router: str, mac: int) -> Optional[Dict[str, float]]:
+        """
+        デバイスの記録を取得する。
+
+        Args:
+            router: ルータ名
+            mac: MACアドレス（整数）
+
+        Returns:
+            'first_seen', 'last_seen', 'connected' を含む辞書（未記録の場合はNone）
+        """
+        with self._lock:
+            rec = self._known.get(router, {}).get(mac)
+            if rec is None:
+                return None
+            rec = dict(rec)
+            if rec['connected']:
+                rec['last_seen'] = max(rec['last_seen'], self._last_poll.get(router, 0))
+            return rec
+
+    def close(self):
+        """状態ストアを閉じる。"""
+
+
+class SQLiteStateStore(DeviceStateStore):
+    """SQLiteファイルに既知デバイスを永続化する状態ストア。"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS routers (
+            name TEXT PRIMARY KEY,
+            initialized_at REAL NOT NULL,
+            last_seen REAL
+        );
+        CREATE TABLE IF NOT EXISTS devices (
+            router TEXT NOT NULL,
+            mac TEXT NOT NULL,
+            first_seen REAL NOT NULL,
+            last_seen REAL NOT NULL,
+            connected INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (router, mac)
+        );
+    """
+
+    def __init__(self, path: str):
+        """
+        SQLite状態ストアを初期化する。
+
+        Args:
+            path: SQLiteデータベースファイルのパス
+        """
+        super().__init__()
+        self.path = path
+        # ポーリングスレッドから共有するため、排他はロックで行う
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """以前のバージョンで作成したデータベースに不足している列を追加する。"""
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(routers)')}
+        if 'last_seen' not in columns:
+            self._conn.execute('ALTER TABLE routers ADD COLUMN last_seen REAL')
+
+    def load_known_devices(self) -> Dict[str, Set[int]]:
+        """
+        初期化済みルータごとの接続中デバイスをデータベースから読み込む。
+
+        Returns:
+            ルータ名をキー、接続中のMACアドレス（整数）のセットを値とする辞書
+        """
+        with self._lock:
+            known: Dict[str, Set[int]] = {
+                name: set() for (name,) in self._conn.execute('SELECT name FROM routers')
+            }
+            rows = self._conn.execute('SELECT router, mac FROM devices WHERE connected = 1')
+            for router, mac in rows:
+                known.setdefault(router, set()).add(parse_mac(mac))
+        logging.info(f"Loaded device state from {self.path}: {len(known)} router(s)")
+        return known
+
+    def load_recent_departures(self, since: float) -> Dict[str, Dict[int, float]]:
+        """
+        指定時刻以降に最後に検出され、現在は切断されているデバイスをデータベースから読み込む。
+
+        Args:
+            since: 最終検出時刻の下限（UNIX時刻）
+
+        Returns:
+            ルータ名をキー、MACアドレス（整数）から最終検出時刻への辞書を値とする辞書
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT router, mac, last_seen FROM devices '
+                'WHERE connected = 0 AND last_seen >= ?',
+                (since,)
+            ).fetchall()
+        departures: Dict[str, Dict[int, float]] = {}
+        for router, mac, last_seen in rows:
+            departures.setdefault(router, {})[parse_mac(mac)] = last_seen
+        return departures
+
+    def update(self, router: str, current_macs: Iterable[int], new_macs: Iterable[int],
+               disconnected_macs: Iterable[int], timestamp: Optional[float] = None):
+        """
+        1回分のポーリング結果を1トランザクションでデータベースに書き込む。
+
+        書き込むのは接続・切断されたデバイスとルータの最終ポーリング時刻のみです。
+
+        Args:
+            router: ルータ名
+            current_macs: 現在接続中のMACアドレス（最終検出時刻はルータ単位で記録するため未使用）
+            new_macs: 新たに接続されたMACアドレス
+            disconnected_macs: 切断されたMACアドレス
+            timestamp: 検出時刻（UNIX時刻、省略時は現在時刻）
+        """
+        now = timestamp if timestamp is not None else time.time()
+        new_macs = [format_mac(mac) for mac in new_macs]
+        disconnected_macs = [format_mac(mac) for mac in disconnected_macs]
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute('BEGIN')
+            try:
+                cur.execute(
+                    'INSERT OR IGNORE INTO routers (name, initialized_at, last_seen) '
+                    'VALUES (?, ?, ?)',
+                    (router, now, now)
+                )
+                # 切断されたデバイスの最終検出時刻は前回のポーリング時刻
+                cur.executemany(
+                    'UPDATE devices SET connected = 0, last_seen = MAX(last_seen, COALESCE('
+                    '(SELECT last_seen FROM routers WHERE name = devices.router), last_seen)) '
+                    'WHERE router = ? AND mac = ? AND connected = 1',
+                    [(router, mac) for mac in disconnected_macs]
+                )
+                cur.executemany(
+                    'INSERT INTO devices (router, mac, first_seen, last_seen, connected) '
+                    'VALUES (?, ?, ?, ?, 1) '
+                    'ON CONFLICT (router, mac) DO UPDATE SET connected = 1, last_seen = ?',
+                    [(router, mac, now, now, now) for mac in new_macs]
+                )
+                cur.execute('UPDATE routers SET last_seen = ? WHERE name = ?', (now, router))
+                cur.execute('COMMIT')
+            except Exception:
+                cur.execute('ROLLBACK')
+                raise
+
+    def touch(self, router: str, timestamp: Optional[float] = None):
+        """
+        接続中の全デバイスの最終検出時刻を更新する（デバイスリストに変化がない場合）。
+
+        ルータの最終ポーリング時刻のみを更新するため、デバイス数によらず1行の書き込みです。
+
+        Args:
+            router: ルータ名
+            timestamp: 検出時刻（UNIX時刻、省略時は現在時刻）
+        """
+        now = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            self._conn.execute('UPDATE routers SET last_seen = ? WHERE name = ?', (now, router))
+
+    def get_device(self, router: str, mac: int) -> Optional[Dict[str, float]]:
+        """
+        デバイスの記録をデータベースから取得する。
+
+        Args:
+            router: ルータ名
+            mac: MACアドレス（整数）
+
+        Returns:
+            'first_seen', 'last_seen', 'connected' を含む辞書（未記録の場合はNone）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT d.first_seen, d.last_seen, d.connected, r.last_seen FROM devices d '
+                'LEFT JOIN routers r ON r.name = d.router '
+                'WHERE d.router = ? AND d.mac = ?',
+                (router, format_mac(mac))
+            ).fetchone()
+        if row is None:
+            return None
+        first_seen, last_seen, connected, router_last_seen = row
+        if connected and router_last_seen is not None:
+            last_seen = max(last_seen, router_last_seen)
+        return {'first_seen': first_seen, 'last_seen': last_seen, 'connected': bool(connected)}
+
+    def close(self):
+        """データベース接続を閉じる。"""
+        with self._lock:
+            self._conn.close()
+
+
+def create_state_store(store_config: Optional[Dict]) -> DeviceStateStore:
+    """
+    設定から状態ストアを生成する。
+
+    Args:
+        store_config: state_store 設定（'type' と 'path' キー）。Noneの場合はメモリ上のみ
+
+    Returns:
+        状態ストアのインスタンス
+
+    Raises:
+        ValueError: 未知のストア種別が指定された場合
+    """
+    store_config = store_config or {}
+    store_type = store_config.get('type', 'memory')
+
+    if store_type == 'memory':
+        return DeviceStateStore()
+    if store_type == 'sqlite':
+        return SQLiteStateStore(store_config.get('path', 'wifi_notifier_state.db'))
+
+    raise ValueError(f"未知の状態ストア種別です: {store_type}")
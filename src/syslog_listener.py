@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+syslogによる接続・切断イベントの受信
+
+ルータが syslog で送信する無線クライアントの接続（association）・切断
+（disassociation）のログを受信し、ルータモデルごとのパターンで
+接続・切断イベントに変換します。ポーリングの間隔を待たずに
+新規接続を通知できます（ポーリングは取りこぼしを補う突き合わせとして継続）。
+
+- UDP（RFC 5426）: 1データグラムを1メッセージとして扱う
+- TCP（RFC 6587）: 改行区切りとオクテットカウントの両方のフレーミングに対応
+"""
+
+import logging
+import re
+import socketserver
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.device import Device
+from src.log_pipeline import EVENT_CONNECT, EVENT_DISCONNECT
+
+# パターン中の {mac} を置き換えるMACアドレスの正規表現
+MAC_REGEX = r'(?P<mac>[0-9A-Fa-f]{2}(?:[:-][0-9A-Fa-f]{2}){5})'
+# 1メッセージの最大長（バイト、これを超える部分は読み捨てる）
+MAX_MESSAGE_SIZE = 8192
+
+# メッセージの送信元アドレスとメッセージ本文を受け取るハンドラー
+MessageHandler = Callable[[str, str], None]
+
+
+class SyslogMatcher:
+    """syslogメッセージを接続・切断イベントに変換する。"""
+
+    def __init__(self, patterns: Dict[str, Sequence[str]]):
+        """
+        パターンをコンパイルする。
+
+        パターンは名前付きグループ mac（{mac} と書くとMACアドレスの正規表現に
+        置き換えます）を含む必要があります。ip と hostname の名前付きグループが
+        あれば、デバイス情報として使用します。
+
+        Args:
+            patterns: イベント（'connect' または 'disconnect'）から正規表現のリストへの辞書
+
+        Raises:
+            ValueError: 未知のイベントや、mac グループのない・不正な正規表現の場合
+        """
+        self._patterns: List[Tuple[str, re.Pattern]] = []
+        for event, expressions in patterns.items():
+            if event not in (EVENT_CONNECT, EVENT_DISCONNECT):
+                raise ValueError(f"未知のsyslogイベントです: {event}")
+            for expression in expressions:
+                try:
+                    regex = re.compile(expression.replace('{mac}', MAC_REGEX))
+                except re.error as e:
+                    raise ValueError(f"syslogパターンが不正です: {expression}: {e}")
+                if 'mac' not in regex.groupindex:
+                    raise ValueError(f"syslogパターンに mac グループがありません: {expression}")
+                self._patterns.append((event, regex))
+
+    def match(self, message: str) -> Optional[Tuple[str, Device]]:
+        """
+        メッセージをイベントに変換する。
+
+        Args:
+            message: syslogメッセージ
+
+        Returns:
+            (イベント, デバイス情報) のタプル（どのパターンにも一致しない場合はNone）。
+            IPアドレス・ホスト名が含まれないメッセージのデバイス情報はMACアドレスのみの記録です
+        """
+        for event, regex in self._patterns:
+            found = regex.search(message)
+            if found is None:
+                continue
+            groups = found.groupdict()
+            try:
+                return event, Device(groups['mac'], groups.get('ip'), groups.get('hostname'))
+            except ValueError:
+                return None
+        return None
+
+
+class _UDPHandler(socketserver.BaseRequestHandler):
+    """1データグラムを1メッセージとして処理する。"""
+
+    def handle(self):
+        data = self.request[0][:MAX_MESSAGE_SIZE]
+        self.server.dispatch(self.client_address[0], data)
+
+
+class _TCPHandler(socketserver.StreamRequestHandler):
+    """改行区切り、またはオクテットカウント（"長さ 本文"）のメッセージを処理する。"""
+
+    def handle(self):
+        rfile = self.rfile
+        while True:
+            first = rfile.read(1)
+            if not first:
+                return
+            if first.isdigit():
+                data = self._read_counted(first)
+                if data is None:
+                    return
+            else:
+                data = first + rfile.readline(MAX_MESSAGE_SIZE)
+            self.server.dispatch(self.client_address[0], data)
+
+    def _read_counted(self, first: bytes) -> Optional[bytes]:
+        """オクテットカウントのフレームを読み込む（不正なフレームの場合はNone）。"""
+        length = first
+        while True:
+            char = self.rfile.read(1)
+            if char == b' ':
+                break
+            if not char.isdigit() or len(length) > 6:
+                logging.debug(f"Invalid syslog frame from {self.client_address[0]}")
+                return None
+            length += char
+        remaining = int(length)
+        data = self.rfile.read(min(remaining, MAX_MESSAGE_SIZE))
+        remaining -= len(data)
+        # 上限を超える部分はメモリに保持せずに読み捨て、次のフレームの境界に合わせる
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, MAX_MESSAGE_SIZE))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        return data
+
+
+class _DispatchMixin:
+    """受信したメッセージをデコードしてハンドラーに渡す。"""
+
+    allow_reuse_address = True
+    handler: MessageHandler
+    protocol: str
+
+    def dispatch(self, source: str, data: bytes):
+        message = data.decode('utf-8', 'replace').strip()
+        if not message:
+            return
+        try:
+            self.handler(source, message)
+        except Exception as e:
+            logging.error(f"Error handling syslog message from {source}: {e}")
+
+
+class _UDPServer(_DispatchMixin, socketserver.UDPServer):
+    """受信順にメッセージを処理するUDPサーバー（イベントの順序を保つため単一スレッド）。"""
+
+
+class _TCPServer(_DispatchMixin, socketserver.ThreadingTCPServer):
+    """接続ごとのスレッドでメッセージを処理するTCPサーバー。"""
+
+    daemon_threads = True
+
+
+class SyslogListener:
+    """UDP・TCPでsyslogメッセージを受信する。"""
+
+    PROTOCOLS = ('udp', 'tcp', 'both')
+
+    def __init__(self, handler: MessageHandler, host: str = '0.0.0.0', port: int = 5514,
+                 protocol: str = 'udp'):
+        """
+        受信サーバーを初期化する（start() で待ち受けを開始します）。
+
+        Args:
+            handler: 送信元アドレスとメッセージを受け取る関数（受信スレッドで呼び出されます）
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート（0で空きポートを自動選択）
+            protocol: 'udp'、'tcp' または 'both'
+
+        Raises:
+            ValueError: 未知のプロトコルが指定された場合
+        """
+        if protocol not in self.PROTOCOLS:
+            raise ValueError(f"未対応のsyslogプロトコルです: {protocol}")
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self._servers: List[socketserver.BaseServer] = []
+
+    @property
+    def addresses(self) -> List[Tuple[str, str, int]]:
+        """待ち受け中の (プロトコル, アドレス, ポート) のリスト。"""
+        return [(server.protocol, *server.server_address[:2]) for server in self._servers]
+
+    def start(self):
+        """バックグラウンドスレッドで待ち受けを開始する。"""
+        servers = []
+        if self.protocol in ('udp', 'both'):
+            servers.append(('udp', _UDPServer, _UDPHandler))
+        if self.protocol in ('tcp', 'both'):
+            servers.append(('tcp', _TCPServer, _TCPHandler))
+
+        for protocol, server_class, handler_class in servers:
+            server = server_class((self.host, self.port), handler_class)
+            server.handler = self.handler
+            server.protocol = protocol
+            self._servers.append(server)
+            threading.Thread(
+                target=server.serve_forever, name=f"syslog-{protocol}", daemon=True
+            ).start()
+
+        for protocol, host, port in self.addresses:
+            logging.info(f"Listening for syslog on {protocol}://{host}:{port}")
+
+    def stop(self):
+        """待ち受けを停止する。"""
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+
+def create_syslog_listener(config: Optional[Dict],
+                           handler: MessageHandler) -> Optional[SyslogListener]:
+    """
+    設定からsyslogの受信サーバーを生成する。
+
+    Args:
+        config: config.yaml の syslog 設定
+        handler: 送信元アドレスとメッセージを受け取る関数
+
+    Returns:
+        受信サーバー（無効の場合はNone）
+    """
+    config = config or {}
+    if not config.get('enabled', False):
+        return None
+    return SyslogListener(
+        handler,
+        host=config.get('host', '0.0.0.0'),
+        port=config.get('port', 5514),
+        protocol=config.get('protocol', 'udp')
+    )
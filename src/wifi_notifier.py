@@ -7,22 +7,78 @@ WiFiルータのWiFi新規接続を監視し、特定のデバイスが接続さ
 """
 
 import requests
-import time
-import smtplib
 import json
+import hashlib
 import yaml
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import os
+import signal
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Set
-from src.html_parser import parse_wireless_lan_status, extract_devices_from_json
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple, Union
+from src.html_parser import (
+    PARSER_FAST,
+    parse_wireless_lan_status,
+    extract_devices_from_json,
+)
+from src.poller import PollingEngine
+from src.state_store import DeviceStateStore, create_state_store
+from src.smtp_transport import SMTPTransport
+from src.dispatcher import NotificationDispatcher
+from src.device import Device, format_mac, parse_mac
+from src.oui import configure_vendor_lookup, is_locally_administered
+from src.device_diff import DeviceDiff, diff_devices, index_devices
+from src.scheduler import OUTCOME_CHANGED, OUTCOME_FAILED, OUTCOME_QUIET, AdaptiveSchedule
+from src.router_session import RouterFetchError, RouterSession
+from src.router_drivers import Endpoint, RouterDriver, get_driver
+from src.metrics import (
+    REGISTRY,
+    STAGE_DIFF,
+    STAGE_FETCH,
+    STAGE_LOGIN,
+    STAGE_NOTIFY,
+    STAGE_PARSE,
+    MetricsServer,
+    record_poll_success,
+    time_stage,
+)
+from src.log_pipeline import (
+    EVENT_CHANGE,
+    EVENT_CONNECT,
+    EVENT_DISCONNECT,
+    EventLog,
+    create_event_log,
+    setup_logging,
+)
+from src.presence_history import PresenceHistory, create_presence_history
+from src.presence_tracker import (
+    DEFAULT_ABSENCE_GRACE,
+    PresenceChanges,
+    PresenceTracker,
+    create_presence_tracker,
+)
+from src.session_cache import SessionCache, create_session_cache
+from src.rate_limit import (
+    NotificationBatch,
+    NotificationThrottle,
+    create_notification_throttle,
+    throttle_settings,
+)
+
+if TYPE_CHECKING:
+    from src.device_sources import DeviceSource, FileWatcher
+    from src.notifiers import Notifier, NotifierGroup
+    from src.syslog_listener import SyslogListener, SyslogMatcher
 
 
 class WiFiRouter:
     """WiFiルータと通信するためのインターフェース。"""
     
-    def __init__(self, router_ip: str, username: str, password: str):
+    def __init__(self, router_ip: str, username: str, password: str,
+                 name: str = None, timeout: float = 10, html_parser: str = PARSER_FAST,
+                 retries: int = 2, backoff_factor: float = 0.5,
+                 expired_markers: List[str] = None, driver: RouterDriver = None):
         """
         ルータ接続を初期化する。
         
@@ -30,69 +86,275 @@ class WiFiRouter:
             router_ip: ルータのIPアドレス
             username: 管理者ユーザー名
             password: 管理者パスワード
+            name: ルータの識別名（省略時はIPアドレス）
+            timeout: HTTPリクエストのタイムアウト秒数（デフォルト: 10）
+            html_parser: HTML解析に使用するパーサー（'fast' または 'bs4'、デフォルト: 'fast'）
+            retries: 接続エラー・一時的なエラー時の再試行回数（デフォルト: 2）
+            backoff_factor: 再試行間隔の係数（秒、デフォルト: 0.5）
+            expired_markers: レスポンス本文に含まれていればセッション切れとみなす文字列
+            driver: ルータモデル別ドライバー（省略時は汎用ドライバー）
         """
         self.router_ip = router_ip
         self.username = username
         self.password = password
-        self.session = requests.Session()
+        self.name = name or router_ip
+        self.timeout = timeout
+        self.html_parser = html_parser
+        self.driver = driver or get_driver()
+        self.last_fetch_unchanged = False
+        self.last_fetch_ok = False
+        # キャッシュしたセッションを復元し、まだデバイスリストの取得に成功していないか
+        self.session_resumed = False
+        # 前回のレスポンスのキャッシュ（変更がない場合に解析を省略するため）
+        self._last_digest = None
+        self._last_devices = None
+        self._last_etag = None
+        self._last_modified = None
+        # コネクションプール・再試行・セッション切れ時の自動再ログインを備えたセッション
+        self.session = RouterSession(
+            retries=retries,
+            backoff_factor=backoff_factor,
+            expired_markers=expired_markers or ()
+        )
+        self.session.reauthenticate = self.login
         self.base_url = f"http://{router_ip}"
         
     def login(self) -> bool:
         """
-        ルータにログインする（Basic認証）。
+        ルータにログインする。
+        
+        認証方法はドライバー（router.model）によって異なります。
+        汎用ドライバーはBasic認証、WG2600シリーズはSHA-256ハッシュ認証を使用します。
         
         Returns:
             ログイン成功時はTrue、失敗時はFalse
         """
-        try:
-            # 注記: これは汎用的なBasic認証の実装です
-            # 実際のWiFiルータはモデルによって異なる認証方法が必要な場合があります
-            # ユーザーは特定のルータモデルに合わせてカスタマイズする必要があります
-            # SHA-256ハッシュなど他の認証方法についてはCUSTOMIZATION.mdを参照してください
-            
-            from requests.auth import HTTPBasicAuth
-            
-            # Basic認証を設定
-            self.session.auth = HTTPBasicAuth(self.username, self.password)
-            
-            # 認証が必要なページにアクセスして確認
-            response = self.session.get(f"{self.base_url}/index.html", timeout=10)
-            return response.status_code == 200
+        with time_stage(STAGE_LOGIN, self.name) as stage:
+            try:
+                # 注記: 認証方法はモデルによって異なります
+                # 対応していないモデルは router_drivers.py にドライバーを追加してください
+                # 詳細はCUSTOMIZATION.mdを参照してください
+                self.session.authenticated = self.driver.login(self)
+                
+            except Exception as e:
+                logging.error(f"[{self.name}] Login failed: {e}")
+                self.session.authenticated = False
             
-        except Exception as e:
-            logging.error(f"Login failed: {e}")
-            return False
+            if not self.session.authenticated:
+                stage.fail()
+            return self.session.authenticated
+    
+    @property
+    def authenticated(self) -> bool:
+        """ログイン済み（セッション切れ後の再ログインに失敗していない）かどうか。"""
+        return self.session.authenticated
+    
+    def close(self):
+        """ルータとの接続（コネクションプール）を閉じる。"""
+        self.session.close()
+    
+    def session_fingerprint(self) -> str:
+        """
+        キャッシュしたセッションが今の設定で使用できるか判定するための値を返す。
+        
+        接続先・認証情報・ルータモデルのいずれかが変更されると値が変わります。
+        
+        Returns:
+            接続先と認証情報のSHA-256ハッシュ（16進数）
+        """
+        source = '\0'.join((self.base_url, self.username, self.password, self.driver.model))
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+    
+    def export_session(self) -> List[Dict]:
+        """
+        セッションCookieをキャッシュ用に書き出す。
+        
+        Returns:
+            'name', 'value', 'domain', 'path', 'secure', 'expires' を含む辞書のリスト
+        """
+        return [
+            {
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+                'secure': cookie.secure,
+                'expires': cookie.expires,
+            }
+            for cookie in self.session.cookies
+        ]
     
-    def get_connected_devices(self) -> List[Dict[str, str]]:
+    def resume_session(self, cookies: List[Dict]):
+        """
+        キャッシュしたセッションを復元し、ログイン済みとして扱う。
+        
+        ログインのリクエストは送信しません。次のデバイスリストの取得で
+        セッションが拒否された場合は、ログインしてやり直します。
+        
+        Args:
+            cookies: export_session() で書き出したセッションCookie
+        """
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                path=cookie.get('path', '/'), secure=cookie.get('secure', False),
+                expires=cookie.get('expires')
+            )
+        self.driver.resume(self)
+        self.session.authenticated = True
+        self.session_resumed = True
+    
+    def get_connected_devices(self) -> List[Device]:
         """
         現在接続中のWiFiデバイスのリストを取得する。
         
+        取得に失敗した場合は空のリストを返します。失敗とデバイス0台を区別する
+        必要がある場合は fetch_connected_devices() を使用するか、
+        last_fetch_ok を確認してください。
+        
         Returns:
-            デバイス情報を含む辞書のリスト
-            各辞書には 'mac', 'ip', 'hostname' キーが含まれます
+            デバイス情報（Device）のリスト
+            各デバイスは 'mac', 'ip', 'hostname' キーで参照できます
         """
         try:
-            # 注記: 実際のエンドポイントはルータモデルによって異なります
-            # 一般的なエンドポイント: /wlmaclist.cgi, /index.cgi/wireless_status
-            # ユーザーは特定のモデルに合わせてカスタマイズする必要があります
+            return self.fetch_connected_devices()
+        except RouterFetchError as e:
+            logging.warning(f"[{self.name}] Failed to get device list: {e}")
+            return []
+        except Exception as e:
+            logging.error(f"[{self.name}] Error getting connected devices: {e}")
+            return []
+    
+    def fetch_connected_devices(self) -> List[Device]:
+        """
+        現在接続中のWiFiデバイスのリストを取得する（失敗時は例外を送出）。
+        
+        前回と同じレスポンスが返された場合（304 Not Modified または本文のダイジェストが
+        一致する場合）は解析を省略して前回のデバイスリストを返し、
+        last_fetch_unchanged をTrueに設定します。返されるリストは前回と同一の
+        オブジェクトになる場合があるため、呼び出し側で変更しないでください。
+        セッション切れを検出した場合は自動的に再ログインしてやり直します。
+        
+        Returns:
+            デバイス情報（Device）のリスト
+            各デバイスは 'mac', 'ip', 'hostname' キーで参照できます
             
-            devices_url = f"{self.base_url}/index.cgi/wireless_client_list"
-            response = self.session.get(devices_url, timeout=10)
+        Raises:
+            RouterFetchError: 通信エラーまたはエラーステータスで取得できなかった場合
+        """
+        self.last_fetch_unchanged = False
+        self.last_fetch_ok = False
+        
+        if self.session_resumed:
+            # キャッシュしたセッションが拒否された場合（認証切れとして検出できない
+            # エラーを含む）は、ログインしてから1回だけやり直す
+            self.session_resumed = False
+            try:
+                return self._fetch_from_endpoints()
+            except RouterFetchError as e:
+                logging.info(f"[{self.name}] Cached session failed ({e}), logging in again")
+                if not self.login():
+                    raise
+        
+        return self._fetch_from_endpoints()
+    
+    def _fetch_from_endpoints(self) -> List[Device]:
+        """
+        エンドポイント候補からデバイスリストを取得する。
+        
+        Returns:
+            デバイス情報（Device）のリスト
             
-            if response.status_code != 200:
-                logging.warning(f"Failed to get device list: {response.status_code}")
-                return []
+        Raises:
+            RouterFetchError: すべての候補で取得できなかった場合
+        """
+        # ドライバーのエンドポイント候補を優先順に試し、取得できたエンドポイントと
+        # その形式（JSON/HTML）を以降のポーリングで使い続ける
+        error = "no endpoint"
+        for endpoint in self.driver.candidate_endpoints():
+            try:
+                devices = self._fetch_endpoint(endpoint)
+            except RouterFetchError as e:
+                error = f"{endpoint.path}: {e}"
+                continue
             
-            # レスポンスを解析 - ルータモデルによって異なります
-            # これはプレースホルダー実装です
-            devices = self._parse_device_list(response.text)
+            if self.driver.active_endpoint is not endpoint:
+                logging.debug(f"[{self.name}] Using device list endpoint {endpoint.path}")
+                self.driver.active_endpoint = endpoint
             return devices
+        
+        # 次回はすべての候補を試し直す
+        self.driver.active_endpoint = None
+        raise RouterFetchError(error)
+    
+    def _fetch_endpoint(self, endpoint: Endpoint) -> List[Device]:
+        """
+        1つのエンドポイントからデバイスリストを取得する。
+        
+        Args:
+            endpoint: デバイスリストのエンドポイント
             
-        except Exception as e:
-            logging.error(f"Error getting connected devices: {e}")
-            return []
+        Returns:
+            デバイス情報（Device）のリスト
+            
+        Raises:
+            RouterFetchError: 通信エラー、エラーステータスまたは解析エラーの場合
+        """
+        # 前回と同じエンドポイントの場合のみ、前回のレスポンスのキャッシュを使用する
+        cached = endpoint is self.driver.active_endpoint and self._last_devices is not None
+        headers = self._conditional_headers() if cached else {}
+        
+        with time_stage(STAGE_FETCH, self.name) as stage:
+            try:
+                response = self.session.get(
+                    f"{self.base_url}{endpoint.path}", headers=headers, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                raise RouterFetchError(f"request failed: {e}") from e
+            if response.status_code not in (200, 304):
+                stage.fail()
+        
+        if response.status_code == 304 and cached:
+            # ETag/Last-Modified による条件付きGETで変更なし
+            self.last_fetch_ok = True
+            self.last_fetch_unchanged = True
+            return self._last_devices
+        
+        if response.status_code != 200:
+            raise RouterFetchError(f"HTTP {response.status_code}")
+        
+        # 本文が前回と同一であれば解析を省略する
+        digest = hashlib.blake2b(response.content, digest_size=16).digest()
+        if cached and digest == self._last_digest:
+            self.last_fetch_ok = True
+            self.last_fetch_unchanged = True
+            return self._last_devices
+        
+        try:
+            with time_stage(STAGE_PARSE, self.name):
+                devices = self.driver.parse(endpoint, response.text, self.html_parser)
+        except ValueError as e:
+            raise RouterFetchError(f"invalid response: {e}") from e
+        
+        self.last_fetch_ok = True
+        self._last_digest = digest
+        self._last_devices = devices
+        self._last_etag = response.headers.get('ETag')
+        self._last_modified = response.headers.get('Last-Modified')
+        return devices
+    
+    def _conditional_headers(self) -> Dict[str, str]:
+        """前回のレスポンスに基づく条件付きGET用のヘッダーを返す。"""
+        headers = {}
+        if self._last_devices is None:
+            return headers
+        if self._last_etag:
+            headers['If-None-Match'] = self._last_etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+        return headers
     
-    def _parse_device_list(self, html_content: str) -> List[Dict[str, str]]:
+    def _parse_device_list(self, html_content: str) -> List[Device]:
         """
         HTMLレスポンスを解析してデバイス情報を抽出する。
         
@@ -102,7 +364,7 @@ class WiFiRouter:
             html_content: ルータからのHTML/JSONレスポンス
             
         Returns:
-            デバイス辞書のリスト
+            デバイス情報（Device）のリスト
         """
         devices = []
         
@@ -118,7 +380,7 @@ class WiFiRouter:
             logging.debug("JSONとして解析できなかったため、HTMLパースにフォールバックします")
         
         # HTMLスクレイピングにフォールバック
-        devices = parse_wireless_lan_status(html_content)
+        devices = parse_wireless_lan_status(html_content, parser=self.html_parser)
         if devices:
             logging.debug(f"Parsed {len(devices)} devices from HTML")
         
@@ -128,9 +390,13 @@ class WiFiRouter:
 class EmailNotifier:
     """SMTP経由でメール通知を処理する。"""
     
+    # 通知先の名前（ログとデッドレターの記録に使用）
+    name = 'email'
+    
     def __init__(self, smtp_server: str, smtp_port: int, smtp_user: str, 
                  smtp_password: str, sender_email: str, recipient_emails: List[str],
-                 use_tls: bool = True):
+                 use_tls: bool = True, keep_alive: bool = True, digest: bool = False,
+                 idle_timeout: float = 60, timeout: float = 30):
         """
         メール通知機能を初期化する。
         
@@ -142,6 +408,10 @@ class EmailNotifier:
             sender_email: 送信元メールアドレス
             recipient_emails: 受信者メールアドレスのリスト
             use_tls: TLSを使用するか（デフォルト: True）
+            keep_alive: SMTP接続を保持して再利用するか（デフォルト: True）
+            digest: 1回のチェックで検出した複数デバイスを1通にまとめるか（デフォルト: False）
+            idle_timeout: 保持中の接続を送信前にNOOPで確認するまでのアイドル秒数
+            timeout: SMTPサーバーとの通信のタイムアウト秒数
         """
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
@@ -150,51 +420,119 @@ class EmailNotifier:
         self.sender_email = sender_email
         self.recipient_emails = recipient_emails
         self.use_tls = use_tls
+        self.digest = digest
+        self.timeout = timeout
+        self.transport = SMTPTransport(
+            smtp_server, smtp_port, smtp_user, smtp_password,
+            use_tls=use_tls, keep_alive=keep_alive, idle_timeout=idle_timeout, timeout=timeout
+        )
     
-    def send_notification(self, device_info: Dict[str, str]) -> bool:
+    def send_notification(self, device_info: Dict[str, str], suppressed: int = 0) -> bool:
         """
         新しいデバイス接続についてメール通知を送信する。
         
         Args:
             device_info: デバイス情報を含む辞書
+            suppressed: 前回の通知以降にレート制限などで送信しなかった通知の件数
             
         Returns:
             メール送信成功時はTrue、失敗時はFalse
         """
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = ', '.join(self.recipient_emails)
-            msg['Subject'] = f"新しいWiFi接続を検出 - {device_info.get('hostname', 'Unknown Device')}"
-            
-            # メール本文を作成
-            body = self._create_email_body(device_info)
-            msg.attach(MIMEText(body, 'plain', 'utf-8'))
-            
-            # メールを送信
-            if self.use_tls:
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                server.starttls()
-            else:
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        name = device_info.get('hostname') or device_info.get('vendor') or 'Unknown Device'
+        subject = f"新しいWiFi接続を検出 - {name}"
+        if not self._send(subject, self._create_email_body(device_info, suppressed)):
+            return False
+        
+        logging.info(f"Notification sent for device: {device_info.get('mac', 'Unknown')}")
+        return True
+    
+    def send_digest(self, devices: List[Dict[str, str]], suppressed: int = 0) -> bool:
+        """
+        複数の新しいデバイス接続を1通のメールにまとめて送信する。
+        
+        Args:
+            devices: デバイス情報を含む辞書のリスト
+            suppressed: 前回の通知以降にレート制限などで送信しなかった通知の件数
             
-            server.login(self.smtp_user, self.smtp_password)
-            server.send_message(msg)
-            server.quit()
+        Returns:
+            メール送信成功時はTrue、失敗時はFalse
+        """
+        subject = f"新しいWiFi接続を検出 - {len(devices)}台のデバイス"
+        if not self._send(subject, self._create_digest_body(devices, suppressed)):
+            return False
+        
+        logging.info(f"Digest notification sent for {len(devices)} devices")
+        return True
+    
+    def send_notifications(self, devices: List[Dict[str, str]], suppressed: int = 0) -> bool:
+        """
+        1回のチェックで検出したデバイスについて通知を送信する。
+        
+        ダイジェストモードで複数デバイスがある場合は1通にまとめ、
+        それ以外はデバイスごとに送信します。
+        
+        Args:
+            devices: デバイス情報を含む辞書のリスト
+            suppressed: 前回の通知以降にレート制限などで送信しなかった通知の件数
+                （最初のメールに記載します）
             
-            logging.info(f"Notification sent for device: {device_info.get('mac', 'Unknown')}")
+        Returns:
+            すべての送信に成功した場合はTrue
+        """
+        if not devices:
             return True
+        if self.digest and len(devices) > 1:
+            return self.send_digest(devices, suppressed)
+        
+        results = [
+            self.send_notification(device, suppressed if i == 0 else 0)
+            for i, device in enumerate(devices)
+        ]
+        return all(results)
+    
+    def _send(self, subject: str, body: str) -> bool:
+        """
+        メールを作成して送信する。
+        
+        Args:
+            subject: 件名
+            body: 本文
             
-        except Exception as e:
-            logging.error(f"Failed to send email: {e}")
-            return False
+        Returns:
+            メール送信成功時はTrue、失敗時はFalse
+        """
+        # MIMEクラスはメールを送信する場合にのみ読み込む
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        
+        with time_stage(STAGE_NOTIFY) as stage:
+            try:
+                msg = MIMEMultipart()
+                msg['From'] = self.sender_email
+                msg['To'] = ', '.join(self.recipient_emails)
+                msg['Subject'] = subject
+                msg.attach(MIMEText(body, 'plain', 'utf-8'))
+                
+                # 保持中のSMTP接続で送信（切断時は自動的に再接続）
+                self.transport.send(msg)
+                return True
+                
+            except Exception as e:
+                logging.error(f"Failed to send email: {e}")
+                stage.fail()
+                return False
+    
+    def close(self):
+        """保持中のSMTP接続を閉じる。"""
+        self.transport.close()
     
-    def _create_email_body(self, device_info: Dict[str, str]) -> str:
+    def _create_email_body(self, device_info: Dict[str, str], suppressed: int = 0) -> str:
         """
         メール本文テキストを作成する。
         
         Args:
             device_info: デバイス情報を含む辞書
+            suppressed: 前回の通知以降に送信しなかった通知の件数
             
         Returns:
             フォーマット済みのメール本文
@@ -208,16 +546,83 @@ class EmailNotifier:
 MACアドレス: {device_info.get('mac', 'Unknown')}
 IPアドレス: {device_info.get('ip', 'Unknown')}
 ホスト名: {device_info.get('hostname', 'Unknown')}
-
+ベンダー: {self._vendor_label(device_info)}
+{self._suppressed_note(suppressed)}
 ---
 WiFi Client Notifier
 """
         return body.strip()
+    
+    @staticmethod
+    def _vendor_label(device_info: Dict[str, str]) -> str:
+        """MACアドレスのOUIから求めたベンダー名を返す（不明な場合はその理由）。"""
+        vendor = device_info.get('vendor')
+        if vendor:
+            return vendor
+        try:
+            if is_locally_administered(parse_mac(device_info.get('mac') or '')):
+                return "不明（端末がランダムに生成したMACアドレス）"
+        except ValueError:
+            pass
+        return "不明"
+    
+    @staticmethod
+    def _suppressed_note(suppressed: int) -> str:
+        """送信しなかった通知の件数の注記を返す（0件の場合は空行のみ）。"""
+        if suppressed <= 0:
+            return ""
+        return (
+            f"\n※前回の通知以降、送信回数の制限または重複のため"
+            f"{suppressed}件の通知を省略しました\n"
+        )
+    
+    def _create_digest_body(self, devices: List[Dict[str, str]], suppressed: int = 0) -> str:
+        """
+        ダイジェストメールの本文テキストを作成する。
+        
+        Args:
+            devices: デバイス情報を含む辞書のリスト
+            suppressed: 前回の通知以降に送信しなかった通知の件数
+            
+        Returns:
+            フォーマット済みのメール本文
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        lines = [
+            f"新しいWiFi接続が{len(devices)}件検出されました",
+            "",
+            f"検出時刻: {timestamp}",
+        ]
+        for i, device_info in enumerate(devices, 1):
+            lines += [
+                "",
+                f"[{i}]",
+                f"MACアドレス: {device_info.get('mac', 'Unknown')}",
+                f"IPアドレス: {device_info.get('ip', 'Unknown')}",
+                f"ホスト名: {device_info.get('hostname', 'Unknown')}",
+                f"ベンダー: {self._vendor_label(device_info)}",
+            ]
+        note = self._suppressed_note(suppressed)
+        if note:
+            lines += [note.rstrip("\n")]
+        lines += ["", "---", "WiFi Client Notifier"]
+        return "\n".join(lines)
 
 
 class WiFiMonitor:
     """WiFi接続を監視して通知を送信する。"""
     
+    # 設定の再読み込みでは反映せず、再起動が必要な設定
+    RESTART_REQUIRED_KEYS = (
+        'dispatch', 'state_store', 'poll_workers', 'metrics', 'event_log',
+        'presence_history', 'config_reload', 'notifiers', 'session_cache', 'syslog',
+    )
+    # SMTP接続を維持したまま反映できるメール設定
+    EMAIL_RUNTIME_KEYS = ('sender_email', 'recipient_emails', 'digest')
+    # ルータへの接続をやり直さずに反映できるルータ設定
+    ROUTER_SCHEDULE_KEYS = ('check_interval', 'scheduler')
+    
     def __init__(self, config_path: str):
         """
         設定ファイルを使用して監視機能を初期化する。
@@ -225,12 +630,43 @@ class WiFiMonitor:
         Args:
             config_path: 設定ファイルのパス
         """
+        self.config_path = config_path
         self.config = self._load_config(config_path)
+        self._config_stat = self._stat_config()
+        self._reload_lock = threading.Lock()
         self._setup_logging()  # 他の処理の前にロギングを設定
         self.router = None
+        self.routers: List[WiFiRouter] = []
+        self.router_intervals: Dict[str, float] = {}
+        self.router_configs: Dict[str, Dict] = {}
         self.notifier = None
-        self.known_devices: Set[str] = set()
-        self.monitored_macs: Set[str] = set()
+        self.dispatcher: NotificationDispatcher = None
+        # メール以外の通知先と、その通知先ごとのディスパッチキュー
+        self.notifiers: List['Notifier'] = []
+        self.notifier_dispatchers: List[NotificationDispatcher] = []
+        self.notifier_group: 'NotifierGroup' = None
+        self.notification_throttle: NotificationThrottle = None
+        # ルータ名 -> 整数のMAC -> デバイス情報（状態ストアから復元した場合はMACアドレスのみ）
+        self.known_devices: Dict[str, Dict[int, Device]] = {}
+        self.monitored_macs: Set[int] = set()
+        self.presence_tracker: PresenceTracker = None
+        self.engine: PollingEngine = None
+        self.state_store: DeviceStateStore = None
+        self.session_cache: SessionCache = None
+        self.metrics_server: MetricsServer = None
+        self.event_log: EventLog = None
+        self.presence_history: PresenceHistory = None
+        self.metrics_textfile: str = None
+        self.ready_routers: Set[str] = set()
+        self._diffed_routers: Set[str] = set()
+        # ポーリングとsyslogのイベントが同じルータの既知デバイスを同時に更新しないためのロック
+        self._router_locks: Dict[str, threading.Lock] = {}
+        self.syslog_listener: 'SyslogListener' = None
+        # syslogの送信元アドレス -> (ルータ, メッセージのパターン)
+        self._syslog_routes: Dict[str, Tuple[WiFiRouter, 'SyslogMatcher']] = {}
+        # ローカルのデバイス情報源のファイルの変更監視（常駐実行時のみ）
+        self.file_watcher: 'FileWatcher' = None
+        self._watch_sources = False
         self._initialize_components()
     
     def _load_config(self, config_path: str) -> Dict:
@@ -253,122 +689,1118 @@ class WiFiMonitor:
         log_level = self.config.get('log_level', 'INFO')
         log_file = self.config.get('log_file', 'wifi_notifier.log')
         
-        # 既存のハンドラーをクリアして最初から設定
-        logging.root.handlers = []
-        logging.basicConfig(
-            level=getattr(logging, log_level),
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ],
-            force=True
-        )
+        # ポーリングスレッドはキューに投入するだけにし、ファイル・コンソールへの
+        # 書き込みとローテーションはバックグラウンドスレッドで行う
+        self.log_pipeline = setup_logging(log_level, log_file, self.config.get('logging'))
     
     def _initialize_components(self):
         """ルータとメール通知のコンポーネントを初期化する。"""
-        # ルータ接続を初期化
-        router_config = self.config['router']
-        self.router = WiFiRouter(
+        # ルータ接続を初期化（routers リストまたは単一の router 設定）
+        for router_config in self._get_router_configs(self.config):
+            router = self._create_router(router_config)
+            if router.name in self.router_intervals:
+                raise ValueError(f"ルータ名が重複しています: {router.name}")
+            self.routers.append(router)
+            self.router_configs[router.name] = router_config
+            self.router_intervals[router.name] = self._get_router_interval(router_config)
+        
+        # 後方互換性のため、最初のルータを self.router として保持
+        self.router = self.routers[0]
+        
+        # ポーリングエンジンを初期化
+        max_workers = self.config.get('poll_workers', min(32, len(self.routers)))
+        self.engine = PollingEngine(max_workers=max_workers)
+        for router in self.routers:
+            self.engine.add_job(
+                router.name,
+                lambda r=router: self._poll_router(r),
+                self.router_intervals[router.name],
+                schedule=self._create_schedule(router)
+            )
+        
+        # メール通知を初期化
+        self.notifier = self._create_notifier(self.config['email'])
+        
+        # メール以外の通知先（Webhook、コマンド、ファイル、syslog）
+        self.notifiers = self._create_notifiers(self.config.get('notifiers') or [])
+        
+        # 通知のレート制限と集約（デバイスごと・プロセス全体）
+        self._configure_throttle()
+        
+        # 通知の非同期ディスパッチキューを初期化（無効の場合はポーリング処理内で送信）
+        # 応答の遅い通知先が他の通知先を遅らせないよう、通知先ごとにキューを分ける
+        dispatch_config = self.config.get('dispatch', {})
+        if dispatch_config.get('enabled', True):
+            self.dispatcher = self._create_dispatcher(self.notifier, dispatch_config)
+            self.notifier_dispatchers = [
+                self._create_dispatcher(notifier, dispatch_config) for notifier in self.notifiers
+            ]
+        elif self.notifiers:
+            # 通知先ごとのスレッドで並行して送信する
+            from src.notifiers import NotifierGroup
+            self.notifier_group = NotifierGroup([self.notifier, *self.notifiers])
+        
+        # 既知デバイスの状態ストアを初期化し、前回までの状態を読み込む
+        self.state_store = create_state_store(self.config.get('state_store'))
+        
+        # 前回の実行までのルータのログインセッション（有効な場合はログインを省略する）
+        self.session_cache = create_session_cache(self.config.get('session_cache'))
+        self.known_devices = {
+            name: {mac: Device.from_mac(mac) for mac in macs}
+            for name, macs in self.state_store.load_known_devices().items()
+        }
+        
+        # 在席状態の判定（猶予時間内の再接続を新規接続として通知しない）
+        # 再起動をまたいでも猶予時間を適用できるよう、最近切断されたデバイスを復元する
+        self.presence_tracker = create_presence_tracker(self.config.get('presence'))
+        if self.presence_tracker.absence_grace > 0:
+            since = time.time() - self.presence_tracker.absence_grace
+            for name, departures in self.state_store.load_recent_departures(since).items():
+                self.presence_tracker.restore_absent(name, departures)
+        
+        # 監視対象デバイスを読み込む（指定されている場合）
+        self.monitored_macs = self._parse_monitored_macs(self.config.get('monitored_devices', []))
+        
+        # 通知に付加するベンダー名の検索（OUI索引は最初の通知で読み込む）
+        configure_vendor_lookup(self.config.get('oui'))
+        
+        self._initialize_metrics()
+        
+        # 接続・切断イベントのJSONログ（オプション）
+        self.event_log = create_event_log(self.config.get('event_log'))
+        
+        # デバイスの在席履歴（オプション）
+        self.presence_history = create_presence_history(self.config.get('presence_history'))
+        
+        # syslogによる接続・切断イベントの受信（オプション、待ち受けは start() で開始）
+        syslog_config = self.config.get('syslog') or {}
+        if syslog_config.get('enabled', False):
+            from src.syslog_listener import create_syslog_listener
+            self.syslog_listener = create_syslog_listener(
+                syslog_config, self._handle_syslog_message
+            )
+            self._build_syslog_routes()
+        
+        # 設定ファイルの変更を監視して自動的に再読み込みする（オプション）
+        reload_config = self.config.get('config_reload', {})
+        if reload_config.get('watch', False):
+            self.engine.add_job(
+                '__config_reload__',
+                self._check_config_file,
+                reload_config.get('interval', 5)
+            )
+        
+        logging.info(f"Components initialized successfully ({len(self.routers)} router(s))")
+    
+    @staticmethod
+    def _parse_monitored_macs(monitored_devices: Iterable[str]) -> Set[int]:
+        """
+        監視対象デバイスのMACアドレスを整数の集合に変換する。
+        
+        MACアドレスとして解釈できない項目は警告を出して無視します。
+        
+        Args:
+            monitored_devices: config.yaml の monitored_devices
+            
+        Returns:
+            整数のMACアドレスの集合
+        """
+        macs = set()
+        for mac in monitored_devices or []:
+            try:
+                macs.add(parse_mac(mac))
+            except (TypeError, ValueError):
+                logging.warning(f"Ignoring invalid MAC address in monitored_devices: {mac}")
+        return macs
+    
+    @staticmethod
+    def _get_router_configs(config: Dict) -> List[Dict]:
+        """設定からルータ設定のリストを取得する（routers リストまたは単一の router 設定）。"""
+        return config.get('routers') or [config['router']]
+    
+    @staticmethod
+    def _get_router_name(router_config: Dict) -> str:
+        """ルータ設定の識別名（省略時はIPアドレス、ローカルの情報源では種類）を返す。"""
+        return router_config.get('name') or router_config.get('ip') or router_config['source']
+    
+    def _get_router_interval(self, router_config: Dict) -> float:
+        """
+        ルータのチェック間隔を取得する（ルータごとの設定がなければ全体の設定）。
+        
+        syslogでイベントを受信する場合、ポーリングは取りこぼしを補う突き合わせのため
+        syslog.reconcile_interval の間隔で行います。
+        """
+        default = self.config.get('check_interval', 60)
+        syslog_config = self.config.get('syslog') or {}
+        if syslog_config.get('enabled', False):
+            default = syslog_config.get('reconcile_interval', default)
+        return router_config.get('check_interval', default)
+    
+    @staticmethod
+    def _create_router(router_config: Dict) -> Union[WiFiRouter, 'DeviceSource']:
+        """
+        ルータ設定から WiFiRouter を作成する。
+        
+        source を指定した設定からは、ルータのWeb UIの代わりにARPテーブルや
+        DHCPリースファイルを読み込むローカルのデバイス情報源を作成します。
+        
+        Args:
+            router_config: routers リストの要素または router 設定
+            
+        Returns:
+            作成したルータ（未ログイン）またはデバイス情報源
+        """
+        if router_config.get('source'):
+            from src.device_sources import create_device_source
+            return create_device_source(router_config)
+        return WiFiRouter(
             router_config['ip'],
             router_config['username'],
-            router_config['password']
+            router_config['password'],
+            name=router_config.get('name'),
+            timeout=router_config.get('timeout', 10),
+            html_parser=router_config.get('html_parser', PARSER_FAST),
+            retries=router_config.get('retries', 2),
+            backoff_factor=router_config.get('backoff_factor', 0.5),
+            expired_markers=router_config.get('expired_markers'),
+            driver=get_driver(router_config.get('model'), router_config.get('endpoints'))
         )
+    
+    @staticmethod
+    def _create_notifier(email_config: Dict) -> EmailNotifier:
+        """
+        メール設定から EmailNotifier を作成する。
         
-        # メール通知を初期化
-        email_config = self.config['email']
-        self.notifier = EmailNotifier(
+        Args:
+            email_config: email 設定
+            
+        Returns:
+            作成したメール通知（SMTPサーバーには最初の送信時に接続）
+        """
+        return EmailNotifier(
             email_config['smtp_server'],
             email_config['smtp_port'],
             email_config['smtp_user'],
             email_config['smtp_password'],
             email_config['sender_email'],
             email_config['recipient_emails'],
-            email_config.get('use_tls', True)
+            email_config.get('use_tls', True),
+            keep_alive=email_config.get('keep_alive', True),
+            digest=email_config.get('digest', False),
+            idle_timeout=email_config.get('idle_timeout', 60),
+            timeout=email_config.get('timeout', 30)
         )
+    
+    @staticmethod
+    def _create_notifiers(notifier_configs: List[Dict]) -> List['Notifier']:
+        """
+        notifiers 設定からメール以外の通知先を作成する。
         
-        # 監視対象デバイスを読み込む（指定されている場合）
-        monitored_devices = self.config.get('monitored_devices', [])
-        self.monitored_macs = {mac.lower() for mac in monitored_devices}
+        Args:
+            notifier_configs: config.yaml の notifiers
+            
+        Returns:
+            通知先のリスト
+            
+        Raises:
+            ValueError: 通知先の名前が重複している場合
+        """
+        if not notifier_configs:
+            return []
+        # 通知先の実装（requests や subprocess を使用）は設定されている場合にのみ読み込む
+        from src.notifiers import create_notifier
         
-        logging.info("Components initialized successfully")
+        notifiers = []
+        names = {EmailNotifier.name}
+        for notifier_config in notifier_configs:
+            notifier = create_notifier(notifier_config)
+            if notifier.name in names:
+                raise ValueError(f"通知先の名前が重複しています: {notifier.name}")
+            names.add(notifier.name)
+            notifiers.append(notifier)
+            logging.info(f"Notifier added: {notifier.name} ({notifier.kind})")
+        return notifiers
     
-    def start(self, single_run: bool = False):
+    @staticmethod
+    def _create_dispatcher(notifier, dispatch_config: Dict) -> NotificationDispatcher:
         """
-        WiFi接続の監視を開始する。
+        通知先のディスパッチキューを作成する。
         
         Args:
-            single_run: Trueの場合、1回だけチェックして終了（GitHub Actions用）
+            notifier: 通知先
+            dispatch_config: config.yaml の dispatch 設定
+            
+        Returns:
+            ディスパッチキュー
         """
-        logging.info("Starting WiFi monitor")
+        return NotificationDispatcher(
+            notifier,
+            workers=dispatch_config.get('workers', 1),
+            queue_size=dispatch_config.get('queue_size', 100),
+            max_retries=dispatch_config.get('max_retries', 3),
+            backoff_base=dispatch_config.get('backoff_base', 2.0),
+            backoff_max=dispatch_config.get('backoff_max', 300),
+            enqueue_timeout=dispatch_config.get('enqueue_timeout', 5),
+            dead_letter_file=dispatch_config.get(
+                'dead_letter_file', 'wifi_notifier_dead_letter.jsonl'
+            ),
+            name=notifier.name
+        )
+    
+    def _initialize_metrics(self):
+        """メトリクスのHTTPエンドポイントとテキストファイル出力を設定する。"""
+        metrics_config = self.config.get('metrics', {})
+        if not metrics_config.get('enabled', False):
+            return
+        
+        if metrics_config.get('port') is not None:
+            self.metrics_server = MetricsServer(
+                host=metrics_config.get('host', '127.0.0.1'),
+                port=metrics_config['port']
+            )
+            self.metrics_server.start()
+        
+        # テキストファイルはポーリングエンジンのジョブとして定期的に書き出す
+        self.metrics_textfile = metrics_config.get('textfile')
+        if self.metrics_textfile:
+            self.engine.add_job(
+                '__metrics__',
+                self._write_metrics,
+                metrics_config.get('textfile_interval', 15)
+            )
+    
+    def _write_metrics(self):
+        """メトリクスをテキストファイルに書き出す。"""
+        try:
+            REGISTRY.write_textfile(self.metrics_textfile)
+        except OSError as e:
+            logging.warning(f"Failed to write metrics file: {e}")
+    
+    def _create_schedule(self, router: WiFiRouter) -> AdaptiveSchedule:
+        """
+        ルータのポーリングスケジュールを作成する。
+        
+        scheduler 設定にルータごとの scheduler 設定を上書きして使用します。
         
-        # ルータにログイン
-        if not self.router.login():
-            logging.error("Failed to login to router")
+        Args:
+            router: 対象のルータ
+            
+        Returns:
+            ポーリングスケジュール
+        """
+        scheduler_config = self._get_scheduler_config(self.config, self.router_configs[router.name])
+        return AdaptiveSchedule(
+            self.router_intervals[router.name],
+            adaptive=scheduler_config.get('adaptive', True),
+            jitter=scheduler_config.get('jitter', 0.1),
+            min_interval=scheduler_config.get('min_interval'),
+            max_interval=scheduler_config.get('max_interval'),
+            quiet_polls=scheduler_config.get('quiet_polls', 10)
+        )
+    
+    @staticmethod
+    def _get_scheduler_config(config: Dict, router_config: Dict) -> Dict:
+        """scheduler 設定にルータごとの scheduler 設定を上書きした設定を返す。"""
+        return {**config.get('scheduler', {}), **router_config.get('scheduler', {})}
+    
+    def _stat_config(self):
+        """設定ファイルの更新時刻とサイズを返す（変更の検出用）。"""
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _check_config_file(self):
+        """設定ファイルが変更されていれば再読み込みする。"""
+        if self._stat_config() != self._config_stat:
+            logging.info(f"Config file changed: {self.config_path}")
+            self.reload_config()
+    
+    def reload_config(self) -> bool:
+        """
+        設定ファイルを再読み込みし、変更された設定だけを反映する。
+        
+        ルータのセッション、SMTP接続、既知デバイスの状態は維持されます。
+        接続設定が変更されたルータのみ作り直して再ログインし、SMTPサーバーの
+        設定が変更された場合のみSMTP接続を作り直します。状態ストアなど
+        RESTART_REQUIRED_KEYS の設定は反映せず、警告をログに出力します。
+        
+        Returns:
+            再読み込みに成功した場合はTrue（失敗時は現在の設定で動作を継続）
+        """
+        with self._reload_lock:
+            self._config_stat = self._stat_config()
+            try:
+                new_config = self._load_config(self.config_path)
+                if not isinstance(new_config, dict):
+                    raise ValueError("設定ファイルの内容が空または不正です")
+            except Exception as e:
+                logging.error(f"Failed to reload config, keeping current settings: {e}")
+                return False
+            
+            old_config = self.config
+            changed = {
+                key for key in set(old_config) | set(new_config)
+                if old_config.get(key) != new_config.get(key)
+            }
+            if not changed:
+                logging.info("Config reloaded: no changes")
+                return True
+            
+            # 再起動が必要な設定は現在の値のまま動作を継続する
+            for key in sorted(changed & set(self.RESTART_REQUIRED_KEYS)):
+                logging.warning(f"Config '{key}' changed; restart the monitor to apply it")
+                if key in old_config:
+                    new_config[key] = old_config[key]
+                else:
+                    new_config.pop(key, None)
+            changed -= set(self.RESTART_REQUIRED_KEYS)
+            
+            self.config = new_config
+            notifier = None
+            try:
+                # 失敗しうるメール通知の作成は、ルータの状態を変更する前に済ませる
+                if 'email' in changed:
+                    notifier = self._prepare_notifier(old_config['email'], new_config['email'])
+                if changed & {'router', 'routers', 'check_interval', 'scheduler'}:
+                    self._reload_routers(old_config)
+            except Exception as e:
+                self.config = old_config
+                if notifier:
+                    notifier.close()
+                logging.error(f"Failed to apply reloaded config, keeping current settings: {e}")
+                return False
+            
+            if 'email' in changed:
+                self._reload_notifier(new_config['email'], notifier)
+            if changed & {'email', 'rate_limit'}:
+                self._configure_throttle()
+            
+            if 'presence' in changed:
+                presence_config = new_config.get('presence') or {}
+                self.presence_tracker.configure(
+                    presence_config.get('absence_grace', DEFAULT_ABSENCE_GRACE),
+                    presence_config.get('connect_delay', 0)
+                )
+            if 'oui' in changed:
+                configure_vendor_lookup(new_config.get('oui'))
+            if 'monitored_devices' in changed:
+                self.monitored_macs = self._parse_monitored_macs(
+                    new_config.get('monitored_devices', [])
+                )
+            if changed & {'log_level', 'log_file', 'logging'}:
+                self._setup_logging()
+            
+            if changed:
+                logging.info(f"Config reloaded: {', '.join(sorted(changed))}")
+            return True
+    
+    def _reload_routers(self, old_config: Dict):
+        """
+        ルータ設定の変更を反映する。
+        
+        接続設定（IPアドレス・認証情報・モデルなど）が変更されたルータと
+        追加されたルータは作成してジョブを登録し、削除されたルータはジョブを
+        登録解除します。チェック間隔・スケジューラ設定のみの変更は
+        スケジュールの置き換えで反映します。
+        
+        Args:
+            old_config: 変更前の設定
+        """
+        new_configs: Dict[str, Dict] = {}
+        for router_config in self._get_router_configs(self.config):
+            name = self._get_router_name(router_config)
+            if name in new_configs:
+                raise ValueError(f"ルータ名が重複しています: {name}")
+            new_configs[name] = router_config
+        
+        def connection_settings(router_config: Dict) -> Dict:
+            return {k: v for k, v in router_config.items() if k not in self.ROUTER_SCHEDULE_KEYS}
+        
+        # 変更を適用する前にすべてのルータを作成して設定を検証する
+        current = {router.name: router for router in self.routers}
+        rebuilt = {
+            name: self._create_router(router_config)
+            for name, router_config in new_configs.items()
+            if name not in current
+            or connection_settings(self.router_configs[name]) != connection_settings(router_config)
+        }
+        
+        for name in set(current) - set(new_configs):
+            self.engine.remove_job(name)
+            self.router_configs.pop(name)
+            self.router_intervals.pop(name)
+            self.known_devices.pop(name, None)
+            self.presence_tracker.forget(name)
+            self.ready_routers.discard(name)
+            self._diffed_routers.discard(name)
+            current[name].close()
+            logging.info(f"[{name}] Router removed")
+        
+        routers = []
+        for name, router_config in new_configs.items():
+            router = rebuilt.get(name, current.get(name))
+            old_router_config = self.router_configs.get(name, {})
+            schedule_changed = (
+                self._get_router_interval(router_config) != self.router_intervals.get(name)
+                or self._get_scheduler_config(self.config, router_config)
+                != self._get_scheduler_config(old_config, old_router_config)
+            )
+            self.router_configs[name] = router_config
+            self.router_intervals[name] = self._get_router_interval(router_config)
+            routers.append(router)
+            
+            if name not in current:
+                self.engine.add_job(
+                    name,
+                    lambda r=router: self._poll_router(r),
+                    self.router_intervals[name],
+                    schedule=self._create_schedule(router)
+                )
+                logging.info(f"[{name}] Router added")
+            elif name in rebuilt:
+                # 既知デバイスは維持し、次回のポーリングで新しい設定でログインし直す
+                self.ready_routers.discard(name)
+                self._diffed_routers.discard(name)
+                self.engine.update_job(
+                    name,
+                    func=lambda r=router: self._poll_router(r),
+                    schedule=self._create_schedule(router) if schedule_changed else None
+                )
+                current[name].close()
+                logging.info(f"[{name}] Router connection settings changed")
+            elif schedule_changed:
+                self.engine.update_job(name, schedule=self._create_schedule(router))
+                logging.info(
+                    f"[{name}] Polling schedule changed (interval: {self.router_intervals[name]}s)"
+                )
+        
+        self.routers = routers
+        self.router = self.routers[0]
+        if self.syslog_listener:
+            self._build_syslog_routes()
+        if self._watch_sources:
+            self._start_file_watcher()
+    
+    def _prepare_notifier(self, old_email_config: Dict,
+                          new_email_config: Dict) -> Optional[EmailNotifier]:
+        """
+        メール設定の変更を検証し、SMTPサーバーの設定が変更された場合は新しいメール通知を作成する。
+        
+        Args:
+            old_email_config: 変更前の email 設定
+            new_email_config: 変更後の email 設定
+            
+        Returns:
+            新しいメール通知（送信元・宛先・ダイジェスト設定のみの変更の場合はNone）
+            
+        Raises:
+            ValueError: 必須の設定がない場合
+        """
+        for key in ('sender_email', 'recipient_emails'):
+            if key not in new_email_config:
+                raise ValueError(f"email.{key} が設定されていません")
+        connection_keys = (set(old_email_config) | set(new_email_config)) - set(
+            self.EMAIL_RUNTIME_KEYS
+        )
+        if all(old_email_config.get(k) == new_email_config.get(k) for k in connection_keys):
+            return None
+        return self._create_notifier(new_email_config)
+    
+    def _reload_notifier(self, new_email_config: Dict, notifier: Optional[EmailNotifier]):
+        """
+        メール設定の変更を反映する。
+        
+        送信元・宛先・ダイジェスト設定のみの変更は保持中のSMTP接続のまま反映し、
+        SMTPサーバーの設定が変更された場合はメール通知を置き換えます。
+        
+        Args:
+            new_email_config: 変更後の email 設定
+            notifier: _prepare_notifier() で作成した新しいメール通知（Noneの場合は置き換えない）
+        """
+        if notifier is None:
+            self.notifier.sender_email = new_email_config['sender_email']
+            self.notifier.recipient_emails = new_email_config['recipient_emails']
+            self.notifier.digest = new_email_config.get('digest', False)
             return
         
-        logging.info("Successfully logged in to router")
+        old_notifier = self.notifier
+        self.notifier = notifier
+        if self.dispatcher:
+            self.dispatcher.notifier = notifier
+        if self.notifier_group:
+            self.notifier_group.notifiers = [notifier, *self.notifiers]
+        old_notifier.close()
+        logging.info("SMTP settings changed, email notifier recreated")
+    
+    def _configure_throttle(self):
+        """
+        rate_limit 設定に従って通知のレート制限を作成または更新する。
+        
+        レート制限の状態（各バケットの残り、保留中の通知、未報告の件数）は
+        設定の変更後も維持します。集約ウィンドウが有効な場合は、ウィンドウの
+        終了した通知を送信するジョブを登録します。
+        """
+        rate_config = self.config.get('rate_limit') or {}
+        digest = self.notifier.digest
+        
+        if not rate_config.get('enabled', True):
+            if self.notification_throttle:
+                # 保留中の通知を送信してからレート制限を無効にする
+                self._deliver_batch(self.notification_throttle.flush(force=True))
+                self.notification_throttle = None
+        elif self.notification_throttle is None:
+            self.notification_throttle = create_notification_throttle(rate_config, digest)
+        else:
+            self.notification_throttle.configure(**throttle_settings(rate_config), digest=digest)
+        
+        window = self.notification_throttle.coalesce_window if self.notification_throttle else 0
+        if window > 0:
+            interval = max(1.0, window / 4)
+            if '__notify_flush__' in self.engine.jobs:
+                self.engine.update_job(
+                    '__notify_flush__',
+                    schedule=AdaptiveSchedule(interval, adaptive=False, jitter=0)
+                )
+            else:
+                self.engine.add_job('__notify_flush__', self._flush_notifications, interval)
+        elif '__notify_flush__' in self.engine.jobs:
+            self.engine.remove_job('__notify_flush__')
+            if self.notification_throttle:
+                self._deliver_batch(self.notification_throttle.flush(force=True))
+    
+    def _install_reload_handler(self):
+        """SIGHUP を受信したら設定を再読み込みするシグナルハンドラーを設定する。"""
+        if not hasattr(signal, 'SIGHUP'):
+            return
+        if threading.current_thread() is not threading.main_thread():
+            return
+        
+        def handle_sighup(signum, frame):
+            # シグナルハンドラー内では処理せず、別スレッドで再読み込みする
+            threading.Thread(target=self.reload_config, name='config-reload', daemon=True).start()
+        
+        signal.signal(signal.SIGHUP, handle_sighup)
+    
+    def start(self, single_run: bool = False):
+        """
+        WiFi接続の監視を開始する。
         
-        # 初期デバイスリストを取得
-        initial_devices = self.router.get_connected_devices()
-        self.known_devices = {dev['mac'].lower() for dev in initial_devices}
-        logging.info(f"Initial devices: {len(self.known_devices)}")
+        Args:
+            single_run: Trueの場合、1回だけチェックして終了（GitHub Actions用）
+        """
+        logging.info("Starting WiFi monitor")
         
         if single_run:
             # 1回だけチェックして終了（GitHub Actions用）
+            # 状態ストアに前回の既知デバイスがあるルータは、ログイン後の1回の取得で判定する
             logging.info("Single run mode - checking once and exiting")
-            self._check_for_new_devices()
+            if self.presence_tracker.connect_delay > 0:
+                # 確認待ちのデバイスは次回の実行に引き継がれず、既知デバイスとして
+                # 記録されるため、接続の通知が失われないよう即座に通知する
+                logging.warning("presence.connect_delay is ignored in single run mode")
+                self.presence_tracker.configure(self.presence_tracker.absence_grace, 0)
+            self.engine.run_once()
+            self._shutdown()
+            
+            if not self.ready_routers:
+                logging.error("Failed to login to router")
+                return
+            
             logging.info("Single run completed")
             return
         
-        # 監視ループを開始
-        check_interval = self.config.get('check_interval', 60)
+        # SIGHUP で設定を再読み込みする
+        self._install_reload_handler()
+        
+        # syslogによる接続・切断イベントの受信を開始する（常駐実行時のみ）
+        if self.syslog_listener:
+            self.syslog_listener.start()
+        
+        # ローカルのデバイス情報源のファイルが変更されたら、間隔を待たずにポーリングする
+        self._watch_sources = True
+        self._start_file_watcher()
         
+        # 監視ループを開始（各ルータは個別の間隔で並行してポーリングされ、
+        # 初回実行時にログインを行う）
         try:
-            while True:
-                self._check_for_new_devices()
-                time.sleep(check_interval)
+            self.engine.run_forever()
         except KeyboardInterrupt:
             logging.info("Stopping WiFi monitor")
         except Exception as e:
             logging.error(f"Monitor error: {e}")
+        finally:
+            self.engine.stop()
+            self._shutdown()
+    
+    def _shutdown(self):
+        """未送信の通知を送信し、状態ストアとSMTP接続を閉じる。"""
+        # 接続の確認待ちは再起動後に引き継がれない（既知デバイスとして記録済みのため通知されない）
+        for router in self.routers:
+            waiting = self.presence_tracker.pending_count(router.name)[1]
+            if waiting:
+                logging.warning(
+                    f"[{router.name}] {waiting} device(s) awaiting connect_delay "
+                    f"will not be notified"
+                )
+        if self.syslog_listener:
+            self.syslog_listener.stop()
+        if self.file_watcher:
+            self.file_watcher.stop()
+        if self.notification_throttle:
+            # 集約ウィンドウ内で保留中の通知を送信する
+            self._deliver_batch(self.notification_throttle.flush(force=True))
+        if self.dispatcher:
+            shutdown_timeout = self.config.get('dispatch', {}).get('shutdown_timeout', 60)
+            # 各キューは並行して送信を続けるため、待機時間は全体で shutdown_timeout まで
+            deadline = time.monotonic() + shutdown_timeout
+            for dispatcher in [*self.notifier_dispatchers, self.dispatcher]:
+                dispatcher.close(max(0.0, deadline - time.monotonic()))
+        if self.notifier_group:
+            self.notifier_group.close()
+        self.notifier.close()
+        for notifier in self.notifiers:
+            notifier.close()
+        self.state_store.close()
+        if self.session_cache:
+            self._save_router_sessions()
+        if self.event_log:
+            self.event_log.close()
+        if self.presence_history:
+            self.presence_history.close()
+        if self.metrics_textfile:
+            self._write_metrics()
+        if self.metrics_server:
+            self.metrics_server.stop()
+    
+    def _notify(self, devices: List[Device]):
+        """
+        検出したデバイスの通知を送信する。
+        
+        レート制限を超えた通知は送信せず、件数を次の通知で報告します。
+        集約ウィンドウが有効な場合は保留し、ウィンドウの終了後に
+        まとめて送信します。ディスパッチキューが有効な場合はキューに
+        投入して即座に戻ります。
+        
+        Args:
+            devices: 通知対象のデバイス情報のリスト
+        """
+        if self.notification_throttle:
+            self._deliver_batch(self.notification_throttle.submit(devices))
+        elif devices:
+            self._deliver(devices)
+    
+    def _flush_notifications(self):
+        """集約ウィンドウが終了した通知を送信する（定期ジョブ）。"""
+        self._deliver_batch(self.notification_throttle.flush())
+    
+    def _deliver_batch(self, batch: Optional[NotificationBatch]):
+        """レート制限を通過した通知を送信する（Noneの場合は何もしない）。"""
+        if batch is not None:
+            self._deliver(batch.devices, batch.suppressed)
+    
+    def _deliver(self, devices: List[Device], suppressed: int = 0):
+        """
+        通知をディスパッチキューに投入するか、直接送信する。
+        
+        Args:
+            devices: 通知対象のデバイス情報のリスト
+            suppressed: 前回の通知以降に送信しなかった通知の件数
+        """
+        if self.dispatcher:
+            # キューが満杯の場合に待機するため、メール以外の通知先を先に投入する
+            for dispatcher in self.notifier_dispatchers:
+                dispatcher.submit(devices, suppressed)
+            self.dispatcher.submit(devices, suppressed)
+        elif self.notifier_group:
+            self.notifier_group.send_notifications(devices, suppressed)
+        else:
+            self.notifier.send_notifications(devices, suppressed=suppressed)
+    
+    def _poll_router(self, router: WiFiRouter) -> str:
+        """
+        ルータ1台分のポーリング処理を行う。
+        
+        未ログインのルータはまずログインします。状態ストアに既知デバイスが
+        ない場合は初期デバイスリストを取得して終了し、それ以外は
+        新しいデバイス接続をチェックします。
+        
+        Args:
+            router: 対象のルータ
+            
+        Returns:
+            ポーリング結果の種別（スケジューラが次回の間隔の調整に使用します）
+        """
+        with self._router_lock(router.name):
+            # 未ログインのルータ、または再ログインに失敗したルータはログインからやり直す
+            if router.name not in self.ready_routers or not router.authenticated:
+                has_state = router.name in self.known_devices
+                if not self._prepare_router(router):
+                    return OUTCOME_FAILED
+                if not has_state:
+                    return OUTCOME_QUIET
+            
+            return self._check_for_new_devices(router)
+    
+    def _router_lock(self, name: str) -> threading.Lock:
+        """ルータの既知デバイスを更新する処理のロックを取得する（未作成の場合は作成）。"""
+        lock = self._router_locks.get(name)
+        if lock is None:
+            lock = self._router_locks.setdefault(name, threading.Lock())
+        return lock
     
-    def _check_for_new_devices(self):
-        """新しいデバイス接続をチェックする。"""
+    def _prepare_router(self, router: WiFiRouter) -> bool:
+        """
+        ルータにログインし、必要に応じて初期デバイスリストを取得する。
+        
+        セッションキャッシュに有効なセッションがある場合はログインを省略します
+        （次のデバイスリストの取得で拒否された場合にログインします）。
+        状態ストアから既知デバイスが読み込まれている場合は初期取得を省略します。
+        
+        Args:
+            router: 対象のルータ
+            
+        Returns:
+            ログイン（と初期デバイスリストの取得）に成功した場合はTrue
+        """
+        if self._resume_router_session(router):
+            logging.info(f"[{router.name}] Resumed cached router session")
+        elif not router.login():
+            logging.error(f"[{router.name}] Failed to login to router")
+            return False
+        elif isinstance(router, WiFiRouter):
+            logging.info(f"[{router.name}] Successfully logged in to router")
+        
+        if router.name in self.known_devices:
+            self.ready_routers.add(router.name)
+            logging.info(
+                f"[{router.name}] Restored known devices: {len(self.known_devices[router.name])}"
+            )
+            return True
+        
+        # 初期デバイスリストの取得に失敗した場合は、次回のポーリングでやり直す
+        try:
+            initial_devices = index_devices(router.fetch_connected_devices())
+        except RouterFetchError as e:
+            logging.error(f"[{router.name}] Failed to get initial device list: {e}")
+            return False
+        
+        self.ready_routers.add(router.name)
+        self.state_store.initialize_router(router.name, initial_devices.keys())
+        self.known_devices[router.name] = initial_devices
+        # 初期デバイスの検出時刻を以降の切断判定の基準にする
+        self.presence_tracker.advance(router.name)
+        record_poll_success(router.name, len(initial_devices))
+        if self.presence_history:
+            # 前回の実行で開いたままの在席区間を現在の接続状況に揃える
+            self._record_presence(
+                self.presence_history.sync_router, router.name, initial_devices.keys()
+            )
+        self._diffed_routers.add(router.name)
+        logging.info(f"[{router.name}] Initial devices: {len(initial_devices)}")
+        return True
+    
+    def _resume_router_session(self, router: WiFiRouter) -> bool:
+        """
+        セッションキャッシュにルータの有効なセッションがあれば復元する。
+        
+        Args:
+            router: 対象のルータ
+            
+        Returns:
+            セッションを復元した場合はTrue（ログインが必要な場合はFalse）
+        """
+        if not self.session_cache or not isinstance(router, WiFiRouter):
+            return False
+        cookies = self.session_cache.get(router.name, router.session_fingerprint())
+        if cookies is None:
+            return False
+        router.resume_session(cookies)
+        return True
+    
+    def _save_router_sessions(self):
+        """ログイン中のルータのセッションをセッションキャッシュに保存する。"""
+        for router in self.routers:
+            if not isinstance(router, WiFiRouter):
+                continue
+            # 今回の実行で使用できたセッションのみ保存し、拒否されたセッションは破棄する
+            if router.session.authenticated and router.last_fetch_ok:
+                self.session_cache.put(
+                    router.name, router.session_fingerprint(), router.export_session()
+                )
+            else:
+                self.session_cache.discard(router.name)
+        self.session_cache.save()
+    
+    def _start_file_watcher(self):
+        """
+        ローカルのデバイス情報源のファイルの変更監視を開始する（監視中の場合は作り直す）。
+        
+        inotify を使用できない環境では監視せず、ポーリングのみで変更を検出します。
+        """
+        if self.file_watcher:
+            self.file_watcher.stop()
+            self.file_watcher = None
+        
+        sources = [router for router in self.routers if not isinstance(router, WiFiRouter)]
+        if not sources:
+            return
+        
+        from src.device_sources import FileWatcher
+        watcher = FileWatcher(self.engine.trigger)
+        for source in sources:
+            for path in source.watch_paths():
+                watcher.add(path, source.name)
+        if watcher.start():
+            self.file_watcher = watcher
+    
+    def _check_for_new_devices(self, router: WiFiRouter = None) -> str:
+        """
+        新しいデバイス接続をチェックする。
+        
+        Args:
+            router: 対象のルータ（省略時は self.router）
+            
+        Returns:
+            ポーリング結果の種別（OUTCOME_CHANGED / OUTCOME_QUIET / OUTCOME_FAILED）
+        """
+        router = router or self.router
         try:
-            current_devices = self.router.get_connected_devices()
-            current_macs = {dev['mac'].lower() for dev in current_devices}
+            try:
+                current_devices = router.fetch_connected_devices()
+            except RouterFetchError as e:
+                # 取得失敗をデバイス0台と区別し、既知デバイスを維持する
+                logging.warning(f"[{router.name}] Failed to get device list: {e}")
+                return OUTCOME_FAILED
             
-            # 新しいデバイスを検出
-            new_macs = current_macs - self.known_devices
+            # 前回と同じレスポンスの場合は差分計算を省略する
+            # （前回のチェック後、既知デバイスは前回のレスポンスと一致している）
+            if router.last_fetch_unchanged and router.name in self._diffed_routers:
+                self.state_store.touch(router.name)
+                # 猶予時間・確認待ち時間を過ぎたデバイスの状態だけを確定させる
+                known = self.known_devices.get(router.name, {})
+                self._handle_presence_changes(
+                    router, self.presence_tracker.advance(router.name), known
+                )
+                record_poll_success(router.name, len(known))
+                return OUTCOME_QUIET
             
-            for mac in new_macs:
-                # デバイス情報を検索
-                device_info = next((dev for dev in current_devices if dev['mac'].lower() == mac), None)
-                
-                if device_info:
-                    # このデバイスについて通知すべきかチェック
-                    should_notify = (
-                        not self.monitored_macs or  # フィルターがない場合は全て通知
-                        mac in self.monitored_macs   # または監視リストに含まれている場合
-                    )
-                    
-                    if should_notify:
-                        logging.info(f"New device detected: {mac}")
-                        self.notifier.send_notification(device_info)
-                    else:
-                        logging.debug(f"New device detected but not monitored: {mac}")
-                    
-                    self.known_devices.add(mac)
-            
-            # 既知セットから切断されたデバイスを削除
-            disconnected = self.known_devices - current_macs
-            if disconnected:
-                logging.info(f"Devices disconnected: {len(disconnected)}")
-                self.known_devices = current_macs
+            # MACアドレスをキーとしたインデックスで接続・切断・属性変更を一度に求める
+            with time_stage(STAGE_DIFF, router.name):
+                current = index_devices(current_devices)
+                known = self.known_devices.get(router.name, {})
+                diff = diff_devices(known, current)
+            
+            self._apply_diff(router, known, current, diff)
+            self._diffed_routers.add(router.name)
+            record_poll_success(router.name, len(current))
+            
+            return OUTCOME_CHANGED if diff else OUTCOME_QUIET
                 
         except Exception as e:
-            logging.error(f"Error checking for new devices: {e}")
+            logging.error(f"[{router.name}] Error checking for new devices: {e}")
+            return OUTCOME_FAILED
+    
+    def _apply_diff(self, router: WiFiRouter, known: Dict[int, Device],
+                    current: Dict[int, Device], diff: DeviceDiff,
+                    departed_at: Optional[float] = None):
+        """
+        差分を反映して新規接続を通知し、既知デバイスと状態ストアを更新する。
+        
+        Args:
+            router: 対象のルータ
+            known: 前回までの既知デバイス
+            current: 今回のデバイスインデックス
+            diff: known と current の差分
+            departed_at: 切断したデバイスの最終検出時刻（省略時は前回のポーリング時刻）
+        """
+        # 一時的にデバイスリストから消えたデバイスの再接続は新規接続として扱わない
+        presence = self.presence_tracker.update(
+            router.name, [mac for mac, _ in diff.connected], diff.disconnected,
+            departed_at=departed_at
+        )
+        self._handle_presence_changes(router, presence, current)
+        
+        for mac, old, new, fields in diff.changed:
+            changes = ', '.join(f"{f}: {old.get(f, '')} -> {new.get(f, '')}" for f in fields)
+            logging.info(f"[{router.name}] Device changed: {new.mac} ({changes})")
+        
+        if self.event_log:
+            self._record_events(router, known, diff)
+        
+        if self.presence_history:
+            self._record_presence(
+                self.presence_history.record, router.name,
+                [mac for mac, _ in diff.connected], diff.disconnected
+            )
+        
+        # 既知デバイスを今回のリストで置き換え、結果を状態ストアに書き込む
+        self.known_devices[router.name] = current
+        self.state_store.update(
+            router.name,
+            current.keys(),
+            [mac for mac, _ in diff.connected],
+            diff.disconnected
+        )
+    
+    def _build_syslog_routes(self):
+        """
+        syslogの送信元アドレスからルータとメッセージのパターンへの対応を作成する。
+        
+        送信元アドレスはルータ設定の syslog_source（省略時は ip のホスト部分）、
+        パターンはルータ設定の syslog_patterns（省略時はルータモデルの既定）を使用します。
+        
+        Raises:
+            ValueError: パターンが不正な場合
+        """
+        from src.syslog_listener import SyslogMatcher
+        
+        routes = {}
+        for router in self.routers:
+            if not isinstance(router, WiFiRouter):
+                # ローカルのデバイス情報源はsyslogのイベントを受信しない
+                continue
+            router_config = self.router_configs[router.name]
+            matcher = SyslogMatcher(
+                router_config.get('syslog_patterns') or router.driver.syslog_patterns
+            )
+            sources = router_config.get('syslog_source') or router.router_ip.split(':')[0]
+            for source in [sources] if isinstance(sources, str) else sources:
+                routes[source] = (router, matcher)
+        # 受信スレッドが参照中の辞書は変更せず、まとめて置き換える
+        self._syslog_routes = routes
+    
+    def _handle_syslog_message(self, source: str, message: str):
+        """
+        受信したsyslogメッセージを接続・切断イベントとして反映する（受信スレッド）。
+        
+        Args:
+            source: 送信元のIPアドレス
+            message: syslogメッセージ
+        """
+        route = self._syslog_routes.get(source)
+        if route is None:
+            logging.debug(f"Ignoring syslog message from unknown source {source}")
+            return
+        router, matcher = route
+        matched = matcher.match(message)
+        if matched is not None:
+            self._apply_device_event(router, *matched)
+    
+    def _apply_device_event(self, router: WiFiRouter, event: str, device: Device):
+        """
+        1台のデバイスの接続・切断イベントを既知デバイスに反映する。
+        
+        ポーリングと同じ経路（在席状態の判定、通知、イベントログ、状態ストア）で
+        処理します。初期デバイスリストの取得前のルータのイベントは無視します。
+        
+        Args:
+            router: 対象のルータ
+            event: EVENT_CONNECT または EVENT_DISCONNECT
+            device: イベントのデバイス情報
+        """
+        with self._router_lock(router.name):
+            if router.name not in self.ready_routers:
+                return
+            
+            known = self.known_devices.get(router.name, {})
+            mac = device.mac_int
+            diff = DeviceDiff()
+            if event == EVENT_CONNECT:
+                if mac in known:
+                    return
+                current = dict(known)
+                current[mac] = device
+                diff.connected.append((mac, device))
+            else:
+                if mac not in known:
+                    return
+                current = dict(known)
+                del current[mac]
+                diff.disconnected.append(mac)
+            
+            logging.debug(f"[{router.name}] Syslog event: {event} {device.mac}")
+            self._apply_diff(router, known, current, diff, departed_at=time.time())
+            # 次回のポーリングでは、レスポンスが前回と同じでも差分を計算して
+            # イベントで更新した既知デバイスをルータのデバイスリストと突き合わせる
+            self._diffed_routers.discard(router.name)
+    
+    def _handle_presence_changes(self, router: WiFiRouter, changes: PresenceChanges,
+                                 devices: Dict[int, Device]):
+        """
+        確定した在席状態の変化をログに出力し、新規接続したデバイスを通知する。
+        
+        Args:
+            router: 対象のルータ
+            changes: 在席状態の変化
+            devices: 現在のデバイスインデックス
+        """
+        to_notify = []
+        for mac in changes.arrived:
+            device_info = devices.get(mac) or Device.from_mac(mac)
+            # このデバイスについて通知すべきかチェック
+            should_notify = (
+                not self.monitored_macs or  # フィルターがない場合は全て通知
+                mac in self.monitored_macs   # または監視リストに含まれている場合
+            )
+            
+            if should_notify:
+                logging.info(f"[{router.name}] New device detected: {device_info.mac}")
+                to_notify.append(device_info)
+            else:
+                logging.debug(
+                    f"[{router.name}] New device detected but not monitored: {device_info.mac}"
+                )
+        
+        # 検出したデバイスをまとめて通知（ダイジェストモードでは1通に集約）
+        self._notify(to_notify)
+        
+        for mac in changes.returned:
+            logging.debug(
+                f"[{router.name}] Device reconnected within grace period: "
+                f"{format_mac(mac, upper=True)}"
+            )
+        
+        if changes.departed:
+            logging.info(f"[{router.name}] Devices disconnected: {len(changes.departed)}")
+    
+    def _record_presence(self, method, *args):
+        """
+        在席履歴に書き込む（失敗してもポーリング処理は継続する）。
+        
+        Args:
+            method: 在席履歴の書き込みメソッド
+            *args: メソッドに渡す引数
+        """
+        try:
+            method(*args)
+        except Exception as e:
+            logging.warning(f"Failed to record presence history: {e}")
+    
+    def _record_events(self, router: WiFiRouter, known: Dict[int, Device], diff):
+        """
+        差分をイベントログに記録する。
+        
+        Args:
+            router: 対象のルータ
+            known: 前回までの既知デバイス
+            diff: 今回のチェックで求めた差分
+        """
+        for mac, device_info in diff.connected:
+            self.event_log.record(EVENT_CONNECT, router.name, format_mac(mac), device_info)
+        for mac in diff.disconnected:
+            # 状態ストアから復元した記録はIPアドレス・ホスト名を持たない
+            old = known.get(mac)
+            self.event_log.record(
+                EVENT_DISCONNECT, router.name, format_mac(mac),
+                old if old is not None and old.has_details else None
+            )
+        for mac, old, new, fields in diff.changed:
+            self.event_log.record(
+                EVENT_CHANGE, router.name, format_mac(mac), new,
+                changes={f: [old.get(f, ''), new.get(f, '')] for f in fields}
+            )
 
 
 def main():